@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Binary columnar export (Parquet / Arrow IPC) of record datasets
+Set ARROW_EXPORT=parquet, arrow or parquet,arrow to enable; needs pyarrow.
+Each script passes a field type map alongside its COLUMN_MAPPINGS, any
+field without an entry is written as a string column.
+"""
+
+import os
+import sys
+import math
+from datetime import date
+
+from atomic_write import atomic_path
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Configuration
+ARROW_EXPORT = [
+    f.strip()
+    for f in os.environ.get("ARROW_EXPORT", "").lower().split(",")
+    if f.strip()
+]
+
+
+def to_float(value):
+    """Coerce to float, None when not numeric"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_int(value):
+    """Coerce to int, None when not numeric"""
+    number = to_float(value)
+    return int(number) if number is not None and math.isfinite(number) else None
+
+
+def to_date(value):
+    """Coerce a YYYY-MM-DD (or ISO datetime) string to a date"""
+    if isinstance(value, date):
+        return value
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def to_string(value):
+    """Coerce to string, keeping None"""
+    return None if value is None else str(value)
+
+
+CONVERTERS = {
+    "string": to_string,
+    "float64": to_float,
+    "int64": to_int,
+    "date": to_date,
+}
+
+
+def arrow_type(name):
+    """Map a field type name to a pyarrow type"""
+    return {
+        "string": pa.string(),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+        "date": pa.date32(),
+    }[name]
+
+
+def build_schema(records, field_types):
+    """Typed schema over every field present in the records"""
+    fields = []
+    seen = set()
+    for r in records:
+        for key in r:
+            if key not in seen:
+                seen.add(key)
+                fields.append(key)
+    return [(f, field_types.get(f, "string")) for f in fields]
+
+
+def records_to_table(records, field_types):
+    """Build a pyarrow Table column by column"""
+    schema = build_schema(records, field_types)
+    columns = []
+    for field, type_name in schema:
+        convert = CONVERTERS[type_name]
+        values = [convert(r.get(field)) for r in records]
+        columns.append(pa.array(values, type=arrow_type(type_name)))
+    return pa.Table.from_arrays(
+        columns, schema=pa.schema([(f, arrow_type(t)) for f, t in schema])
+    )
+
+
+def write_arrow(path, name, records, field_types, formats=None, unchanged=False):
+    """
+    Write records as <base>.<name>.parquet / .arrow next to path
+
+    With unchanged=True (the source JSON was not rewritten) existing
+    files are kept as they are.
+    """
+    formats = ARROW_EXPORT if formats is None else formats
+    if not formats or not records:
+        return []
+    if pa is None:
+        print("  Warning: pyarrow not installed, skipping Parquet/Arrow export")
+        return []
+
+    base = f"{os.path.splitext(path)[0]}.{name}"
+    targets = {fmt: f"{base}.{fmt}" for fmt in ("parquet", "arrow") if fmt in formats}
+    if unchanged and all(os.path.exists(t) for t in targets.values()):
+        return []
+
+    table = records_to_table(records, field_types)
+    written = []
+
+    if "parquet" in targets:
+        with atomic_path(targets["parquet"]) as tmp_path:
+            pq.write_table(table, tmp_path, compression="zstd")
+        written.append(targets["parquet"])
+    if "arrow" in targets:
+        # Uncompressed IPC so readers can memory-map it
+        with atomic_path(targets["arrow"]) as tmp_path:
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+        written.append(targets["arrow"])
+
+    for out in written:
+        print(f"  - {out}: {table.num_rows} rows, {os.path.getsize(out) / 1024:.1f} KB")
+    return written
+
+
+def main(argv):
+    """Print the schema of a Parquet or Arrow file"""
+    if pa is None:
+        print("pyarrow is not installed")
+        return 1
+    for path in argv:
+        if path.endswith(".parquet"):
+            schema = pq.read_schema(path)
+        else:
+            schema = feather.read_table(path, memory_map=True).schema
+        print(f"{path}:\n{schema}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
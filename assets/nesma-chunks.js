@@ -0,0 +1,53 @@
+/**
+ * NESMA Chunked Data Loader v1.0
+ * Loads the head file of a chunked dataset first, then streams record chunks
+ * listed in manifest.json (written by data_output.write_chunked).
+ *
+ * Usage:
+ *   NesmaChunks.load('data/pr_data', {
+ *       query: '?v=' + Date.now(),
+ *       onHead: (head, manifest) => renderSummary(head),
+ *       onChunk: (name, records, chunk) => appendRows(name, records),
+ *   }).then((data) => renderTables(data));
+ */
+
+const NesmaChunks = {
+    async fetchJson(url) {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error('Failed to load ' + url + ' (' + response.status + ')');
+        return response.json();
+    },
+
+    setPath(obj, path, value) {
+        var node = obj;
+        for (var i = 0; i < path.length - 1; i++) {
+            if (!node[path[i]]) node[path[i]] = {};
+            node = node[path[i]];
+        }
+        node[path[path.length - 1]] = value;
+    },
+
+    // options.query (e.g. a cache buster) is appended to every file URL
+    async load(baseUrl, options) {
+        options = options || {};
+        const query = options.query || '';
+        const [head, manifest] = await Promise.all([
+            this.fetchJson(baseUrl + '/head.json' + query),
+            this.fetchJson(baseUrl + '/manifest.json' + query)
+        ]);
+        if (options.onHead) options.onHead(head, manifest);
+
+        // Chunks are requested in parallel but delivered in manifest order
+        for (const [name, dataset] of Object.entries(manifest.datasets)) {
+            const records = [];
+            const pending = dataset.chunks.map((chunk) => this.fetchJson(baseUrl + '/' + chunk.file + query));
+            for (var i = 0; i < pending.length; i++) {
+                const part = await pending[i];
+                records.push(...part);
+                if (options.onChunk) options.onChunk(name, part, dataset.chunks[i]);
+            }
+            this.setPath(head, dataset.path, records);
+        }
+        return head;
+    }
+};
@@ -0,0 +1,50 @@
+/**
+ * NESMA Columnar Decoder v1.0
+ * Decodes columnar-v1 record arrays written by columnar.py back into
+ * plain objects. Dict columns index the shared strings table, date columns
+ * hold day offsets from 1970-01-01.
+ */
+
+const NesmaColumnar = {
+    ENCODING: 'columnar-v1',
+    DAY_MS: 86400000,
+
+    isColumnar(value) {
+        return value !== null && typeof value === 'object' && value.encoding === this.ENCODING;
+    },
+
+    decode(doc) {
+        if (!this.isColumnar(doc)) throw new Error('Unsupported encoding: ' + (doc && doc.encoding));
+
+        const strings = doc.strings;
+        const records = new Array(doc.count);
+        for (var i = 0; i < doc.count; i++) records[i] = {};
+
+        for (const field of doc.fields) {
+            const column = doc.columns[field];
+            const values = column.values;
+            const absent = new Set(column.absent || []);
+
+            for (var j = 0; j < values.length; j++) {
+                if (absent.has(j)) continue;
+                var v = values[j];
+                if (v !== null && column.type === 'dict') {
+                    v = strings[v];
+                } else if (typeof v === 'number' && column.type === 'date') {
+                    v = new Date(v * this.DAY_MS).toISOString().slice(0, 10);
+                }
+                records[j][field] = v;
+            }
+        }
+        return records;
+    },
+
+    // Decode every columnar block found in a dataset, in place
+    decodeAll(data) {
+        if (this.isColumnar(data)) return this.decode(data);
+        if (data !== null && typeof data === 'object' && !Array.isArray(data)) {
+            for (const key of Object.keys(data)) data[key] = this.decodeAll(data[key]);
+        }
+        return data;
+    }
+};
@@ -0,0 +1,57 @@
+/**
+ * NESMA Data Module Loader v1.0
+ * Loads the per-dataset modules in data/js/ (written by sync_smartsheet.py)
+ * on demand, so a dashboard only downloads and parses what it renders.
+ *
+ * Usage:
+ *   NesmaData.load('SLA_DATA').then((sla) => renderKpis(sla));
+ *   NesmaData.loadAll(['PAYMENTS_DATA', 'ORDERS_DATA']).then(([payments, orders]) => ...);
+ */
+
+const NesmaData = {
+    baseUrl: 'data/js/',
+    modules: null,
+    datasets: {},
+    scripts: {},
+
+    // Called by data/js/index.js
+    configure(modules) {
+        this.modules = modules;
+    },
+
+    // Called by each data module
+    register(name, data) {
+        this.datasets[name] = data;
+    },
+
+    loadScript(file) {
+        if (!this.scripts[file]) {
+            this.scripts[file] = new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = this.baseUrl + file;
+                script.async = true;
+                script.onload = () => resolve();
+                script.onerror = () => {
+                    delete this.scripts[file];
+                    reject(new Error('Failed to load ' + this.baseUrl + file));
+                };
+                document.head.appendChild(script);
+            });
+        }
+        return this.scripts[file];
+    },
+
+    async load(name) {
+        if (!this.modules) await this.loadScript('index.js');
+        const module = this.modules[name];
+        if (!module) throw new Error('Unknown dataset: ' + name);
+
+        // Deduplicated datasets point at the module of an identical one
+        if (!(module.name in this.datasets)) await this.loadScript(module.file);
+        return this.datasets[module.name];
+    },
+
+    loadAll(names) {
+        return Promise.all(names.map((name) => this.load(name)));
+    }
+};
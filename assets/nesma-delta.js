@@ -0,0 +1,99 @@
+/**
+ * NESMA Delta Refresh v1.0
+ * Brings a dataset loaded earlier up to date with the delta patches
+ * written by data_delta.py (JSON_DELTAS=1). Only latest.json is fetched
+ * uncached; patches never change once written, so the browser may cache them.
+ * Falls back to a full reload when the patches to bridge the gap are gone.
+ *
+ * Usage:
+ *   data = await NesmaDelta.refresh('warehouse_data', data, 'data/warehouse_data.json');
+ */
+
+const NesmaDelta = {
+    baseUrl: 'data/deltas/',
+
+    async fetchJson(url) {
+        const response = await fetch(url);
+        if (!response.ok) throw new Error('Failed to load ' + url + ': ' + response.status);
+        return response.json();
+    },
+
+    getPath(data, path) {
+        return path.reduce((node, key) => (node == null ? undefined : node[key]), data);
+    },
+
+    setPath(data, path, value) {
+        var node = data;
+        for (var i = 0; i < path.length - 1; i++) {
+            if (node[path[i]] === null || typeof node[path[i]] !== 'object') node[path[i]] = {};
+            node = node[path[i]];
+        }
+        node[path[path.length - 1]] = value;
+    },
+
+    recordKey(record, field) {
+        const key = record[field];
+        return key === undefined || key === null || key === '' ? null : String(key);
+    },
+
+    // Apply one patch in place. Added records are appended, so a client
+    // that relies on file order should re-sort after refreshing.
+    apply(data, patch) {
+        for (const name of Object.keys(patch.records)) {
+            const change = patch.records[name];
+            // Arrays with keyless or duplicate-key records are resent whole
+            if (change.replace) {
+                this.setPath(data, change.path, change.replace);
+                continue;
+            }
+
+            const records = this.getPath(data, change.path) || [];
+            const removed = new Set(change.removed);
+            const changed = new Map();
+            for (const r of change.changed) changed.set(this.recordKey(r, change.key), r);
+
+            const kept = [];
+            for (const r of records) {
+                const key = this.recordKey(r, change.key);
+                // Only the first record with a key is tracked by it
+                if (key !== null && removed.has(key)) {
+                    removed.delete(key);
+                    continue;
+                }
+                if (key !== null && changed.has(key)) {
+                    kept.push(changed.get(key));
+                    changed.delete(key);
+                    continue;
+                }
+                kept.push(r);
+            }
+            this.setPath(data, change.path, kept.concat(change.added));
+        }
+        for (const name of Object.keys(patch.blocks)) {
+            const block = patch.blocks[name];
+            this.setPath(data, block.path, block.value);
+        }
+        data.data_version = patch.version;
+        return data;
+    },
+
+    async refresh(name, data, fullUrl) {
+        const dir = this.baseUrl + name + '/';
+        const latest = await this.fetchJson(dir + 'latest.json?t=' + Date.now());
+        const current = data && data.data_version;
+        if (current === latest.version) return data;
+
+        const needed = [];
+        for (var v = (current || 0) + 1; v <= latest.version; v++) needed.push(v);
+        const available = new Set(latest.patches);
+        if (!current || current > latest.version || !needed.every((v) => available.has(v))) {
+            return this.fetchJson(fullUrl + '?t=' + Date.now());
+        }
+
+        const patches = await Promise.all(
+            needed.map((v) => this.fetchJson(dir + 'v' + String(v).padStart(6, '0') + '.json'))
+        );
+        for (const patch of patches) this.apply(data, patch);
+        return data;
+    }
+};
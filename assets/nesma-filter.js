@@ -0,0 +1,94 @@
+/**
+ * NESMA Filter Index v1.0
+ * Queries the inverted filter indexes (<name>.filters.json) written by
+ * filter_index.py. Each value's rows are decoded once into a bitset, so a
+ * filter combination is a few word-wise OR / AND passes instead of a scan
+ * over every record. Same semantics as filter_index.select_rows: values of
+ * one dimension are OR-ed, dimensions are AND-ed.
+ *
+ * Usage:
+ *   const filters = await NesmaFilter.load('data/pr_data.filters.json');
+ *   const rows = NesmaFilter.select(filters.all_prs, { project: ['X'], status: ['APPROVED'] });
+ *   const visible = rows.map((i) => data.all_prs[i]);
+ */
+
+const NesmaFilter = {
+    async load(url) {
+        const response = await fetch(url + '?t=' + Date.now());
+        if (!response.ok) throw new Error('Failed to load ' + url + ': ' + response.status);
+        const doc = await response.json();
+        return doc.datasets;
+    },
+
+    // Posting list or base64 bitmap -> Uint32Array bitset over count rows
+    toBitset(rows, count) {
+        const words = new Uint32Array((count + 31) >>> 5);
+        if (Array.isArray(rows)) {
+            for (const row of rows) words[row >>> 5] |= 1 << (row & 31);
+            return words;
+        }
+        const bytes = atob(rows.bitmap);
+        for (var i = 0; i < bytes.length; i++) {
+            words[i >>> 2] |= bytes.charCodeAt(i) << ((i & 3) << 3);
+        }
+        return words;
+    },
+
+    valueBitset(index, name, value) {
+        const dimension = index.dimensions[name];
+        if (!dimension) throw new Error('Unknown filter dimension: ' + name);
+        if (!dimension.bitsets) {
+            dimension.bitsets = {};
+            dimension.positions = new Map(dimension.values.map((v, i) => [v, i]));
+        }
+        const position = dimension.positions.get(String(value));
+        if (position === undefined) return null;
+        if (!dimension.bitsets[position]) {
+            dimension.bitsets[position] = this.toBitset(dimension.rows[position], index.count);
+        }
+        return dimension.bitsets[position];
+    },
+
+    select(index, selections) {
+        var result = null;
+        for (const name of Object.keys(selections)) {
+            const accepted = selections[name];
+            if (!accepted || !accepted.length) continue;
+
+            const union = new Uint32Array((index.count + 31) >>> 5);
+            for (const value of accepted) {
+                const bits = this.valueBitset(index, name, value);
+                if (bits) for (var w = 0; w < union.length; w++) union[w] |= bits[w];
+            }
+            if (result === null) {
+                result = union;
+            } else {
+                for (var w = 0; w < result.length; w++) result[w] &= union[w];
+            }
+        }
+
+        const rows = [];
+        for (var row = 0; row < index.count; row++) {
+            if (result === null || (result[row >>> 5] >>> (row & 31)) & 1) rows.push(row);
+        }
+        return rows;
+    },
+
+    // Rows per value of one dimension within the current selection, for facet badges
+    counts(index, name, rows) {
+        const dimension = index.dimensions[name];
+        const selected = this.toBitset(rows, index.count);
+        return dimension.values.map((value) => {
+            const bits = this.valueBitset(index, name, value);
+            var n = 0;
+            for (var w = 0; w < bits.length; w++) {
+                var x = bits[w] & selected[w];
+                while (x) {
+                    x &= x - 1;
+                    n++;
+                }
+            }
+            return n;
+        });
+    }
+};
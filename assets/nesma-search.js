@@ -0,0 +1,115 @@
+/**
+ * NESMA Search Index v1.0
+ * Queries the full-text indexes (<name>.search.json) written by
+ * search_index.py. Normalization and matching mirror search_index.py
+ * exactly, so a query returns the same rows in the browser and in Python:
+ * every query word must occur inside some token of the record's fields.
+ *
+ * Usage:
+ *   const indexes = await NesmaSearch.load('data/pr_data.search.json');
+ *   const rows = NesmaSearch.search(indexes.all_prs, 'كابل tray');
+ *   const hits = rows.map((i) => data.all_prs[i]);
+ *   NesmaSearch.matches(data.all_prs[0], ['description', 'pr_note'], 'كابل tray');
+ */
+
+const NesmaSearch = {
+    ENCODING: 'search-v1',
+    // Harakat, Quranic marks, superscript alef and tatweel
+    ARABIC_MARKS_RE: /[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]/g,
+    ARABIC_LETTERS: {
+        '\u0622': '\u0627', // alef with madda -> alef
+        '\u0623': '\u0627', // alef with hamza above -> alef
+        '\u0625': '\u0627', // alef with hamza below -> alef
+        '\u0671': '\u0627', // alef wasla -> alef
+        '\u0649': '\u064a', // alef maksura -> yaa
+        '\u0629': '\u0647' // taa marbuta -> haa
+    },
+    TOKEN_RE: /[\p{L}\p{N}]+/gu,
+
+    async load(url) {
+        const response = await fetch(url + '?t=' + Date.now());
+        if (!response.ok) throw new Error('Failed to load ' + url + ': ' + response.status);
+        const doc = await response.json();
+        for (const name of Object.keys(doc.datasets)) {
+            if (doc.datasets[name].encoding !== this.ENCODING) {
+                throw new Error('Unsupported encoding: ' + doc.datasets[name].encoding);
+            }
+        }
+        return doc.datasets;
+    },
+
+    normalize(text) {
+        return String(text)
+            .normalize('NFKC')
+            .toLowerCase()
+            .replace(this.ARABIC_MARKS_RE, '')
+            .replace(/[\u0622\u0623\u0625\u0671\u0649\u0629]/g, (ch) => this.ARABIC_LETTERS[ch])
+            .replace(/[\u0660-\u0669]/g, (ch) => String(ch.charCodeAt(0) - 0x0660))
+            .replace(/[\u06f0-\u06f9]/g, (ch) => String(ch.charCodeAt(0) - 0x06f0));
+    },
+
+    tokenize(text) {
+        if (text === null || text === undefined || text === '') return [];
+        return this.normalize(text).match(this.TOKEN_RE) || [];
+    },
+
+    trigrams(token) {
+        const grams = new Set();
+        for (var i = 0; i + 3 <= token.length; i++) grams.add(token.slice(i, i + 3));
+        return [...grams];
+    },
+
+    deltaDecode(gaps) {
+        const ids = new Array(gaps.length);
+        var total = 0;
+        for (var i = 0; i < gaps.length; i++) ids[i] = total += gaps[i];
+        return ids;
+    },
+
+    matchingTokens(index, word) {
+        const tokens = index.tokens;
+        if (word.length < 3) {
+            // Too short for trigrams, match as a prefix
+            var lo = 0;
+            var hi = tokens.length;
+            while (lo < hi) {
+                const mid = (lo + hi) >>> 1;
+                if (tokens[mid] < word) lo = mid + 1;
+                else hi = mid;
+            }
+            const ids = [];
+            for (var i = lo; i < tokens.length && tokens[i].startsWith(word); i++) ids.push(i);
+            return ids;
+        }
+
+        var candidates = null;
+        for (const gram of this.trigrams(word)) {
+            const ids = new Set(this.deltaDecode(index.trigrams[gram] || []));
+            candidates = candidates === null ? ids : new Set([...candidates].filter((id) => ids.has(id)));
+            if (!candidates.size) return [];
+        }
+        return [...candidates].filter((id) => tokens[id].includes(word)).sort((a, b) => a - b);
+    },
+
+    search(index, query) {
+        var result = null;
+        for (const word of new Set(this.tokenize(query))) {
+            const rows = new Set();
+            for (const id of this.matchingTokens(index, word)) {
+                for (const row of this.deltaDecode(index.rows[id])) rows.add(row);
+            }
+            result = result === null ? rows : new Set([...result].filter((row) => rows.has(row)));
+            if (!result.size) return [];
+        }
+        return result === null ? [] : [...result].sort((a, b) => a - b);
+    },
+
+    // Same match as search() for one record, for records loaded without an
+    // index that lines up with them (e.g. from chunks)
+    matches(record, fields, query) {
+        const tokens = fields.flatMap((field) => this.tokenize(record[field]));
+        return this.tokenize(query).every((word) =>
+            tokens.some((token) => (word.length < 3 ? token.startsWith(word) : token.includes(word)))
+        );
+    }
+};
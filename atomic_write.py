@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Atomic file replacement for sync outputs
+Files are written to a temp file in the same directory and renamed into
+place, so GitHub Pages (or a dashboard polling the file) never sees a
+half-written file.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Called with the path of every file written, see run_metrics
+WRITE_HOOKS = []
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a temp path that replaces path once the block succeeds
+
+    If the block removes the temp file, path is left untouched.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        yield tmp_path
+        if not os.path.exists(tmp_path):
+            return
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        # mkstemp creates the file 0600, use normal permissions for outputs
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        for hook in WRITE_HOOKS:
+            hook(path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def atomic_open(path, mode="w"):
+    """open() replacement that writes path atomically"""
+    with atomic_path(path) as tmp_path:
+        if "b" in mode:
+            f = open(tmp_path, mode)
+        else:
+            f = open(tmp_path, mode, encoding="utf-8")
+        with f:
+            yield f
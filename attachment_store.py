@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Content-addressed local store for Smartsheet row attachments
+Attachment files are downloaded concurrently (ATTACHMENT_WORKERS threads)
+and saved under ATTACHMENT_STORE_DIR as <sha256><ext>, so identical files
+attached to several rows are stored once. index.json remembers each
+attachment id's size and content hash; an attachment whose id and size
+are unchanged and whose stored file still matches its hash is not
+downloaded again. Stored files no longer referenced by any attachment are
+removed; anything else in the directory is left alone.
+"""
+
+import os
+import re
+import sys
+import json
+import hashlib
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from atomic_write import atomic_open
+from run_metrics import count
+
+# Configuration
+ATTACHMENT_STORE_DIR = os.environ.get(
+    "ATTACHMENT_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "attachments", "store"),
+)
+ATTACHMENT_WORKERS = int(os.environ.get("ATTACHMENT_WORKERS", "8"))
+DOWNLOAD_TIMEOUT = 120
+CHUNK_SIZE = 256 * 1024
+INDEX_NAME = "index.json"
+# <sha256><ext> names written by download, the only files cleanup removes
+BLOB_NAME_RE = re.compile(r"[0-9a-f]{64}(\.[^./\\]*)?")
+
+
+def file_hash(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def blob_name(digest, name):
+    """Store file name of a content hash, keeping the original extension"""
+    return digest + os.path.splitext(name or "")[1].lower()
+
+
+def relative_path(path):
+    """Path of a stored file relative to the repository root, for the dashboards"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    return os.path.relpath(os.path.abspath(path), root).replace(os.sep, "/")
+
+
+def load_index():
+    """{attachment id: entry} of previously stored attachments"""
+    path = os.path.join(ATTACHMENT_STORE_DIR, INDEX_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("attachments", {})
+
+
+def is_current(entry, attachment):
+    """True if a stored entry still holds this attachment's file"""
+    if not entry or entry.get("size") != attachment.get("size"):
+        return False
+    path = os.path.join(ATTACHMENT_STORE_DIR, entry["file"])
+    return os.path.exists(path) and file_hash(path) == entry["sha256"]
+
+
+def download(client, attachment):
+    """
+    Fetch one attachment into the store
+
+    Returns its index entry. The file is streamed into a temp file while
+    hashing and renamed to its content-addressed name, or dropped if that
+    content is already stored.
+    """
+    # The attachment listing has no URL; get_attachment returns a short-lived one
+    url = client.Attachments.get_attachment(
+        attachment["sheet_id"], attachment["id"]
+    ).url
+    digest = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=ATTACHMENT_STORE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f, requests.get(
+            url, stream=True, timeout=DOWNLOAD_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+            count("bytes_in", f.tell())
+        name = blob_name(digest.hexdigest(), attachment["name"])
+        path = os.path.join(ATTACHMENT_STORE_DIR, name)
+        if not os.path.exists(path):
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "name": attachment["name"],
+        "size": attachment.get("size"),
+        "sha256": digest.hexdigest(),
+        "file": name,
+        "fetched": datetime.now().isoformat(),
+    }
+
+
+def sync_attachments(client, attachments):
+    """
+    Make local copies of file attachments
+
+    attachments are dicts with 'id', 'name' and 'size' (as exported from the
+    sheet rows) and the 'sheet_id' of the sheet they are attached to.
+    Returns {attachment id: repository-relative path}; an attachment that
+    could not be downloaded is missing from the result.
+    """
+    os.makedirs(ATTACHMENT_STORE_DIR, exist_ok=True)
+    index = load_index()
+    wanted = {str(a["id"]): a for a in attachments}
+
+    entries = {}
+    pending = []
+    for key, attachment in wanted.items():
+        if is_current(index.get(key), attachment):
+            entries[key] = index[key]
+        else:
+            pending.append(attachment)
+
+    print(f"   Attachments: {len(entries)} unchanged, {len(pending)} to download")
+    if pending:
+        workers = max(1, min(ATTACHMENT_WORKERS, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                str(a["id"]): pool.submit(download, client, a)
+                for a in pending
+            }
+            for key, future in futures.items():
+                try:
+                    entries[key] = future.result()
+                except Exception as e:
+                    print(f"   WARNING: attachment {wanted[key]['name']} not downloaded: {e}")
+                    # Keep serving the previous copy if there is one
+                    if key in index:
+                        entries[key] = index[key]
+
+    # Stored files referenced by no attachment any more
+    referenced = {entry["file"] for entry in entries.values()}
+    for name in os.listdir(ATTACHMENT_STORE_DIR):
+        path = os.path.join(ATTACHMENT_STORE_DIR, name)
+        if (
+            name not in referenced
+            and BLOB_NAME_RE.fullmatch(name)
+            and os.path.isfile(path)
+            and not os.path.islink(path)
+        ):
+            os.remove(path)
+
+    with atomic_open(os.path.join(ATTACHMENT_STORE_DIR, INDEX_NAME)) as f:
+        json.dump(
+            {"updated": datetime.now().isoformat(), "attachments": entries},
+            f,
+            indent=2,
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+
+    print(f"   Attachment store: {len(referenced)} files for {len(entries)} attachments")
+    return {
+        key: relative_path(os.path.join(ATTACHMENT_STORE_DIR, entry["file"]))
+        for key, entry in entries.items()
+    }
+
+
+def stored_paths(attachments):
+    """
+    {attachment id: repository-relative path} of attachments already stored
+
+    Like sync_attachments, but without downloading or pruning anything
+    (used when sheets are replayed offline, see sheet_sources.py).
+    """
+    index = load_index()
+    return {
+        str(a["id"]): relative_path(
+            os.path.join(ATTACHMENT_STORE_DIR, index[str(a["id"])]["file"])
+        )
+        for a in attachments
+        if str(a["id"]) in index
+    }
+
+
+def main(argv):
+    """Verify the stored files against index.json"""
+    index = load_index()
+    bad = 0
+    for key, entry in sorted(index.items()):
+        path = os.path.join(ATTACHMENT_STORE_DIR, entry["file"])
+        if not os.path.exists(path) or file_hash(path) != entry["sha256"]:
+            print(f"{key} {entry['name']}: missing or corrupt ({entry['file']})")
+            bad += 1
+    files = len({entry["file"] for entry in index.values()})
+    print(f"{len(index)} attachments, {files} files, {bad} bad")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
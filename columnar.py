@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Columnar (struct-of-arrays) encoding for record datasets
+Strings are dictionary-encoded against one shared lookup table and
+YYYY-MM-DD dates are stored as day offsets from 1970-01-01.
+The matching browser decoder lives in assets/nesma-columnar.js.
+"""
+
+import re
+import sys
+import json
+from datetime import date
+
+ENCODING = "columnar-v1"
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def column_type(values):
+    """Pick raw, date or dict encoding for a column"""
+    present = [v for v in values if v is not None]
+    if not present or not all(isinstance(v, str) for v in present):
+        return "raw"
+    dates = [v for v in present if v != ""]
+    if dates and all(DATE_RE.match(v) for v in dates):
+        try:
+            for v in dates:
+                date.fromisoformat(v)
+            return "date"
+        except ValueError:
+            pass
+    return "dict"
+
+
+def encode_columnar(records):
+    """Encode a list of flat dicts into per-field arrays"""
+    fields = []
+    seen = set()
+    for r in records:
+        for key in r:
+            if key not in seen:
+                seen.add(key)
+                fields.append(key)
+
+    strings = []
+    string_ids = {}
+    columns = {}
+
+    for field in fields:
+        values = [r.get(field) for r in records]
+        kind = column_type(values)
+
+        if kind == "dict":
+            encoded = []
+            for v in values:
+                if v is None:
+                    encoded.append(None)
+                    continue
+                if v not in string_ids:
+                    string_ids[v] = len(strings)
+                    strings.append(v)
+                encoded.append(string_ids[v])
+        elif kind == "date":
+            # Blank strings stay as-is, the decoder passes non-numbers through
+            encoded = [
+                date.fromisoformat(v).toordinal() - EPOCH_ORDINAL if v else v
+                for v in values
+            ]
+        else:
+            encoded = values
+
+        column = {"type": kind, "values": encoded}
+        absent = [i for i, r in enumerate(records) if field not in r]
+        if absent:
+            column["absent"] = absent
+        columns[field] = column
+
+    return {
+        "encoding": ENCODING,
+        "count": len(records),
+        "fields": fields,
+        "strings": strings,
+        "columns": columns,
+    }
+
+
+def decode_columnar(doc):
+    """Decode a columnar document back into a list of dicts"""
+    if doc.get("encoding") != ENCODING:
+        raise ValueError(f"Unsupported encoding: {doc.get('encoding')}")
+
+    strings = doc["strings"]
+    records = [{} for _ in range(doc["count"])]
+
+    for field in doc["fields"]:
+        column = doc["columns"][field]
+        kind = column["type"]
+        absent = set(column.get("absent", []))
+
+        for i, v in enumerate(column["values"]):
+            if i in absent:
+                continue
+            if v is not None and kind == "dict":
+                v = strings[v]
+            elif isinstance(v, int) and kind == "date":
+                v = date.fromordinal(v + EPOCH_ORDINAL).isoformat()
+            records[i][field] = v
+
+    return records
+
+
+def is_columnar(value):
+    """True if value is an encoded columnar document"""
+    return isinstance(value, dict) and value.get("encoding") == ENCODING
+
+
+def main(paths):
+    """Report raw vs columnar size for the record arrays in JSON files"""
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        candidates = {"records": data.get("records"), "all_prs": data.get("all_prs")}
+        if isinstance(data.get("records"), dict):
+            candidates = {f"records.{k}": v for k, v in data["records"].items()}
+
+        for name, records in candidates.items():
+            if not isinstance(records, list) or not records:
+                continue
+            raw = len(json.dumps(records, ensure_ascii=False, separators=(",", ":")))
+            doc = encode_columnar(records)
+            encoded = len(json.dumps(doc, ensure_ascii=False, separators=(",", ":")))
+            assert decode_columnar(doc) == records
+            print(
+                f"{path} {name}: {len(records)} rows, "
+                f"{raw / 1024:.1f} KB -> {encoded / 1024:.1f} KB "
+                f"({encoded / raw * 100:.0f}%)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,19 @@
+// NESMA Supply Chain Management - data module index
+NesmaData.configure({
+  "SLA_DATA": {
+    "file": "sla_data.js",
+    "name": "SLA_DATA"
+  },
+  "TRANSPORTATION_DATA": {
+    "file": "sla_data.js",
+    "name": "SLA_DATA"
+  },
+  "PAYMENTS_DATA": {
+    "file": "payments_data.js",
+    "name": "PAYMENTS_DATA"
+  },
+  "ORDERS_DATA": {
+    "file": "orders_data.js",
+    "name": "ORDERS_DATA"
+  }
+});
@@ -0,0 +1,270 @@
+// NESMA Supply Chain Management - PAYMENTS_DATA
+// Auto-synced from Smartsheet, loaded on demand by assets/nesma-data.js
+// Last updated: 2026-10-19 13:25:43 UTC
+
+(function () {
+NesmaData.register('PAYMENTS_DATA', {
+  "summary": {
+    "total_invoices": 1177,
+    "paid_invoices": 1118,
+    "pending_invoices": 0,
+    "other_status": 59,
+    "total_amount": 13867425.6,
+    "avg_completion_days": 2.8,
+    "avg_payment_cycle": 0,
+    "avg_invoice_receive": 0,
+    "payment_rate": 95.0,
+    "last_update": "2026-01-05"
+  },
+  "payment_status": {
+    "Paid": 1118,
+    "Pending Approval": 0,
+    "Other": 59
+  },
+  "suppliers": {
+    "Construction Pioneer": 315,
+    "Awtad Alsharq": 279,
+    "AMANE CO": 163,
+    "Sana CO": 107,
+    "Al-Buraq CO": 98,
+    "Almamorah CO": 73,
+    "FIFO Transportation": 30,
+    "BIN MASHHURE": 29,
+    "Rowaya Al Badia": 22,
+    "Zad Al-Omran": 19,
+    "Alhai Alsaed": 17,
+    "Across The Desert": 10,
+    "Rowaya al badia": 6,
+    "SIC": 4,
+    "NIT": 2
+  },
+  "projects": {
+    "NIT": 133,
+    "Jafurah": 108,
+    "ALMURJAN": 83,
+    "Al Sharafiyah": 79,
+    "NIC-EV2": 77,
+    "KSP": 74,
+    "Al Hamdania": 48,
+    "ZATCA": 48,
+    "Diriyah": 39,
+    "Haram": 34,
+    "NEOM": 29,
+    "NIC-NORTH": 21,
+    "Buhaiyrat": 20,
+    "JEC": 20,
+    "Rabigh": 20,
+    "PSSA": 19,
+    "Taiba": 19,
+    "Bayouniah": 18,
+    "Aljazeera Royal Palace": 17,
+    "NAF": 16
+  },
+  "equipment_requested": {
+    "Boom Truck 10 Ton": 60,
+    "Diyanna": 53,
+    "Diyanna & Labors": 51,
+    "Forklift 3 Ton": 43,
+    "Forklift 10 Ton": 39,
+    "Crane 50 Ton": 38,
+    "Boom Truck 5 Ton": 27,
+    "Forklift 7 Ton": 22,
+    "Forklift 5 Ton": 21,
+    "Boom Truck": 20,
+    "Trella": 19,
+    "Forklift 10 Ton monthly reats": 19,
+    "BOOM TRUCK 10 Ton": 17,
+    "Trellas": 15,
+    "Crane 25 Ton": 13
+  },
+  "requesters": {
+    "M.Safdr": 61,
+    "Dia Saleh": 60,
+    "Mohammed Taha": 56,
+    "Baher": 44,
+    "Safder": 42,
+    "Tasawour": 40,
+    "Khurram Abbas": 30,
+    "Amir": 30,
+    "Ahmed Shaaban": 24,
+    "Ahmed": 23
+  },
+  "monthly_trend": [
+    {
+      "month": "2023-01",
+      "invoices": 15,
+      "amount": 140300.0
+    },
+    {
+      "month": "2023-02",
+      "invoices": 16,
+      "amount": 75500.0
+    },
+    {
+      "month": "2023-03",
+      "invoices": 7,
+      "amount": 15000.0
+    },
+    {
+      "month": "2023-04",
+      "invoices": 5,
+      "amount": 113100.0
+    },
+    {
+      "month": "2023-05",
+      "invoices": 13,
+      "amount": 92700.0
+    },
+    {
+      "month": "2023-06",
+      "invoices": 15,
+      "amount": 167800.0
+    },
+    {
+      "month": "2023-07",
+      "invoices": 16,
+      "amount": 238800.0
+    },
+    {
+      "month": "2023-08",
+      "invoices": 19,
+      "amount": 446900.0
+    },
+    {
+      "month": "2023-09",
+      "invoices": 34,
+      "amount": 273405.0
+    },
+    {
+      "month": "2023-10",
+      "invoices": 39,
+      "amount": 460823.85
+    },
+    {
+      "month": "2023-11",
+      "invoices": 49,
+      "amount": 1257723.17
+    },
+    {
+      "month": "2023-12",
+      "invoices": 40,
+      "amount": 540652.5
+    },
+    {
+      "month": "2024-01",
+      "invoices": 30,
+      "amount": 410820.0
+    },
+    {
+      "month": "2024-02",
+      "invoices": 18,
+      "amount": 293543.75
+    },
+    {
+      "month": "2024-03",
+      "invoices": 28,
+      "amount": 230575.0
+    },
+    {
+      "month": "2024-04",
+      "invoices": 26,
+      "amount": 199883.75
+    },
+    {
+      "month": "2024-05",
+      "invoices": 41,
+      "amount": 297300.0
+    },
+    {
+      "month": "2024-06",
+      "invoices": 59,
+      "amount": 437300.0
+    },
+    {
+      "month": "2024-07",
+      "invoices": 65,
+      "amount": 735720.1
+    },
+    {
+      "month": "2024-08",
+      "invoices": 43,
+      "amount": 556400.0
+    },
+    {
+      "month": "2024-09",
+      "invoices": 50,
+      "amount": 808929.0
+    },
+    {
+      "month": "2024-10",
+      "invoices": 63,
+      "amount": 527645.0
+    },
+    {
+      "month": "2024-11",
+      "invoices": 46,
+      "amount": 957235.46
+    },
+    {
+      "month": "2024-12",
+      "invoices": 48,
+      "amount": 691499.59
+    },
+    {
+      "month": "2025-01",
+      "invoices": 55,
+      "amount": 622810.0
+    },
+    {
+      "month": "2025-02",
+      "invoices": 36,
+      "amount": 548445.8300000001
+    },
+    {
+      "month": "2025-03",
+      "invoices": 22,
+      "amount": 295344.69
+    },
+    {
+      "month": "2025-04",
+      "invoices": 40,
+      "amount": 555326.59
+    },
+    {
+      "month": "2025-05",
+      "invoices": 49,
+      "amount": 434065.08
+    },
+    {
+      "month": "2025-06",
+      "invoices": 54,
+      "amount": 380937.17
+    },
+    {
+      "month": "2025-07",
+      "invoices": 76,
+      "amount": 732497.76
+    },
+    {
+      "month": "2025-08",
+      "invoices": 34,
+      "amount": 202172.31
+    },
+    {
+      "month": "2025-09",
+      "invoices": 20,
+      "amount": 103420.0
+    },
+    {
+      "month": "2025-10",
+      "invoices": 3,
+      "amount": 13500.0
+    },
+    {
+      "month": "2025-11",
+      "invoices": 3,
+      "amount": 9350.0
+    }
+  ]
+});
+})();
@@ -0,0 +1,309 @@
+// NESMA Supply Chain Management - SLA_DATA
+// Auto-synced from Smartsheet, loaded on demand by assets/nesma-data.js
+// Last updated: 2026-10-19 13:25:43 UTC
+
+(function () {
+var block0 = {
+  "Jafurah": 2934508.22,
+  "ZATCA": 1966802.7,
+  "NIC-EV2": 1336841.9500000002,
+  "ALMURJAN": 764238.0,
+  "NIT": 574608.0,
+  "PSSA": 515313.38,
+  "Aljazeera Royal Palace": 507892.17,
+  "KSP": 506376.25,
+  "Haram": 499201.49,
+  "NIC-NORTH": 422492.6,
+  "Al Sharafiyah": 416486.25,
+  "NEOM": 322400.0,
+  "Al Hamdania": 321395.0,
+  "Hafar Albatin": 230184.59,
+  "Diriyah": 214630.0,
+  "Taiba": 189520.0,
+  "Rabigh": 164525.0,
+  "Makkah": 149150.0,
+  "Albahr": 148740.0,
+  "Wadi Dahran": 126300.0
+};
+var block1 = {
+  "Boom Truck 10 Ton": 60,
+  "Diyanna": 53,
+  "Diyanna & Labors": 51,
+  "Forklift 3 Ton": 44,
+  "Forklift 10 Ton": 39,
+  "Crane 50 Ton": 38,
+  "Boom Truck 5 Ton": 27,
+  "Forklift 7 Ton": 22,
+  "Forklift 5 Ton": 21,
+  "Boom Truck": 20,
+  "Trella": 19,
+  "Forklift 10 Ton monthly reats": 19,
+  "BOOM TRUCK 10 Ton": 17,
+  "Trellas": 15,
+  "Crane 25 Ton": 13
+};
+NesmaData.register('SLA_DATA', {
+  "summary": {
+    "total_orders": 1182,
+    "done_orders": 1177,
+    "in_progress_orders": 0,
+    "not_done_orders": 5,
+    "on_time_rate": 83.09,
+    "total_amount": 13867425.6,
+    "avg_duration": 2.8,
+    "median_duration": 1.0,
+    "p90_duration": 5.0,
+    "open_orders": 5,
+    "last_update": "2026-01-05"
+  },
+  "status": {
+    "Done": 1177,
+    "In Progress": 0,
+    "Not Done": 5
+  },
+  "top_suppliers": {
+    "Construction Pioneer": 315,
+    "Awtad Alsharq": 279,
+    "AMANE CO": 163,
+    "Sana CO": 107,
+    "Al-Buraq CO": 98,
+    "Almamorah CO": 73,
+    "FIFO Transportation": 30,
+    "BIN MASHHURE": 30,
+    "Rowaya Al Badia": 22,
+    "Zad Al-Omran": 19
+  },
+  "suppliers": {
+    "Awtad Alsharq": 3303888.970000001,
+    "Construction Pioneer": 2970087.0,
+    "Almamorah CO": 1684706.45,
+    "Sana CO": 1626106.25,
+    "AMANE CO": 1603444.2400000002,
+    "Al-Buraq CO": 1523585.0,
+    "BIN MASHHURE": 566400.0,
+    "FIFO Transportation": 171600.0,
+    "Rowaya Al Badia": 103550.0,
+    "Alhai Alsaed": 102100.0
+  },
+  "top_projects": block0,
+  "projects_orders": {
+    "NIT": 133,
+    "Jafurah": 109,
+    "ALMURJAN": 83,
+    "Al Sharafiyah": 79,
+    "NIC-EV2": 77,
+    "KSP": 74,
+    "Al Hamdania": 48,
+    "ZATCA": 48,
+    "Diriyah": 39,
+    "Haram": 34,
+    "NEOM": 31,
+    "NIC-NORTH": 21,
+    "Buhaiyrat": 20,
+    "JEC": 20,
+    "Rabigh": 20,
+    "PSSA": 19,
+    "Taiba": 19,
+    "Bayouniah": 18,
+    "NAF": 18,
+    "Aljazeera Royal Palace": 17
+  },
+  "projects_amounts": block0,
+  "equipment_distribution": block1,
+  "equipment_count": block1,
+  "equipment_cost": {
+    "Crane 50 Ton": 656589.62,
+    "Forklift 10 Ton monthly reats": 545040.1799999999,
+    "Boom Truck 10 Ton": 521635.39999999997,
+    "Forklift 10 Ton": 509080.33,
+    "2 manlift monthly reats": 412432.0,
+    "DEANA LORRY": 297900.0,
+    "Boom Truck 10 Ton Monthly rental": 283258.34,
+    "Trellas": 264300.0,
+    "CRANE 50 Ton": 256150.0,
+    "Diyanna & Labors": 252430.0,
+    "Forklift 3 Ton": 250816.1,
+    "Diyanna": 193700.0,
+    "Forklift 7 Ton": 183345.0,
+    "CRANE 50 Tonwith trailer": 177350.0,
+    "Crane 50 Ton monthly rates": 169701.0
+  },
+  "monthly_trend": [
+    {
+      "month": "2023-01",
+      "orders": 16,
+      "amount": 140300.0
+    },
+    {
+      "month": "2023-02",
+      "orders": 17,
+      "amount": 75500.0
+    },
+    {
+      "month": "2023-03",
+      "orders": 8,
+      "amount": 15000.0
+    },
+    {
+      "month": "2023-04",
+      "orders": 6,
+      "amount": 113100.0
+    },
+    {
+      "month": "2023-05",
+      "orders": 14,
+      "amount": 92700.0
+    },
+    {
+      "month": "2023-06",
+      "orders": 15,
+      "amount": 167800.0
+    },
+    {
+      "month": "2023-07",
+      "orders": 16,
+      "amount": 238800.0
+    },
+    {
+      "month": "2023-08",
+      "orders": 19,
+      "amount": 446900.0
+    },
+    {
+      "month": "2023-09",
+      "orders": 34,
+      "amount": 273405.0
+    },
+    {
+      "month": "2023-10",
+      "orders": 39,
+      "amount": 460823.85
+    },
+    {
+      "month": "2023-11",
+      "orders": 49,
+      "amount": 1257723.17
+    },
+    {
+      "month": "2023-12",
+      "orders": 40,
+      "amount": 540652.5
+    },
+    {
+      "month": "2024-01",
+      "orders": 30,
+      "amount": 410820.0
+    },
+    {
+      "month": "2024-02",
+      "orders": 18,
+      "amount": 293543.75
+    },
+    {
+      "month": "2024-03",
+      "orders": 28,
+      "amount": 230575.0
+    },
+    {
+      "month": "2024-04",
+      "orders": 26,
+      "amount": 199883.75
+    },
+    {
+      "month": "2024-05",
+      "orders": 41,
+      "amount": 297300.0
+    },
+    {
+      "month": "2024-06",
+      "orders": 59,
+      "amount": 437300.0
+    },
+    {
+      "month": "2024-07",
+      "orders": 65,
+      "amount": 735720.1
+    },
+    {
+      "month": "2024-08",
+      "orders": 43,
+      "amount": 556400.0
+    },
+    {
+      "month": "2024-09",
+      "orders": 50,
+      "amount": 808929.0
+    },
+    {
+      "month": "2024-10",
+      "orders": 63,
+      "amount": 527645.0
+    },
+    {
+      "month": "2024-11",
+      "orders": 46,
+      "amount": 957235.46
+    },
+    {
+      "month": "2024-12",
+      "orders": 48,
+      "amount": 691499.59
+    },
+    {
+      "month": "2025-01",
+      "orders": 55,
+      "amount": 622810.0
+    },
+    {
+      "month": "2025-02",
+      "orders": 36,
+      "amount": 548445.8300000001
+    },
+    {
+      "month": "2025-03",
+      "orders": 22,
+      "amount": 295344.69
+    },
+    {
+      "month": "2025-04",
+      "orders": 40,
+      "amount": 555326.59
+    },
+    {
+      "month": "2025-05",
+      "orders": 49,
+      "amount": 434065.08
+    },
+    {
+      "month": "2025-06",
+      "orders": 54,
+      "amount": 380937.17
+    },
+    {
+      "month": "2025-07",
+      "orders": 76,
+      "amount": 732497.76
+    },
+    {
+      "month": "2025-08",
+      "orders": 34,
+      "amount": 202172.31
+    },
+    {
+      "month": "2025-09",
+      "orders": 20,
+      "amount": 103420.0
+    },
+    {
+      "month": "2025-10",
+      "orders": 3,
+      "amount": 13500.0
+    },
+    {
+      "month": "2025-11",
+      "orders": 3,
+      "amount": 9350.0
+    }
+  ]
+});
+})();
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Versioned delta patches between syncs
+Set JSON_DELTAS=1 to enable. For every dataset, each sync that changes
+something writes data/deltas/<name>/v<N>.json with the records added,
+changed and removed (by key) and the non-record blocks that changed, and
+updates latest.json. Timestamps (VOLATILE_KEYS, at any depth) do not
+count as changes. assets/nesma-delta.js applies the patches in the
+browser, so a client holding version N only fetches N+1..latest.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+from atomic_write import atomic_open
+
+# Configuration
+JSON_DELTAS = os.environ.get("JSON_DELTAS", "").strip().lower() in ("1", "true", "yes")
+DELTA_DIR = os.environ.get(
+    "JSON_DELTA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "deltas"),
+)
+DELTA_HISTORY = int(os.environ.get("JSON_DELTA_HISTORY", "50"))
+VOLATILE_KEYS = {"last_updated", "last_update", "data_version"}
+
+
+def short_hash(value):
+    """Short content hash of a JSON-serializable value"""
+    text = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def without_volatile(value):
+    """value with the VOLATILE_KEYS removed at every depth"""
+    if isinstance(value, dict):
+        return {k: without_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [without_volatile(v) for v in value]
+    return value
+
+
+def iter_blocks(data, record_paths, prefix=()):
+    """Yield (path, value) for every non-record block of a dataset"""
+    for key, value in data.items():
+        path = prefix + (key,)
+        if key in VOLATILE_KEYS or path in record_paths:
+            continue
+        nested = [p for p in record_paths if p[: len(path)] == path and len(p) > len(path)]
+        if nested and isinstance(value, dict):
+            yield from iter_blocks(value, record_paths, path)
+        else:
+            yield path, value
+
+
+def keyed_records(records, key_field):
+    """Map record key -> record, keyless and repeated keys use the content hash"""
+    keyed = {}
+    for record in records:
+        key = record.get(key_field) if isinstance(record, dict) else None
+        key = str(key) if key not in (None, "") else None
+        if key is None or key in keyed:
+            key = f"#{short_hash(record)}"
+        keyed[key] = record
+    return keyed
+
+
+def write_file(path, data):
+    """Write a compact JSON file atomically"""
+    with atomic_open(path, "w") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def load_json(path, default):
+    """Read a JSON file, default if it is missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def diff_delta(path, data, record_keys):
+    """
+    Diff a dataset against the previous sync
+
+    record_keys maps each record array (a tuple of keys) to the field that
+    identifies a record, e.g. {("records",): "job_order_no"}. Returns the
+    pending delta, whose "version" is the dataset's version after this
+    sync, or None when deltas are disabled. Nothing is written until the
+    delta is passed to write_delta.
+    """
+    if not JSON_DELTAS:
+        return None
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    out_dir = os.path.join(DELTA_DIR, name)
+    state = load_json(
+        os.path.join(out_dir, "state.json"), {"version": 0, "records": {}, "blocks": {}}
+    )
+    patch = {"records": {}, "blocks": {}}
+    new_state = {"records": {}, "blocks": {}}
+
+    for key_path, key_field in record_keys.items():
+        node = data
+        for key in key_path:
+            node = node.get(key) if isinstance(node, dict) else None
+        if not isinstance(node, list):
+            continue
+
+        name_key = ".".join(key_path)
+        old_hashes = state["records"].get(name_key, {})
+        records = keyed_records(node, key_field)
+        hashes = {k: short_hash(r) for k, r in records.items()}
+
+        added = [records[k] for k in hashes if k not in old_hashes]
+        changed = [
+            records[k] for k, h in hashes.items() if k in old_hashes and old_hashes[k] != h
+        ]
+        removed = [k for k in old_hashes if k not in hashes]
+        if any(k.startswith("#") for k in removed) or any(
+            k.startswith("#") for k in hashes if k not in old_hashes
+        ):
+            # Keyless or duplicate-key records cannot be matched up, resend the array
+            patch["records"][name_key] = {
+                "path": list(key_path),
+                "key": key_field,
+                "replace": node,
+            }
+        elif added or changed or removed:
+            patch["records"][name_key] = {
+                "path": list(key_path),
+                "key": key_field,
+                "added": added,
+                "changed": changed,
+                "removed": removed,
+            }
+        new_state["records"][name_key] = hashes
+
+    for block_path, value in iter_blocks(data, set(record_keys)):
+        block_name = ".".join(block_path)
+        # A block whose only change is e.g. metadata.last_update is unchanged
+        digest = short_hash(without_volatile(value))
+        if state["blocks"].get(block_name) != digest:
+            patch["blocks"][block_name] = {"path": list(block_path), "value": value}
+        new_state["blocks"][block_name] = digest
+
+    changed = bool(patch["records"] or patch["blocks"])
+    return {
+        "dir": out_dir,
+        "from": state["version"],
+        "version": state["version"] + 1 if changed else state["version"],
+        "patch": patch if changed else None,
+        "state": new_state,
+    }
+
+
+def write_delta(path, delta):
+    """
+    Write the patch of a delta from diff_delta and advance latest.json
+
+    Called once the dataset file itself has been written, so clients are
+    never pointed at a version that was not published. Returns the version.
+    """
+    version = delta["version"]
+    patch = delta["patch"]
+    if patch is None:
+        return version
+
+    out_dir = delta["dir"]
+    os.makedirs(out_dir, exist_ok=True)
+    # The first sync has nothing to diff against, clients load the full file
+    if delta["from"] > 0:
+        write_file(
+            os.path.join(out_dir, f"v{version:06d}.json"),
+            {"version": version, "from": delta["from"], **patch},
+        )
+
+    latest_path = os.path.join(out_dir, "latest.json")
+    latest = load_json(latest_path, {"patches": []})
+    patches = latest["patches"] + ([version] if delta["from"] > 0 else [])
+    for old in patches[:-DELTA_HISTORY]:
+        old_path = os.path.join(out_dir, f"v{old:06d}.json")
+        if os.path.exists(old_path):
+            os.remove(old_path)
+    patches = patches[-DELTA_HISTORY:]
+
+    write_file(
+        latest_path,
+        {
+            "version": version,
+            "source": os.path.basename(path),
+            "updated": datetime.now().isoformat(),
+            "patches": patches,
+        },
+    )
+    write_file(os.path.join(out_dir, "state.json"), {"version": version, **delta["state"]})
+
+    summary = ", ".join(
+        f"{k} replaced"
+        if "replace" in v
+        else f"{k} +{len(v['added'])}/~{len(v['changed'])}/-{len(v['removed'])}"
+        for k, v in patch["records"].items()
+    )
+    print(f"  - delta v{version}: {summary or 'blocks only'}, {len(patch['blocks'])} blocks")
+    return version
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Shared JSON output helpers for the sync and export scripts
+Set JSON_OUTPUT_MODE=compact to write minified JSON with .gz/.br siblings
+Set JSON_CHUNK_SIZE=N to also split large record arrays into chunk files
+Set JSON_RECORD_ENCODING=columnar to also write a columnar-encoded sibling
+Set JSON_DELTAS=1 to also write versioned delta patches, see data_delta
+Record arrays given filter dimensions also get a .filters.json index
+Record arrays given search fields also get a .search.json full-text index
+Set RECORDS_DB=path to also upsert record arrays into a SQLite database, see records_db
+Encoding and writing are timed as the serialize / write stages, see run_metrics
+
+Output is streamed piece by piece, written atomically, and skipped when
+the content, ignoring volatile timestamps such as last_updated, is the
+same as the file on disk.
+"""
+
+import os
+import sys
+import re
+import json
+import gzip
+import hashlib
+from itertools import islice
+
+from arrow_export import write_arrow
+from atomic_write import atomic_open, atomic_path
+from columnar import encode_columnar
+from data_delta import diff_delta, write_delta
+from records_db import write_records_db
+from filter_index import build_filter_index
+from search_index import build_search_index
+from run_metrics import count, stage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configuration
+JSON_OUTPUT_MODE = os.environ.get("JSON_OUTPUT_MODE", "pretty").strip().lower()
+COMPACT_SEPARATORS = (",", ":")
+INDENT = "  "
+COPY_BLOCK_SIZE = 1024 * 1024
+# Text pieces joined per file write
+PIECES_PER_WRITE = 4096
+JSON_CHUNK_SIZE = int(os.environ.get("JSON_CHUNK_SIZE", "0") or 0)
+JSON_RECORD_ENCODING = os.environ.get("JSON_RECORD_ENCODING", "").strip().lower()
+VOLATILE_KEYS = {"last_updated", "last_update"}
+VOLATILE_TEXT_RE = re.compile(
+    r'("last_updated?"\s*:\s*)"[^"]*"|(// Last updated:)[^\n]*'
+)
+CHUNK_FILE_RE = re.compile(r"^((.+)-\d{3,}\.json)(\.gz|\.br)?$")
+
+
+def is_compact(compact=None):
+    """Resolve the output mode, falling back to JSON_OUTPUT_MODE"""
+    if compact is None:
+        return JSON_OUTPUT_MODE == "compact"
+    return bool(compact)
+
+
+def precompress(path):
+    """Write .gz (and .br when brotli is installed) siblings of a file"""
+    sizes = {}
+
+    # mtime=0 keeps the gzip bytes stable so unchanged data gives no git diff
+    gz_path = path + ".gz"
+    with open(path, "rb") as src, atomic_open(gz_path, "wb") as raw:
+        with gzip.GzipFile(
+            filename="", mode="wb", fileobj=raw, compresslevel=9, mtime=0
+        ) as gz:
+            for block in iter(lambda: src.read(COPY_BLOCK_SIZE), b""):
+                gz.write(block)
+    sizes["gz"] = os.path.getsize(gz_path)
+
+    if brotli is not None:
+        br_path = path + ".br"
+        compressor = brotli.Compressor(quality=11)
+        with open(path, "rb") as src, atomic_open(br_path, "wb") as dst:
+            for block in iter(lambda: src.read(COPY_BLOCK_SIZE), b""):
+                dst.write(compressor.process(block))
+            dst.write(compressor.finish())
+        sizes["br"] = os.path.getsize(br_path)
+
+    return sizes
+
+
+def format_size(num_bytes):
+    """Human readable byte count"""
+    if num_bytes >= 1024 * 1024:
+        return f"{num_bytes / (1024 * 1024):.2f} MB"
+    return f"{num_bytes / 1024:.1f} KB"
+
+
+def print_size_report(report):
+    """Print one size report line for a written file"""
+    parts = [f"{report['path']}: {format_size(report['bytes'])}"]
+    if not report.get("changed", True):
+        parts.append("unchanged, skipped")
+    for ext in ("gz", "br"):
+        if ext in report:
+            ratio = report[ext] / report["bytes"] * 100 if report["bytes"] else 0
+            parts.append(f"{ext} {format_size(report[ext])} ({ratio:.0f}%)")
+    print("  - " + ", ".join(parts))
+
+
+def iter_json(data, compact=None, level=0):
+    """
+    Yield the JSON text of data piece by piece
+
+    The output is byte-identical to json.dump with indent=2 (or compact
+    separators), but dicts and lists are emitted one entry at a time so a
+    large document is never held in memory as a single string.
+    """
+    compact = is_compact(compact)
+    newline = "" if compact else "\n" + INDENT * (level + 1)
+    closing = "" if compact else "\n" + INDENT * level
+    key_sep = ":" if compact else ": "
+
+    if isinstance(data, dict) and data and all(isinstance(k, str) for k in data):
+        yield "{"
+        for i, (key, value) in enumerate(data.items()):
+            yield ("," if i else "") + newline
+            yield json.dumps(key, ensure_ascii=False) + key_sep
+            yield from iter_json(value, compact, level + 1)
+        yield closing + "}"
+    elif isinstance(data, list) and data:
+        yield "["
+        for i, value in enumerate(data):
+            yield ("," if i else "") + newline
+            yield from iter_json(value, compact, level + 1)
+        yield closing + "]"
+    elif compact:
+        yield json.dumps(data, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+    else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        yield text.replace("\n", "\n" + INDENT * level) if level else text
+
+
+def data_hash(data):
+    """SHA-256 of the compact JSON encoding of data"""
+    digest = hashlib.sha256()
+    for piece in iter_json(data, compact=True):
+        digest.update(piece.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    """SHA-256 of a file with volatile timestamps blanked, read line by line"""
+    digest = hashlib.sha256()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stable = VOLATILE_TEXT_RE.sub(lambda m: m.group(1) or m.group(2), line)
+            digest.update(stable.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def has_siblings(path, compact):
+    """Compact outputs need their precompressed siblings on disk"""
+    if not compact:
+        return True
+    if not os.path.exists(path + ".gz"):
+        return False
+    return brotli is None or os.path.exists(path + ".br")
+
+
+def write_pieces(path, pieces, compact):
+    """
+    Stream text pieces into path atomically and return its size report
+
+    The new file is written to a temp file first; if it only differs from
+    the file on disk in volatile timestamps it is dropped and the existing
+    file (and its timestamps) is kept.
+    """
+    pieces = iter(pieces)
+    with stage("write"), atomic_path(path) as tmp_path:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            while True:
+                # Producing the pieces is the JSON encoding
+                with stage("serialize"):
+                    block = "".join(islice(pieces, PIECES_PER_WRITE))
+                if not block:
+                    break
+                f.write(block)
+
+        changed = not (
+            os.path.exists(path)
+            and has_siblings(path, compact)
+            and file_hash(tmp_path) == file_hash(path)
+        )
+        if not changed:
+            os.remove(tmp_path)
+
+    report = {"path": path, "bytes": os.path.getsize(path), "changed": changed}
+    if changed and compact:
+        report.update(precompress(path))
+    elif changed:
+        # Siblings from an earlier compact run would now be stale
+        for ext in (".gz", ".br"):
+            if os.path.exists(path + ext):
+                os.remove(path + ext)
+
+    print_size_report(report)
+    return report
+
+
+def write_json(path, data, compact=None):
+    """Write data to a JSON file and return its size report"""
+    compact = is_compact(compact)
+    return write_pieces(path, iter_json(data, compact), compact)
+
+
+def write_text(path, text, compact=None):
+    """Write pre-rendered text or an iterable of text pieces (e.g. data.js)"""
+    pieces = [text] if isinstance(text, str) else text
+    return write_pieces(path, pieces, is_compact(compact))
+
+
+def get_path(data, key_path):
+    """Follow a tuple of keys into nested dicts, None if missing"""
+    node = data
+    for key in key_path:
+        if not isinstance(node, dict) or key not in node:
+            return None
+        node = node[key]
+    return node
+
+
+def sort_records(records, sort_key, reverse=False):
+    """Sort records by a field, keeping empty values at the end"""
+
+    def key(record):
+        value = record.get(sort_key) if isinstance(record, dict) else None
+        if value is None or value == "":
+            return (0,) if reverse else (3,)
+        if isinstance(value, (int, float)):
+            return (1, value)
+        return (2, str(value))
+
+    return sorted(records, key=key, reverse=reverse)
+
+
+def write_chunked(path, data, record_paths, chunk_size=None, compact=None):
+    """
+    Split record arrays into chunk files with a head file and a manifest
+
+    record_paths maps a tuple of keys to its (sort_key, descending) order,
+    e.g. {("all_prs",): ("submission_date", True)}. Output goes into a
+    directory named after the JSON file: head.json holds everything except
+    the records, manifest.json lists chunk files with row ranges and counts.
+    """
+    chunk_size = JSON_CHUNK_SIZE if chunk_size is None else chunk_size
+    if chunk_size <= 0:
+        return None
+
+    base_dir = os.path.splitext(path)[0]
+    os.makedirs(base_dir, exist_ok=True)
+
+    head = dict(data)
+    manifest = {
+        "source": os.path.basename(path),
+        "head": "head.json",
+        "chunk_size": chunk_size,
+        "datasets": {},
+    }
+    written = set()
+
+    for key_path, order in record_paths.items():
+        records = get_path(data, key_path)
+        if not isinstance(records, list):
+            continue
+
+        sort_key, descending = order if order else (None, False)
+        if sort_key:
+            records = sort_records(records, sort_key, reverse=descending)
+
+        name = ".".join(key_path)
+        chunks = []
+        for start in range(0, len(records), chunk_size):
+            part = records[start : start + chunk_size]
+            file_name = f"{name}-{len(chunks):03d}.json"
+            write_json(os.path.join(base_dir, file_name), part, compact=compact)
+            written.add(file_name)
+
+            chunk = {
+                "file": file_name,
+                "start": start,
+                "end": start + len(part),
+                "count": len(part),
+            }
+            if sort_key:
+                chunk["first"] = part[0].get(sort_key)
+                chunk["last"] = part[-1].get(sort_key)
+            chunks.append(chunk)
+
+        manifest["datasets"][name] = {
+            "path": list(key_path),
+            "total": len(records),
+            "sort_key": sort_key,
+            "order": "desc" if descending else "asc",
+            "chunks": chunks,
+        }
+
+        # Copy the dicts along the path so the caller's data stays intact
+        parent = head
+        for key in key_path[:-1]:
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        parent[key_path[-1]] = []
+
+    # Drop chunk files left over from a larger previous run
+    for file_name in os.listdir(base_dir):
+        match = CHUNK_FILE_RE.match(file_name)
+        if (
+            match
+            and match.group(2) in manifest["datasets"]
+            and match.group(1) not in written
+        ):
+            os.remove(os.path.join(base_dir, file_name))
+
+    write_json(os.path.join(base_dir, "head.json"), head, compact=compact)
+    write_json(os.path.join(base_dir, "manifest.json"), manifest, compact=compact)
+    return manifest
+
+
+def write_columnar(path, data, record_paths, compact=None):
+    """Write <name>.columnar.json with record arrays in columnar encoding"""
+    if JSON_RECORD_ENCODING != "columnar":
+        return None
+
+    encoded = dict(data)
+    for key_path in record_paths:
+        records = get_path(data, key_path)
+        if not isinstance(records, list):
+            continue
+        parent = encoded
+        for key in key_path[:-1]:
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        parent[key_path[-1]] = encode_columnar(records)
+
+    return write_json(
+        os.path.splitext(path)[0] + ".columnar.json", encoded, compact=compact
+    )
+
+
+def write_filters(path, data, filter_dims, compact=None):
+    """Write <name>.filters.json with inverted filter indexes per record array"""
+    datasets = {}
+    for key_path, dimensions in filter_dims.items():
+        records = get_path(data, key_path)
+        if isinstance(records, list):
+            datasets[".".join(key_path)] = build_filter_index(records, dimensions)
+    if not datasets:
+        return None
+
+    return write_json(
+        os.path.splitext(path)[0] + ".filters.json",
+        {"source": os.path.basename(path), "datasets": datasets},
+        compact=compact,
+    )
+
+
+def write_search(path, data, search_fields, compact=None):
+    """Write <name>.search.json with a full-text index per record array"""
+    datasets = {}
+    for key_path, fields in search_fields.items():
+        records = get_path(data, key_path)
+        if isinstance(records, list):
+            datasets[".".join(key_path)] = build_search_index(records, fields)
+    if not datasets:
+        return None
+
+    return write_json(
+        os.path.splitext(path)[0] + ".search.json",
+        {"source": os.path.basename(path), "datasets": datasets},
+        compact=compact,
+    )
+
+
+def write_dataset(
+    path,
+    data,
+    record_paths=None,
+    field_types=None,
+    record_keys=None,
+    filter_dims=None,
+    search_fields=None,
+    compact=None,
+):
+    """
+    Write a dataset and every enabled derived output
+
+    record_paths maps each record array (a tuple of keys) to its chunk sort
+    order, see write_chunked. field_types maps a record array to its
+    field -> type map for the Parquet/Arrow export, see arrow_export.
+    record_keys maps a record array to its key field for delta patches,
+    see data_delta; the dataset then carries its data_version. filter_dims
+    maps a record array to its filter dimensions, see filter_index, and
+    search_fields to its free-text fields, see search_index. With RECORDS_DB
+    set, every record array named in any of these maps is upserted into
+    the records database, see records_db.
+    """
+    with stage("serialize"):
+        record_arrays = list(
+            dict.fromkeys([*(record_paths or {}), *(field_types or {}), *(record_keys or {})])
+        )
+        for key_path in record_arrays:
+            records = get_path(data, key_path)
+            count("rows_in", len(records) if isinstance(records, list) else 0)
+        report = write_outputs(
+            path, data, record_paths, field_types, record_keys, filter_dims, search_fields, compact
+        )
+    if record_arrays:
+        with stage("write"):
+            write_records_db(path, data, record_arrays, field_types, record_keys)
+    return report
+
+
+def write_outputs(
+    path, data, record_paths, field_types, record_keys, filter_dims, search_fields, compact
+):
+    """The JSON file and its derived outputs, see write_dataset"""
+    delta = diff_delta(path, data, record_keys) if record_keys else None
+    if delta is not None:
+        data = {**data, "data_version": delta["version"]}
+    report = write_json(path, data, compact=compact)
+    if delta is not None:
+        write_delta(path, delta)
+    if record_paths:
+        write_chunked(path, data, record_paths, compact=compact)
+        write_columnar(path, data, record_paths, compact=compact)
+    if filter_dims:
+        write_filters(path, data, filter_dims, compact=compact)
+    if search_fields:
+        write_search(path, data, search_fields, compact=compact)
+    for key_path, types in (field_types or {}).items():
+        records = get_path(data, key_path)
+        if isinstance(records, list):
+            write_arrow(
+                path,
+                ".".join(key_path),
+                records,
+                types,
+                unchanged=not report["changed"],
+            )
+    return report
+
+
+def main(paths):
+    """Re-encode existing JSON files in compact mode"""
+    if not paths:
+        print("Usage: python data_output.py data/*.json")
+        return 1
+
+    if brotli is None:
+        print("Note: brotli not installed, skipping .br output")
+
+    print("=== Compact JSON Output ===")
+    before = after = 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        before += os.path.getsize(path)
+        report = write_json(path, data, compact=True)
+        after += report["bytes"]
+
+    print(f"\nTotal: {format_size(before)} -> {format_size(after)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
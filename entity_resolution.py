@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Supplier / vendor entity resolution shared by the sync scripts
+Names are normalized (case, punctuation, legal suffixes such as Co / Ltd /
+Est and their Arabic forms, Arabic letter variants) and matched fuzzily
+against the known entities. Candidates come from a blocking index on
+name-token prefixes, so a new name is compared with a handful of entities
+instead of all of them. Names whose numbers differ ("ABC Transport 1" /
+"ABC Transport 2") are never merged. Every raw spelling seen is cached in
+ENTITY_CACHE_FILE with the entity it resolved to, so each name is resolved
+once and the entity ids stay stable between runs and across datasets.
+
+The raw name columns are left as they are: resolve_field adds the entity
+id next to them (supplier -> supplier_id), and joins across datasets go
+through that id, see vendor_scorecard.py.
+"""
+
+import os
+import re
+import sys
+import json
+from datetime import datetime
+from difflib import SequenceMatcher
+
+from atomic_write import atomic_open
+from search_index import normalize
+
+# Configuration
+ENTITY_CACHE_FILE = os.environ.get(
+    "ENTITY_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "entities.json"),
+)
+MATCH_THRESHOLD = float(os.environ.get("ENTITY_MATCH_THRESHOLD", "0.9"))
+BLOCK_PREFIX = 4
+
+# Legal forms and filler words that do not identify a company
+STOPWORDS = {
+    "co",
+    "company",
+    "corp",
+    "corporation",
+    "est",
+    "establishment",
+    "inc",
+    "llc",
+    "ltd",
+    "limited",
+    "the",
+    "and",
+    "for",
+    "\u0634\u0631\u0643\u0647",  # sharikah (company)
+    "\u0645\u0624\u0633\u0633\u0647",  # mu'assasah (establishment)
+}
+PUNCTUATION_RE = re.compile(r"[^\w\s]|_")
+# Dates and numbers that leak into name columns, and placeholders
+NOT_A_NAME_RE = re.compile(r"^\s*(\d{4}-\d{2}-\d{2}([t\s].*)?|[\d\s.,/:-]+)\s*$", re.I)
+PLACEHOLDERS = {"unknown", "none", "na", "n a", "nil", "tbd", "tba"}
+
+
+def name_key(name):
+    """Normalized comparison key of a name, '' if it is not a name"""
+    if name is None or NOT_A_NAME_RE.match(str(name)):
+        return ""
+    text = PUNCTUATION_RE.sub(" ", normalize(name).replace("&", " and "))
+    key = " ".join(word for word in text.split() if word not in STOPWORDS)
+    return "" if key in PLACEHOLDERS else key
+
+
+def block_keys(key):
+    """Blocking keys of a name key: the prefix of each significant token"""
+    keys = {word[:BLOCK_PREFIX] for word in key.split() if len(word) >= 3}
+    # Also the prefix without spaces, so "al buraq" meets "alburaq"
+    keys.add(key.replace(" ", "")[:BLOCK_PREFIX])
+    return keys
+
+
+def number_tokens(key):
+    """Tokens of a name key that contain digits, sorted"""
+    return sorted(word for word in key.split() if any(c.isdigit() for c in word))
+
+
+def similarity(a, b):
+    """Similarity of two name keys, 0..1; 0 when their numbers differ"""
+    if a == b:
+        return 1.0
+    # "ABC Transport 1" and "ABC Transport 2" are different companies
+    if number_tokens(a) != number_tokens(b):
+        return 0.0
+    # Word order does not matter ("Arabia Al Rawy" / "Al Rawy Arabia")
+    if sorted(a.split()) == sorted(b.split()):
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+class EntityResolver:
+    """Resolves raw names to canonical entity names, see module docstring"""
+
+    def __init__(self, path=ENTITY_CACHE_FILE):
+        self.path = path
+        self.entities = {}
+        self.aliases = {}
+        self.blocks = {}
+        self.changed = False
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+            self.entities = doc.get("entities", {})
+            self.aliases = doc.get("aliases", {})
+        # Spellings merged before the number check are resolved again
+        for raw, entity_id in list(self.aliases.items()):
+            entity = self.entities.get(entity_id)
+            if entity is None or number_tokens(name_key(raw)) != number_tokens(
+                entity["key"]
+            ):
+                del self.aliases[raw]
+                self.changed = True
+        for entity_id, entity in self.entities.items():
+            self.index(entity_id, entity["key"])
+
+    def index(self, entity_id, key):
+        """Add an entity to the blocking index"""
+        for block in block_keys(key):
+            self.blocks.setdefault(block, set()).add(entity_id)
+
+    def match(self, key):
+        """Best matching entity id for a name key, or None"""
+        if key in self.entities:
+            return key
+        candidates = set()
+        for block in block_keys(key):
+            candidates |= self.blocks.get(block, set())
+        best = None
+        best_score = MATCH_THRESHOLD
+        for entity_id in sorted(candidates):
+            score = similarity(key, self.entities[entity_id]["key"])
+            if score >= best_score and (best is None or score > best_score):
+                best, best_score = entity_id, score
+        return best
+
+    def resolve_id(self, name, source=None):
+        """
+        Id of the entity a raw name refers to
+
+        Returns None for values that are not names (empty, dates, numbers).
+        source tags the entity with the dataset it was seen in.
+        """
+        if name is None:
+            return None
+        raw = str(name).strip()
+        entity_id = self.aliases.get(raw)
+        if entity_id is None:
+            key = name_key(raw)
+            if not key:
+                return None
+            entity_id = self.match(key)
+            if entity_id is None:
+                entity_id = key
+                self.entities[entity_id] = {"name": raw, "key": key, "sources": []}
+                self.index(entity_id, key)
+            self.aliases[raw] = entity_id
+            self.changed = True
+
+        entity = self.entities[entity_id]
+        if source and source not in entity["sources"]:
+            entity["sources"] = sorted(entity["sources"] + [source])
+            self.changed = True
+        return entity_id
+
+    def resolve(self, name, source=None):
+        """Canonical name of the entity a raw name refers to, see resolve_id"""
+        entity_id = self.resolve_id(name, source)
+        return None if entity_id is None else self.entities[entity_id]["name"]
+
+    def resolve_field(self, records, field, source=None, id_field=None):
+        """
+        Set id_field (default <field>_id) on records to the entity id of field
+
+        The raw field is kept as published; the id is None for empty values
+        and non-names (dates, numbers, placeholders).
+        """
+        id_field = id_field or f"{field}_id"
+        for record in records:
+            record[id_field] = self.resolve_id(record.get(field), source)
+        return records
+
+    def save(self):
+        """Write the cache if anything new was resolved"""
+        if not self.changed:
+            return
+        with atomic_open(self.path) as f:
+            json.dump(
+                {
+                    "updated": datetime.now().isoformat(),
+                    "entities": self.entities,
+                    "aliases": self.aliases,
+                },
+                f,
+                indent=2,
+                ensure_ascii=False,
+                sort_keys=True,
+            )
+        self.changed = False
+
+
+def resolve_names(records, field, source, id_field=None):
+    """Add the entity ids of field to records and save the shared cache"""
+    resolver = EntityResolver()
+    resolver.resolve_field(records, field, source, id_field)
+    resolver.save()
+    return records
+
+
+def main(argv):
+    """Resolve names from the command line, or list the cached entities"""
+    resolver = EntityResolver()
+    if not argv:
+        for entity_id, entity in sorted(resolver.entities.items()):
+            spellings = [a for a, e in resolver.aliases.items() if e == entity_id]
+            print(f"{entity['name']} [{', '.join(entity['sources'])}]: {len(spellings)} spellings")
+        print(f"{len(resolver.entities)} entities, {len(resolver.aliases)} spellings")
+        return 0
+    for name in argv:
+        print(f"{name!r} -> {resolver.resolve(name)!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Inverted filter indexes for record datasets
+For each filter dimension (project, supplier, status, ...) maps every
+value to the sorted row ids of the records carrying it, so dashboards
+filter by intersecting small integer sets instead of scanning records.
+Row ids are positions in the record array of the full JSON file.
+assets/nesma-filter.js runs the same queries in the browser.
+"""
+
+import sys
+import json
+import base64
+
+# A posting list costs ~5 bytes per id, a bitmap count / 8 bytes
+BITMAP_DENSITY = 40
+
+
+def dimension_value(record, spec):
+    """
+    Value of one filter dimension for a record
+
+    spec is a field name, or (field, "month") / (field, "year") to bucket
+    a YYYY-MM-DD date field.
+    """
+    if isinstance(spec, str):
+        value = record.get(spec)
+    else:
+        field, bucket = spec
+        value = record.get(field)
+        if value:
+            value = str(value)[: 7 if bucket == "month" else 4]
+    if value is None or value == "":
+        return None
+    return str(value)
+
+
+def encode_rows(rows, count):
+    """Posting list, or a base64 bitmap when the value is common"""
+    if len(rows) * BITMAP_DENSITY <= count:
+        return rows
+    bitmap = bytearray((count + 7) // 8)
+    for row in rows:
+        bitmap[row >> 3] |= 1 << (row & 7)
+    return {"bitmap": base64.b64encode(bytes(bitmap)).decode("ascii")}
+
+
+def decode_rows(rows, count):
+    """Inverse of encode_rows, always a sorted list"""
+    if isinstance(rows, list):
+        return rows
+    bitmap = base64.b64decode(rows["bitmap"])
+    return [i for i in range(count) if bitmap[i >> 3] >> (i & 7) & 1]
+
+
+def build_filter_index(records, dimensions):
+    """
+    Build the inverted index of records over dimensions
+
+    dimensions maps a dimension name to its spec, see dimension_value.
+    """
+    count = len(records)
+    index = {"count": count, "dimensions": {}}
+    for name, spec in dimensions.items():
+        postings = {}
+        for row, record in enumerate(records):
+            value = dimension_value(record, spec)
+            if value is not None:
+                postings.setdefault(value, []).append(row)
+        values = sorted(postings)
+        index["dimensions"][name] = {
+            "field": spec if isinstance(spec, str) else list(spec),
+            "values": values,
+            "counts": [len(postings[v]) for v in values],
+            "rows": [encode_rows(postings[v], count) for v in values],
+        }
+    return index
+
+
+def select_rows(index, selections):
+    """
+    Row ids matching every dimension in selections
+
+    selections maps a dimension name to the accepted values; values of one
+    dimension are OR-ed, dimensions are AND-ed. Empty selections match all.
+    """
+    count = index["count"]
+    result = None
+    for name, accepted in selections.items():
+        if not accepted:
+            continue
+        dimension = index["dimensions"][name]
+        positions = {v: i for i, v in enumerate(dimension["values"])}
+        rows = set()
+        for value in accepted:
+            if value in positions:
+                rows.update(decode_rows(dimension["rows"][positions[value]], count))
+        result = rows if result is None else result & rows
+        if not result:
+            return []
+    return list(range(count)) if result is None else sorted(result)
+
+
+def main(argv):
+    """Print the dimensions of a .filters.json file"""
+    if not argv:
+        print("Usage: python filter_index.py data/<name>.filters.json")
+        return 1
+    for path in argv:
+        with open(path, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        print(f"{path}:")
+        for dataset, index in doc["datasets"].items():
+            print(f"  {dataset}: {index['count']} rows")
+            for name, dimension in index["dimensions"].items():
+                bitmaps = sum(1 for r in dimension["rows"] if isinstance(r, dict))
+                print(
+                    f"    {name}: {len(dimension['values'])} values, {bitmaps} bitmaps"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
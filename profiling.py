@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Command line entry of the sync and export scripts, with a profiling mode
+The scripts run main() through run_script(), which understands:
+
+    --profile      run under cProfile and tracemalloc
+    --record DIR   also save every fetched sheet to DIR/<sheet id>.json
+    --replay DIR   read the sheets from DIR instead of Smartsheet (offline)
+
+e.g. python sync_procurement.py --record payloads, then
+python sync_procurement.py --replay payloads --profile to profile a real
+payload locally, as often as needed. Profiles are written to PROFILE_DIR
+(default .cache/profile, next to the run metrics of run_metrics.py):
+
+    <job>.pstats      the raw profile, for pstats / snakeviz
+    <job>.hot.txt     hottest functions by own time and by cumulative time
+    <job>.alloc.txt   top allocation sites when the most memory was live
+    <job>.json        the run metrics of the profiled run (run_metrics.py)
+
+Allocations are snapshot as run_metrics stages end, keeping the snapshot
+with the most live memory, so the sites are those of the biggest stage.
+The run metrics of a profiled run are kept with the profile rather than
+in RUN_METRICS_DIR, so profiling overhead does not skew the run history.
+Worker processes (WAREHOUSE_WORKERS) are not profiled; set
+WAREHOUSE_WORKERS=1 to profile workbook parsing. tracemalloc slows a run
+down several times, so compare timings with run_metrics, not profiles.
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import tracemalloc
+
+import run_metrics
+import sheet_sources
+from atomic_write import atomic_open
+
+# Configuration
+PROFILE_DIR = os.environ.get(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "profile"),
+)
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", "40"))
+# Stack frames kept per allocation; more give tracebacks but cost more
+PROFILE_FRAMES = int(os.environ.get("PROFILE_FRAMES", "1"))
+# New snapshot only once live memory grew this much past the kept one
+SNAPSHOT_GROWTH = 1.1
+
+
+def option(argv, name):
+    """Value following a command line option, None if absent"""
+    if name in argv and argv.index(name) + 1 < len(argv):
+        return argv[argv.index(name) + 1]
+    return None
+
+
+def write_hot_report(profiler, path, title):
+    """Functions sorted by own time, then by cumulative time"""
+    with atomic_open(path) as f:
+        f.write(f"{title}\n\n")
+        stats = pstats.Stats(profiler, stream=f)
+        for order in ("tottime", "cumulative"):
+            f.write(f"=== Top {PROFILE_TOP} by {order} ===\n")
+            stats.sort_stats(order).print_stats(PROFILE_TOP)
+
+
+class AllocationSampler:
+    """Keeps the tracemalloc snapshot with the most live memory, see module docstring"""
+
+    def __init__(self):
+        self.size = 0
+        self.stage = None
+        self.snapshot = None
+
+    def sample(self, stage):
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.size * SNAPSHOT_GROWTH:
+            self.size = current
+            self.stage = stage
+            self.snapshot = tracemalloc.take_snapshot()
+
+
+def write_alloc_report(sampler, peak, path, title):
+    """Allocation sites of the sampled snapshot"""
+    snapshot = sampler.snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        )
+    )
+    key = "traceback" if PROFILE_FRAMES > 1 else "lineno"
+    stats = snapshot.statistics(key)
+    with atomic_open(path) as f:
+        f.write(f"{title}\n")
+        f.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MB\n")
+        f.write(
+            f"Live at the end of stage {sampler.stage}: {sampler.size / 1024 / 1024:.1f} MB\n\n"
+        )
+        f.write(f"=== Top {PROFILE_TOP} allocation sites ===\n")
+        for i, stat in enumerate(stats[:PROFILE_TOP], 1):
+            frame = stat.traceback[0]
+            f.write(
+                f"{i:>3}. {stat.size / 1024:>10.1f} KB in {stat.count:>8} blocks  "
+                f"{frame.filename}:{frame.lineno}\n"
+            )
+            if key == "traceback":
+                for line in stat.traceback.format()[2:]:
+                    f.write(f"        {line}\n")
+
+
+def profile_main(main, job):
+    """Run main() under cProfile and tracemalloc and write the reports"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    run_metrics.RUN_METRICS_DIR = PROFILE_DIR
+    sampler = AllocationSampler()
+    run_metrics.STAGE_HOOKS.append(sampler.sample)
+    profiler = cProfile.Profile()
+    tracemalloc.start(PROFILE_FRAMES)
+    started = time.perf_counter()
+    try:
+        return profiler.runcall(main)
+    finally:
+        elapsed = time.perf_counter() - started
+        sampler.sample("(end of run)")
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        run_metrics.STAGE_HOOKS.remove(sampler.sample)
+
+        title = f"{job}: {elapsed:.2f}s under profiling"
+        base = os.path.join(PROFILE_DIR, job)
+        profiler.dump_stats(base + ".pstats")
+        write_hot_report(profiler, base + ".hot.txt", title)
+        write_alloc_report(sampler, peak, base + ".alloc.txt", title)
+        print(f"\nProfile written to {base}.{{pstats,hot.txt,alloc.txt}}")
+
+
+def run_script(main, argv=None):
+    """Run a script's main() with the command line options above"""
+    argv = sys.argv[1:] if argv is None else argv
+    if "--record" in argv:
+        sheet_sources.SHEET_RECORD_DIR = option(argv, "--record")
+    if "--replay" in argv:
+        sheet_sources.SHEET_REPLAY_DIR = option(argv, "--replay")
+    if "--profile" not in argv:
+        return main()
+    # Named like its run metrics, see run_metrics.instrument
+    job = getattr(main, "job", None) or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    return profile_main(main, job)
+
+
+def main(argv):
+    """Show the hot-function report of a saved profile"""
+    if not argv:
+        print(__doc__.split("\n\n")[1])
+        return 1
+    stats = pstats.Stats(argv[0])
+    stats.sort_stats(argv[1] if len(argv) > 1 else "tottime").print_stats(PROFILE_TOP)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
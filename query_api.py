@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Read-only HTTP query API over the dashboard datasets
+Loads the record arrays behind pr_data.json, transport_data.json and
+warehouse_data.json into in-memory indexes (value -> rows postings per
+filter dimension, rows sorted by date for ranges) and answers filtered,
+paginated and grouped queries, so a dashboard on a slow link can fetch a
+50-row page and a KPI block instead of the full files. Results are kept
+in an LRU cache keyed on the normalized query; a dataset whose file
+changes on disk (a new sync landed) is reloaded and its entries dropped.
+
+    python query_api.py [port] [--host HOST]
+
+    GET /api/datasets
+    GET /api/<dataset>/records?project=A&project=B&from=2025-01-01&to=2025-06-30
+                               &q=cable&sort=po_value&order=desc&page=1&size=50
+    GET /api/<dataset>/aggregate?group=month&status=Done
+
+The server binds to QUERY_API_HOST (127.0.0.1 by default) and allows
+cross-origin requests from QUERY_API_CORS_ORIGIN only, by default the
+local dashboard server of the README (python -m http.server 8000).
+"""
+
+import os
+import sys
+import json
+import gzip
+import bisect
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from filter_index import dimension_value
+from search_index import build_search_index, search
+
+# Configuration
+ROOT = os.path.dirname(os.path.abspath(__file__))
+QUERY_API_HOST = os.environ.get("QUERY_API_HOST", "127.0.0.1")
+QUERY_API_PORT = int(os.environ.get("QUERY_API_PORT", "8765"))
+# Origin allowed to call the API from a browser; empty sends no CORS header
+QUERY_API_CORS_ORIGIN = os.environ.get("QUERY_API_CORS_ORIGIN", "http://localhost:8000")
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "512"))
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+GZIP_MIN_BYTES = 1024
+
+# file: JSON file under the repository root
+# paths: candidate (record array path, overrides), the first one present is
+#   used; overrides replace the fields below for that layout (the export
+#   scripts and the committed dashboard files name their fields differently)
+# date: date field for from/to ranges and month grouping
+# dimensions: filter / group dimensions, see filter_index.dimension_value
+# values: numeric fields summed by aggregate
+# search: free-text fields for q=, see search_index
+DATASETS = {
+    "prs": {
+        "file": "data/pr_data.json",
+        "paths": [(("all_prs",), {})],
+        "date": "submission_date",
+        "dimensions": {
+            "project": "project",
+            "vendor": "vendor",
+            "status": "status",
+            "agent": "pending_with",
+        },
+        "values": ["pr_value", "po_value"],
+        "search": ["description", "pr_note"],
+    },
+    "transport": {
+        "file": "data/transport_data.json",
+        "paths": [(("records",), {})],
+        "date": "request_date",
+        "dimensions": {
+            "project": "project",
+            "supplier": "supplier",
+            "status": "status",
+            "company": "company",
+            "rent_type": "rent_type",
+            "sla_status": "sla_status",
+        },
+        "values": ["total_amount"],
+        "search": ["remarks", "equipment"],
+    },
+    "materials": {
+        "file": "data/warehouse_data.json",
+        "paths": [
+            (("inventory", "materials"), {}),
+            (
+                ("records", "inventory"),
+                {
+                    "dimensions": {
+                        "project": "project",
+                        "location": "location",
+                        "sub_location": "sub_location",
+                        "unit": "unit",
+                    },
+                    "values": ["balance"],
+                },
+            ),
+        ],
+        "date": None,
+        "dimensions": {
+            "project": "project",
+            "location": "location",
+            "status": "status",
+            "unit": "unit",
+        },
+        "values": ["received", "issued", "balance"],
+        "search": ["description", "item_code"],
+    },
+    "transfers": {
+        "file": "data/warehouse_data.json",
+        "paths": [
+            (("surplus_transfers", "transfers"), {}),
+            (
+                ("records", "transfers"),
+                {
+                    "dimensions": {
+                        "store": "issued_by",
+                        "from_project": "send_project",
+                        "to_project": "request_project",
+                        "requested_by": "requested_by",
+                        "on_time": "is_on_time",
+                    },
+                    # qty is text there, e.g. "roll100"
+                    "values": ["qty_numeric"],
+                    "search": ["material"],
+                },
+            ),
+        ],
+        "date": "date",
+        "dimensions": {
+            "store": "store",
+            "from_project": "from_project",
+            "to_project": "to_project",
+            "status": "remark",
+        },
+        "values": ["qty"],
+        "search": ["description", "remark"],
+    },
+}
+RESERVED_PARAMS = {"from", "to", "q", "sort", "order", "page", "size", "group"}
+
+
+class QueryError(Exception):
+    """Bad request, reported to the client as HTTP 400"""
+
+
+def to_number(value):
+    """Float of a summable field, 0 when it is not numeric"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Dataset:
+    """One record array with its filter, date and search indexes"""
+
+    def __init__(self, name, spec, stamp):
+        self.name = name
+        self.stamp = stamp
+        with open(os.path.join(ROOT, spec["file"]), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.records = []
+        for path, overrides in spec["paths"]:
+            node = data
+            for key in path:
+                node = node.get(key) if isinstance(node, dict) else None
+            if isinstance(node, list):
+                self.records = node
+                spec = {**spec, **overrides}
+                break
+        self.spec = spec
+        self.version = data.get("data_version") or data.get("last_updated")
+
+        count = len(self.records)
+        self.postings = {}
+        for dim, dim_spec in spec["dimensions"].items():
+            postings = {}
+            for row, record in enumerate(self.records):
+                value = dimension_value(record, dim_spec)
+                if value is not None:
+                    postings.setdefault(value, []).append(row)
+            self.postings[dim] = postings
+
+        # (date, row) sorted, for from/to ranges by bisection
+        self.dates = []
+        if spec["date"]:
+            self.dates = sorted(
+                (str(r.get(spec["date"]))[:10], row)
+                for row, r in enumerate(self.records)
+                if r.get(spec["date"])
+            )
+        self.date_keys = [d for d, _ in self.dates]
+        self.search_index = (
+            build_search_index(self.records, spec["search"]) if spec["search"] else None
+        )
+        print(f"Loaded {name}: {count} records from {spec['file']}")
+
+    def select(self, params):
+        """Sorted row ids matching the filters in params"""
+        result = None
+        for dim, accepted in params.items():
+            if dim in RESERVED_PARAMS:
+                continue
+            if dim not in self.postings:
+                raise QueryError(f"Unknown filter '{dim}' for {self.name}")
+            rows = set()
+            for value in accepted:
+                rows.update(self.postings[dim].get(value, ()))
+            result = rows if result is None else result & rows
+
+        if "from" in params or "to" in params:
+            if not self.spec["date"]:
+                raise QueryError(f"{self.name} has no date field")
+            start = bisect.bisect_left(self.date_keys, params.get("from", [""])[0])
+            # A partial date such as to=2025-06 includes the whole month
+            end = bisect.bisect_right(self.date_keys, params.get("to", [""])[0] + "\uffff")
+            rows = {row for _, row in self.dates[start:end]}
+            result = rows if result is None else result & rows
+
+        if params.get("q") and self.search_index:
+            rows = set(search(self.search_index, params["q"][0]))
+            result = rows if result is None else result & rows
+
+        return list(range(len(self.records))) if result is None else sorted(result)
+
+    def query_records(self, params):
+        """One page of matching records"""
+        rows = self.select(params)
+        sort = params.get("sort", [None])[0]
+        if sort:
+            descending = params.get("order", ["asc"])[0] == "desc"
+            # Missing values last in either order
+            present = [r for r in rows if self.records[r].get(sort) not in (None, "")]
+            missing = [r for r in rows if self.records[r].get(sort) in (None, "")]
+            if any(isinstance(self.records[r][sort], (dict, list)) for r in present):
+                raise QueryError(f"cannot sort on {sort}, it is not a scalar field")
+            # Numbers before strings, so mixed columns still sort
+            values = {r: self.records[r][sort] for r in present}
+            present.sort(
+                key=lambda r: (not isinstance(values[r], (int, float)), values[r]),
+                reverse=descending,
+            )
+            rows = present + missing
+        try:
+            page = max(1, int(params.get("page", ["1"])[0]))
+            size = min(MAX_PAGE_SIZE, max(1, int(params.get("size", [DEFAULT_PAGE_SIZE])[0])))
+        except ValueError:
+            raise QueryError("page and size must be integers")
+        start = (page - 1) * size
+        return {
+            "total": len(rows),
+            "page": page,
+            "size": size,
+            "records": [self.records[r] for r in rows[start : start + size]],
+        }
+
+    def aggregate(self, params):
+        """Count and value sums of the matching records, overall and per group"""
+        rows = self.select(params)
+        group = params.get("group", [None])[0]
+        if group == "month":
+            if not self.spec["date"]:
+                raise QueryError(f"{self.name} has no date field")
+            group_spec = (self.spec["date"], "month")
+        elif group:
+            if group not in self.spec["dimensions"]:
+                raise QueryError(f"Unknown group '{group}' for {self.name}")
+            group_spec = self.spec["dimensions"][group]
+
+        def totals():
+            return {"count": 0, **{field: 0.0 for field in self.spec["values"]}}
+
+        overall = totals()
+        groups = {}
+        for row in rows:
+            record = self.records[row]
+            buckets = [overall]
+            if group:
+                key = dimension_value(record, group_spec) or "Unknown"
+                buckets.append(groups.setdefault(key, totals()))
+            for bucket in buckets:
+                bucket["count"] += 1
+                for field in self.spec["values"]:
+                    bucket[field] += to_number(record.get(field))
+
+        result = {"totals": overall}
+        if group:
+            result["group"] = group
+            result["groups"] = dict(sorted(groups.items()))
+        return result
+
+
+class QueryStore:
+    """Datasets reloaded when their file changes, and the LRU result cache"""
+
+    def __init__(self, datasets=DATASETS, cache_size=QUERY_CACHE_SIZE):
+        self.specs = datasets
+        self.cache_size = cache_size
+        self.loaded = {}
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def dataset(self, name):
+        """Current Dataset, reloaded when its file changed since the last load"""
+        if name not in self.specs:
+            raise KeyError(name)
+        spec = self.specs[name]
+        try:
+            stat = os.stat(os.path.join(ROOT, spec["file"]))
+        except FileNotFoundError:
+            raise KeyError(name)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            current = self.loaded.get(name)
+            if current is None or current.stamp != stamp:
+                current = self.loaded[name] = Dataset(name, spec, stamp)
+                # A new sync landed: drop this dataset's cached results
+                for key in [k for k in self.cache if k[0] == name]:
+                    del self.cache[key]
+            return current
+
+    def query(self, name, endpoint, params):
+        """Cached result of an endpoint ('records' or 'aggregate')"""
+        dataset = self.dataset(name)
+        key = (
+            name,
+            dataset.stamp,
+            endpoint,
+            tuple(sorted((k, tuple(sorted(set(v)))) for k, v in params.items())),
+        )
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        if endpoint == "records":
+            result = dataset.query_records(params)
+        elif endpoint == "aggregate":
+            result = dataset.aggregate(params)
+        else:
+            raise KeyError(endpoint)
+        result = {"dataset": name, "version": dataset.version, **result}
+        body = json.dumps(result, ensure_ascii=False, separators=(",", ":"), default=str)
+        body = body.encode("utf-8")
+
+        with self.lock:
+            self.cache[key] = body
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return body
+
+    def describe(self):
+        """Name, record count, filters and version of every available dataset"""
+        result = {}
+        for name in self.specs:
+            try:
+                dataset = self.dataset(name)
+            except KeyError:
+                continue
+            result[name] = {
+                "count": len(dataset.records),
+                "version": dataset.version,
+                "filters": sorted(dataset.postings),
+                "date": dataset.spec["date"],
+                "values": dataset.spec["values"],
+            }
+        return json.dumps(result, ensure_ascii=False).encode("utf-8")
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """GET-only handler, see module docstring for the routes"""
+
+    store = None
+
+    def send_body(self, status, body):
+        gzipped = len(body) >= GZIP_MIN_BYTES and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        )
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        if QUERY_API_CORS_ORIGIN:
+            self.send_header("Access-Control-Allow-Origin", QUERY_API_CORS_ORIGIN)
+        self.send_header("Cache-Control", "no-cache")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_body(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        params = parse_qs(url.query)
+        try:
+            if parts == ["api", "datasets"]:
+                self.send_body(200, self.store.describe())
+            elif len(parts) == 3 and parts[0] == "api":
+                self.send_body(200, self.store.query(parts[1], parts[2], params))
+            else:
+                self.send_error_json(404, "Not found")
+        except KeyError as e:
+            self.send_error_json(404, f"Unknown dataset or endpoint: {e.args[0]}")
+        except QueryError as e:
+            self.send_error_json(400, str(e))
+        except ConnectionError:
+            # Client went away mid-response, nothing left to send
+            pass
+        except Exception as e:
+            self.log_error("%s failed: %r", self.path, e)
+            self.send_error_json(500, "Internal server error")
+
+
+def main(argv):
+    port = int(argv[0]) if argv and argv[0].isdigit() else QUERY_API_PORT
+    host = QUERY_API_HOST
+    if "--host" in argv and argv.index("--host") + 1 < len(argv):
+        host = argv[argv.index("--host") + 1]
+    QueryHandler.store = QueryStore()
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    print(f"Query API on http://{host}:{port}/api/datasets")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
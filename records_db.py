@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+SQLite system of record for the sync outputs
+Set RECORDS_DB to a database path (e.g. db/records.sqlite) to enable. The
+Smartsheet sync workflow (sync.yml) sets it and carries db/ between runs in
+the Actions cache; the other workflows and local runs do not write it. Every
+record array passed to write_dataset is then upserted into it, in one table
+per array, e.g. pr_data_all_prs. Records are keyed like the delta patches
+(see data_delta.keyed_records); typed fields become typed columns, and key,
+date, project, supplier / vendor and status columns are indexed. Changed and
+removed records are kept in the _history table and every sync in _syncs,
+so past states and cross-dataset questions are SQL queries.
+
+The database runs in WAL mode, so readers are not blocked while a sync
+writes, and each sync is a single executemany transaction.
+
+    RECORDS_DB=db/records.sqlite python records_db.py tables
+    python records_db.py sql "SELECT supplier, COUNT(*) FROM sla_data_records GROUP BY 1"
+    python records_db.py export pr_data_all_prs out.json
+"""
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+from datetime import datetime
+
+from arrow_export import CONVERTERS
+from data_delta import keyed_records
+
+# Configuration
+RECORDS_DB = os.environ.get("RECORDS_DB", "")
+# Columns indexed when present, besides the key and the date-typed fields
+INDEXED_FIELDS = {"project", "supplier", "vendor", "status"}
+SQL_TYPES = {"float64": "REAL", "int64": "INTEGER", "date": "TEXT", "string": "TEXT"}
+META_COLUMNS = ["_key", "_hash", "_first_seen", "_updated", "_sync_id", "_deleted", "_record"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS _syncs (
+    id INTEGER PRIMARY KEY,
+    dataset TEXT NOT NULL,
+    synced_at TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS _history (
+    table_name TEXT NOT NULL,
+    _key TEXT NOT NULL,
+    sync_id INTEGER NOT NULL,
+    change TEXT NOT NULL,
+    _record TEXT
+);
+CREATE INDEX IF NOT EXISTS ix__history_key ON _history (table_name, _key);
+CREATE INDEX IF NOT EXISTS ix__syncs_dataset ON _syncs (dataset, id);
+"""
+
+
+def connect(path=None, readonly=False):
+    """Open the database in WAL mode"""
+    path = path or RECORDS_DB
+    if readonly:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def quote(name):
+    """Quote an SQL identifier"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def table_name(path, key_path):
+    """Table of one record array, e.g. data/pr_data.json + all_prs -> pr_data_all_prs"""
+    base = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"\W+", "_", "_".join((base,) + tuple(key_path))).lower()
+
+
+def record_text(value):
+    """Compact JSON of a record or nested field value"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def column_converter(type_name):
+    """Function giving the SQLite value of a record field"""
+    if not type_name:
+        return lambda v: record_text(v) if isinstance(v, (dict, list)) else v
+    convert = CONVERTERS[type_name]
+    if type_name == "date":
+        return lambda v: None if (d := convert(v)) is None else d.isoformat()
+    return convert
+
+
+def ensure_table(conn, table, fields, field_types):
+    """
+    Create the table and add columns / indexes for new fields
+
+    Returns every field column of the table, old and new. A field whose name
+    matches another column but for case is left out.
+    """
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote(table)} ("
+        "_key TEXT NOT NULL UNIQUE, _hash TEXT NOT NULL, _first_seen TEXT NOT NULL, "
+        "_updated TEXT NOT NULL, _sync_id INTEGER NOT NULL, "
+        "_deleted INTEGER NOT NULL DEFAULT 0, _record TEXT NOT NULL)"
+    )
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({quote(table)})")]
+    # SQLite column names are case-insensitive, so "Status" next to an
+    # existing "status" column gets no column; it stays in _record
+    folded = {c.lower() for c in columns}
+    skipped = []
+    for field in fields:
+        if field in columns:
+            continue
+        if str(field).lower() in folded:
+            skipped.append(field)
+            continue
+        columns.append(field)
+        folded.add(str(field).lower())
+        # Untyped fields keep whatever JSON type they have
+        column_type = SQL_TYPES.get(field_types.get(field), "")
+        conn.execute(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(field)} {column_type}")
+        if field in INDEXED_FIELDS or field_types.get(field) == "date":
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {quote(f'ix_{table}_{field}')} "
+                f"ON {quote(table)} ({quote(field)})"
+            )
+    if skipped:
+        names = ", ".join(map(str, skipped))
+        print(f"  - {table}: no column for {names} (name differs only by case)")
+    return [c for c in columns if c not in META_COLUMNS]
+
+
+def upsert_records(conn, dataset, table, records, key_field, field_types):
+    """
+    Upsert one record array in a single transaction
+
+    Unchanged records (same content hash) are not rewritten. Returns the
+    (added, changed, removed) counts.
+    """
+    field_types = field_types or {}
+    keyed = keyed_records(records, key_field)
+    fields = list(dict.fromkeys(f for r in keyed.values() if isinstance(r, dict) for f in r))
+    now = datetime.now().isoformat()
+
+    with conn:
+        # Fields a record lacks are NULL, also when they were set before
+        fields = ensure_table(conn, table, fields, field_types)
+        converters = [column_converter(field_types.get(f)) for f in fields]
+        sync_id = conn.execute(
+            "INSERT INTO _syncs (dataset, synced_at, records, added, changed, removed) "
+            "VALUES (?, ?, ?, 0, 0, 0)",
+            (dataset, now, len(keyed)),
+        ).lastrowid
+        stored = dict(
+            conn.execute(f"SELECT _key, _hash FROM {quote(table)} WHERE _deleted = 0")
+        )
+
+        rows = []
+        history = []
+        added = changed = 0
+        for key, record in keyed.items():
+            text = record_text(record)
+            # Same digest as data_delta.short_hash
+            digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+            if stored.get(key) == digest:
+                continue
+            change = "changed" if key in stored else "added"
+            if change == "added":
+                added += 1
+            else:
+                changed += 1
+            source = record if isinstance(record, dict) else {}
+            rows.append(
+                [key, digest, now, now, sync_id, 0, text]
+                + [convert(source.get(f)) for f, convert in zip(fields, converters)]
+            )
+            history.append((table, key, sync_id, change, text))
+
+        columns = META_COLUMNS + fields
+        updates = ", ".join(
+            f"{quote(c)} = excluded.{quote(c)}" for c in columns if c not in ("_key", "_first_seen")
+        )
+        # _first_seen survives updates and re-appearing records
+        conn.executemany(
+            f"INSERT INTO {quote(table)} ({', '.join(map(quote, columns))}) "
+            f"VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT (_key) DO UPDATE SET {updates}",
+            rows,
+        )
+
+        removed = [key for key in stored if key not in keyed]
+        conn.executemany(
+            f"UPDATE {quote(table)} SET _deleted = 1, _updated = ?, _sync_id = ? WHERE _key = ?",
+            [(now, sync_id, key) for key in removed],
+        )
+        history.extend((table, key, sync_id, "removed", None) for key in removed)
+        conn.executemany(
+            "INSERT INTO _history (table_name, _key, sync_id, change, _record) VALUES (?, ?, ?, ?, ?)",
+            history,
+        )
+        conn.execute(
+            "UPDATE _syncs SET added = ?, changed = ?, removed = ? WHERE id = ?",
+            (added, changed, len(removed), sync_id),
+        )
+    return added, changed, len(removed)
+
+
+def write_records_db(path, data, record_arrays, field_types=None, record_keys=None):
+    """
+    Upsert a dataset's record arrays into RECORDS_DB
+
+    record_arrays lists the record array paths (tuples of keys); record_keys
+    and field_types are the same maps write_dataset takes.
+    """
+    if not RECORDS_DB:
+        return None
+    field_types = field_types or {}
+    record_keys = record_keys or {}
+    conn = connect()
+    try:
+        for key_path in record_arrays:
+            node = data
+            for key in key_path:
+                node = node.get(key) if isinstance(node, dict) else None
+            if not isinstance(node, list):
+                continue
+            table = table_name(path, key_path)
+            added, changed, removed = upsert_records(
+                conn,
+                os.path.basename(path),
+                table,
+                node,
+                record_keys.get(key_path),
+                field_types.get(key_path),
+            )
+            print(f"  - {table}: {added} added, {changed} changed, {removed} removed")
+    finally:
+        conn.close()
+
+
+def export_records(conn, table, where="", params=()):
+    """Current records of a table as written to the JSON, in insertion order"""
+    sql = f"SELECT _record FROM {quote(table)} WHERE _deleted = 0"
+    if where:
+        sql += f" AND ({where})"
+    return [json.loads(row[0]) for row in conn.execute(sql + " ORDER BY rowid", params)]
+
+
+def list_tables(conn):
+    """Record tables with their current row counts"""
+    names = [
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\' "
+            "ORDER BY name"
+        )
+    ]
+    return {
+        name: conn.execute(f"SELECT COUNT(*) FROM {quote(name)} WHERE _deleted = 0").fetchone()[0]
+        for name in names
+    }
+
+
+def main(argv):
+    """Inspect or query the records database"""
+    if not argv or argv[0] not in ("tables", "sql", "export"):
+        print(__doc__.split("\n\n")[-1])
+        return 1
+    if not RECORDS_DB:
+        print("RECORDS_DB is not set")
+        return 1
+    if not os.path.exists(RECORDS_DB):
+        print(f"No database at {RECORDS_DB}")
+        return 1
+    conn = connect(readonly=True)
+    if argv[0] == "tables":
+        for name, count in list_tables(conn).items():
+            print(f"{name}: {count} records")
+    elif argv[0] == "sql":
+        cursor = conn.execute(" ".join(argv[1:]))
+        print("\t".join(d[0] for d in cursor.description or []))
+        for row in cursor:
+            print("\t".join("" if v is None else str(v) for v in row))
+    else:
+        records = export_records(conn, argv[1])
+        with open(argv[2], "w", encoding="utf-8") as f:
+            json.dump(records, f, indent=2, ensure_ascii=False)
+        print(f"Exported {len(records)} records to {argv[2]}")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
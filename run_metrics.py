@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and resource metrics of the sync and export runs
+A script's main() is wrapped with @instrument(job), and its pipeline marks
+stages with `with stage("fetch"):` (fetch, decode, aggregate, serialize,
+write). Each stage records wall time, CPU time (including pool worker
+processes), peak RSS growth, rows in / out, bytes downloaded or read, and
+bytes written (counted by atomic_write for every output file). Stages are
+timed exclusively: a stage entered inside another one pauses the outer
+one, so the stage times add up to the run time. Entering a stage again
+adds to it.
+
+At the end of a run RUN_METRICS_DIR (default .cache/metrics) gets
+<job>.json with the run's stages, a line in <job>.history.jsonl, and a
+<job>.prom Prometheus textfile (point RUN_METRICS_DIR at the node exporter
+textfile directory to scrape it). The stage table printed at the end
+compares each stage with the previous run.
+
+    python run_metrics.py [job ...]   show the last run of each job
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import atomic_write
+from atomic_write import atomic_open
+
+# Configuration
+RUN_METRICS_DIR = os.environ.get(
+    "RUN_METRICS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "metrics"),
+)
+METRIC_PREFIX = "nit_sync"
+COUNTERS = ["rows_in", "rows_out", "bytes_in", "bytes_written"]
+
+# Called with the stage name as a stage ends, while its data is still alive
+STAGE_HOOKS = []
+
+# The run in progress, None outside instrumented runs
+_current = None
+_lock = threading.Lock()
+
+
+def peak_rss():
+    """Peak resident set size of the process in bytes, None where unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cpu_time():
+    """CPU seconds of the process and its finished child processes"""
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+class RunMetrics:
+    """Stage metrics of one run, see module docstring"""
+
+    def __init__(self, job):
+        self.job = job
+        self.started = datetime.now()
+        self.start = (time.perf_counter(), cpu_time())
+        self.start_rss = peak_rss()
+        self.stages = {}
+        self.stack = []
+
+    def stats(self, name):
+        if name not in self.stages:
+            self.stages[name] = {
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "peak_rss_delta_bytes": None,
+                "calls": 0,
+                **{counter: 0 for counter in COUNTERS},
+            }
+        return self.stages[name]
+
+    def bank(self, frame, now):
+        """Add a frame's time since it last resumed to its stage"""
+        stats = self.stats(frame["name"])
+        stats["wall_seconds"] += now[0] - frame["resumed"][0]
+        stats["cpu_seconds"] += now[1] - frame["resumed"][1]
+
+    @contextmanager
+    def stage(self, name):
+        now = (time.perf_counter(), cpu_time())
+        if self.stack:
+            self.bank(self.stack[-1], now)
+        frame = {"name": name, "resumed": now, "rss": peak_rss()}
+        self.stack.append(frame)
+        stats = self.stats(name)
+        stats["calls"] += 1
+        try:
+            yield stats
+        finally:
+            now = (time.perf_counter(), cpu_time())
+            self.bank(self.stack.pop(), now)
+            if frame["rss"] is not None:
+                growth = peak_rss() - frame["rss"]
+                stats["peak_rss_delta_bytes"] = max(stats["peak_rss_delta_bytes"] or 0, growth)
+            for hook in STAGE_HOOKS:
+                hook(name)
+            if self.stack:
+                # Time spent in hooks goes to "other"
+                self.stack[-1]["resumed"] = (time.perf_counter(), cpu_time())
+
+    def count(self, counter, amount):
+        """Add to a counter of the innermost stage ("other" outside stages)"""
+        with _lock:
+            name = self.stack[-1]["name"] if self.stack else "other"
+            self.stats(name)[counter] += amount
+
+    def summary(self, ok):
+        wall = time.perf_counter() - self.start[0]
+        cpu = cpu_time() - self.start[1]
+        rss = peak_rss()
+        # Time outside any stage (setup, printing) goes to "other"
+        other = self.stats("other")
+        other["wall_seconds"] += max(0.0, wall - sum(s["wall_seconds"] for s in self.stages.values()))
+        other["cpu_seconds"] += max(0.0, cpu - sum(s["cpu_seconds"] for s in self.stages.values()))
+        stages = list(self.stages.values())
+        return {
+            "job": self.job,
+            "started": self.started.isoformat(),
+            "success": bool(ok),
+            "wall_seconds": round(wall, 4),
+            "cpu_seconds": round(cpu, 4),
+            "peak_rss_bytes": rss,
+            "peak_rss_delta_bytes": None if rss is None else rss - self.start_rss,
+            "stages": {
+                name: {
+                    k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()
+                }
+                for name, stats in self.stages.items()
+            },
+            # Stages hand rows on to each other, so the run's rows are those
+            # entering the first stage and leaving the last one that counts them
+            "rows_in": next((s["rows_in"] for s in stages if s["rows_in"]), 0),
+            "rows_out": next((s["rows_out"] for s in reversed(stages) if s["rows_out"]), 0),
+            "bytes_in": sum(s["bytes_in"] for s in stages),
+            "bytes_written": sum(s["bytes_written"] for s in stages),
+        }
+
+
+def prometheus_text(summary):
+    """Prometheus text exposition of a run summary"""
+    job = summary["job"]
+    lines = []
+
+    def metric(name, help_text, samples):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+        for labels, value in samples:
+            if value is None:
+                continue
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}")
+
+    run = {"job": job}
+    metric("run_success", "1 if the last run succeeded", [(run, int(summary["success"]))])
+    metric(
+        "run_timestamp_seconds",
+        "Start time of the last run",
+        [(run, round(datetime.fromisoformat(summary["started"]).timestamp(), 3))],
+    )
+    metric("run_wall_seconds", "Wall time of the last run", [(run, summary["wall_seconds"])])
+    metric("run_cpu_seconds", "CPU time of the last run", [(run, summary["cpu_seconds"])])
+    metric("run_peak_rss_bytes", "Peak RSS of the last run", [(run, summary["peak_rss_bytes"])])
+
+    stages = summary["stages"]
+    for field, help_text in (
+        ("wall_seconds", "Wall time spent in the stage"),
+        ("cpu_seconds", "CPU time spent in the stage"),
+        ("peak_rss_delta_bytes", "Growth of the peak RSS during the stage"),
+        ("rows_in", "Rows entering the stage"),
+        ("rows_out", "Rows leaving the stage"),
+        ("bytes_in", "Bytes downloaded or read in the stage"),
+        ("bytes_written", "Bytes written in the stage"),
+    ):
+        metric(
+            f"stage_{field}",
+            help_text,
+            [({"job": job, "stage": name}, s[field]) for name, s in stages.items()],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def load_last(job):
+    """Summary of a job's last run, None if there is none"""
+    try:
+        with open(os.path.join(RUN_METRICS_DIR, f"{job}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def format_bytes(num_bytes):
+    if num_bytes is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+def print_summary(summary, previous=None):
+    """Stage table, with the wall time change against the previous run"""
+    before = (previous or {}).get("stages", {})
+    print(
+        f"\nRun metrics ({summary['job']}): {summary['wall_seconds']:.2f}s wall, "
+        f"{summary['cpu_seconds']:.2f}s CPU, peak RSS {format_bytes(summary['peak_rss_bytes'])}"
+    )
+    print(
+        f"  {'stage':<10} {'wall':>8} {'cpu':>8} {'rss +':>9} {'rows in':>8} {'rows out':>8} "
+        f"{'read':>9} {'written':>9}  vs last"
+    )
+    for name, s in summary["stages"].items():
+        change = ""
+        # Stages shorter than this are noise between runs
+        if name in before and before[name]["wall_seconds"] >= 0.05:
+            ratio = s["wall_seconds"] / before[name]["wall_seconds"] - 1
+            change = f"{ratio:+.0%}"
+        print(
+            f"  {name:<10} {s['wall_seconds']:>7.2f}s {s['cpu_seconds']:>7.2f}s "
+            f"{format_bytes(s['peak_rss_delta_bytes']):>9} {s['rows_in']:>8} {s['rows_out']:>8} "
+            f"{format_bytes(s['bytes_in']):>9} {format_bytes(s['bytes_written']):>9}  {change}"
+        )
+
+
+def start_run(job):
+    """Start collecting metrics for a run"""
+    global _current
+    _current = RunMetrics(job)
+    return _current
+
+
+def finish_run(ok=True):
+    """Write the current run's metrics files and print its stage table"""
+    global _current
+    metrics, _current = _current, None
+    if metrics is None:
+        return None
+    summary = metrics.summary(ok)
+    previous = load_last(metrics.job)
+    try:
+        os.makedirs(RUN_METRICS_DIR, exist_ok=True)
+        with atomic_open(os.path.join(RUN_METRICS_DIR, f"{metrics.job}.json")) as f:
+            json.dump(summary, f, indent=2)
+        with open(
+            os.path.join(RUN_METRICS_DIR, f"{metrics.job}.history.jsonl"), "a", encoding="utf-8"
+        ) as f:
+            f.write(json.dumps(summary, separators=(",", ":")) + "\n")
+        with atomic_open(os.path.join(RUN_METRICS_DIR, f"{metrics.job}.prom")) as f:
+            f.write(prometheus_text(summary))
+    except OSError as e:
+        # Metrics never fail a sync
+        print(f"WARNING: could not write run metrics: {e}")
+    print_summary(summary, previous)
+    return summary
+
+
+@contextmanager
+def stage(name):
+    """Time a stage of the current run; does nothing outside a run"""
+    if _current is None:
+        yield None
+        return
+    with _current.stage(name) as stats:
+        yield stats
+
+
+def count(counter, amount):
+    """Add to rows_in / rows_out / bytes_in / bytes_written of the current stage"""
+    if _current is not None and amount:
+        _current.count(counter, amount)
+
+
+def instrument(job):
+    """
+    Decorator running a script's main() as an instrumented run
+
+    Success follows the sync_daemon convention: True / False, or an exit
+    status where 0 and None mean success.
+    """
+
+    def decorate(main):
+        @functools.wraps(main)
+        def run(*args, **kwargs):
+            start_run(job)
+            ok = False
+            try:
+                result = main(*args, **kwargs)
+                ok = result if isinstance(result, bool) else not result
+                return result
+            finally:
+                finish_run(ok)
+
+        run.job = job
+        return run
+
+    return decorate
+
+
+# Every output file goes through atomic_write
+atomic_write.WRITE_HOOKS.append(lambda path: count("bytes_written", os.path.getsize(path)))
+
+
+def main(argv):
+    jobs = argv
+    if not jobs and os.path.isdir(RUN_METRICS_DIR):
+        jobs = sorted(n[: -len(".json")] for n in os.listdir(RUN_METRICS_DIR) if n.endswith(".json"))
+    if not jobs:
+        print(f"No run metrics in {RUN_METRICS_DIR}")
+        return 1
+    for job in jobs:
+        summary = load_last(job)
+        if summary is None:
+            print(f"No run metrics for {job}")
+            continue
+        print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
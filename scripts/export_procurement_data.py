@@ -6,10 +6,18 @@ for use in the Procurement Dashboard.
 """
 
 import os
-import json
+import sys
 from datetime import datetime
 from collections import defaultdict
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_output import write_dataset
+from attachment_store import stored_paths, sync_attachments
+from entity_resolution import resolve_names
+from profiling import run_script
+from run_metrics import count, instrument, stage
+from sheet_sources import dataset_key, fetch_sheets, merge_records, replaying, sheet_ids
+
 try:
     import smartsheet
 except ImportError:
@@ -20,8 +28,31 @@ except ImportError:
 
 # Configuration
 TOKEN = os.environ.get('SMARTSHEET_ACCESS_TOKEN', 'C5MqdG1kJeP9hYPzRAMo7cSEAf30DHmcdwNIE')
-PR_SHEET_ID = 7610099599101828  # PR to PO report
-VENDOR_SHEET_ID = 1185309157969796  # Vendor Evaluation Log 2025
+# Sheets of each dataset (e.g. one evaluation log per year), see sheet_sources.json
+PR_SHEETS = sheet_ids('pr_export')  # PR to PO report
+VENDOR_SHEETS = sheet_ids('vendor_evaluation')  # Vendor Evaluation Logs
+
+# Dates and amounts of the PR records
+PR_FIELD_TYPES = {
+    'submission_date': 'date',
+    'approved_date': 'date',
+    'return_date': 'date',
+    'pending_since': 'date',
+    'pr_value': 'float64',
+    'po_value': 'float64',
+    'pr_to_po_days': 'float64'
+}
+PR_FILTER_DIMS = {
+    'project': 'project',
+    'vendor': 'vendor',
+    'status': 'status',
+    'agent': 'pending_with',
+    'month': ('submission_date', 'month')
+}
+VENDOR_FILTER_DIMS = {
+    'category': 'category'
+}
+PR_SEARCH_FIELDS = ['description', 'pr_note']
 
 # Output directory
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
@@ -37,13 +68,19 @@ def get_cell_value(row, col_map, col_name):
             return cell.value
     return None
 
+def sheet_rows(sheets, key_column):
+    """(row, col_map) of every sheet, rows superseded by a later sheet dropped"""
+    shards = []
+    for sheet in sheets:
+        col_map = {col.title: col.id for col in sheet.columns}
+        shards.append([(row, col_map) for row in sheet.rows])
+    return merge_records(shards, lambda item: get_cell_value(item[0], item[1], key_column))
+
 def export_pr_data(client):
     """Export PR to PO data"""
     print("📥 Fetching PR to PO data...")
-    sheet = client.Sheets.get_sheet(PR_SHEET_ID)
-
-    # Create column map
-    col_map = {col.title: col.id for col in sheet.columns}
+    with stage('fetch'):
+        sheets = fetch_sheets(PR_SHEETS, client.Sheets.get_sheet, model=smartsheet.models.Sheet)
 
     # Process rows
     pr_data = []
@@ -52,102 +89,110 @@ def export_pr_data(client):
 
     current_year = datetime.now().year
 
-    for row in sheet.rows:
-        pr_status = get_cell_value(row, col_map, 'PR Status')
-        pr_date = get_cell_value(row, col_map, 'PR Submission Date')
-        pr_approved_date = get_cell_value(row, col_map, 'PR Approved Date')
-        pr_return_date = get_cell_value(row, col_map, 'PR Return Date')
-        pr_to_po_days = get_cell_value(row, col_map, 'PR to PO in days')
-
-        # Count by status
-        if pr_status:
-            status_counts[pr_status] += 1
-
-        # Parse date and get year/month - count by STATUS not just by date
-        if pr_approved_date:
-            try:
-                if isinstance(pr_approved_date, str):
-                    date_obj = datetime.strptime(pr_approved_date[:10], '%Y-%m-%d')
-                else:
-                    date_obj = pr_approved_date
-
-                year = date_obj.year
-                month = date_obj.month
-
-                if year == current_year:
-                    # Only count as approved if status is APPROVED
-                    if pr_status == 'APPROVED':
-                        monthly_stats[month]['approved'] += 1
-
-                    # Only count as returned if status is RETURNED
-                    if pr_status == 'RETURNED':
-                        monthly_stats[month]['returned'] += 1
-
-            except Exception as e:
-                pass
-
-        # Get additional columns for delay reasons
-        pr_note = get_cell_value(row, col_map, 'PR Note')
-        pending_with = get_cell_value(row, col_map, 'Pending With')
-        pending_since = get_cell_value(row, col_map, 'Pending Since')
-
-        # Store row data
-        pr_data.append({
-            'pr_num': get_cell_value(row, col_map, 'Pr Num'),
-            'project': get_cell_value(row, col_map, 'Project Name'),
-            'description': get_cell_value(row, col_map, 'Description'),
-            'status': pr_status,
-            'submission_date': str(pr_date)[:10] if pr_date else None,
-            'approved_date': str(pr_approved_date)[:10] if pr_approved_date else None,
-            'return_date': str(pr_return_date)[:10] if pr_return_date else None,
-            'vendor': get_cell_value(row, col_map, 'Vendor Name'),
-            'pr_value': get_cell_value(row, col_map, 'PR Value'),
-            'po_value': get_cell_value(row, col_map, 'PO Value'),
-            'pr_to_po_days': pr_to_po_days,
-            'pr_note': pr_note,
-            'pending_with': pending_with,
-            'pending_since': str(pending_since)[:10] if pending_since else None
-        })
-
-    # Build monthly arrays for charts
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    monthly_approved = [monthly_stats[i+1]['approved'] for i in range(12)]
-    monthly_returned = [monthly_stats[i+1]['returned'] for i in range(12)]
-
-    # Calculate return rates
-    monthly_return_rate = []
-    for i in range(12):
-        approved = monthly_stats[i+1]['approved']
-        returned = monthly_stats[i+1]['returned']
-        rate = round((returned / approved * 100), 1) if approved > 0 else 0
-        monthly_return_rate.append(rate)
-
-    # Summary stats
-    total_approved = sum(monthly_approved)
-    total_returned = sum(monthly_returned)
-
-    result = {
-        'last_updated': datetime.now().isoformat(),
-        'summary': {
-            'total_prs': len(pr_data),
-            'total_approved_2025': total_approved,
-            'total_returned_2025': total_returned,
-            'return_rate_2025': round((total_returned / total_approved * 100), 1) if total_approved > 0 else 0,
-            'status_breakdown': dict(status_counts)
-        },
-        'monthly': {
-            'labels': months,
-            'approved': monthly_approved,
-            'returned': monthly_returned,
-            'return_rate': monthly_return_rate
-        },
-        'all_prs': pr_data  # All PRs for filtering
-    }
+    with stage('decode'):
+        for row, col_map in sheet_rows(sheets, dataset_key('pr_export')):
+            pr_status = get_cell_value(row, col_map, 'PR Status')
+            pr_date = get_cell_value(row, col_map, 'PR Submission Date')
+            pr_approved_date = get_cell_value(row, col_map, 'PR Approved Date')
+            pr_return_date = get_cell_value(row, col_map, 'PR Return Date')
+            pr_to_po_days = get_cell_value(row, col_map, 'PR to PO in days')
+
+            # Count by status
+            if pr_status:
+                status_counts[pr_status] += 1
+
+            # Parse date and get year/month - count by STATUS not just by date
+            if pr_approved_date:
+                try:
+                    if isinstance(pr_approved_date, str):
+                        date_obj = datetime.strptime(pr_approved_date[:10], '%Y-%m-%d')
+                    else:
+                        date_obj = pr_approved_date
+
+                    year = date_obj.year
+                    month = date_obj.month
+
+                    if year == current_year:
+                        # Only count as approved if status is APPROVED
+                        if pr_status == 'APPROVED':
+                            monthly_stats[month]['approved'] += 1
+
+                        # Only count as returned if status is RETURNED
+                        if pr_status == 'RETURNED':
+                            monthly_stats[month]['returned'] += 1
+
+                except Exception as e:
+                    pass
+
+            # Get additional columns for delay reasons
+            pr_note = get_cell_value(row, col_map, 'PR Note')
+            pending_with = get_cell_value(row, col_map, 'Pending With')
+            pending_since = get_cell_value(row, col_map, 'Pending Since')
+
+            # Store row data
+            pr_data.append({
+                'pr_num': get_cell_value(row, col_map, 'Pr Num'),
+                'project': get_cell_value(row, col_map, 'Project Name'),
+                'description': get_cell_value(row, col_map, 'Description'),
+                'status': pr_status,
+                'submission_date': str(pr_date)[:10] if pr_date else None,
+                'approved_date': str(pr_approved_date)[:10] if pr_approved_date else None,
+                'return_date': str(pr_return_date)[:10] if pr_return_date else None,
+                'vendor': get_cell_value(row, col_map, 'Vendor Name'),
+                'pr_value': get_cell_value(row, col_map, 'PR Value'),
+                'po_value': get_cell_value(row, col_map, 'PO Value'),
+                'pr_to_po_days': pr_to_po_days,
+                'pr_note': pr_note,
+                'pending_with': pending_with,
+                'pending_since': str(pending_since)[:10] if pending_since else None
+            })
+        count('rows_in', sum(len(sheet.rows) for sheet in sheets))
+        count('rows_out', len(pr_data))
+
+    with stage('aggregate'):
+        count('rows_in', len(pr_data))
+
+        # Entity id next to the raw vendor, shared with the vendor evaluation log
+        resolve_names(pr_data, 'vendor', 'procurement')
+
+        # Build monthly arrays for charts
+        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+        monthly_approved = [monthly_stats[i+1]['approved'] for i in range(12)]
+        monthly_returned = [monthly_stats[i+1]['returned'] for i in range(12)]
+
+        # Calculate return rates
+        monthly_return_rate = []
+        for i in range(12):
+            approved = monthly_stats[i+1]['approved']
+            returned = monthly_stats[i+1]['returned']
+            rate = round((returned / approved * 100), 1) if approved > 0 else 0
+            monthly_return_rate.append(rate)
+
+        # Summary stats
+        total_approved = sum(monthly_approved)
+        total_returned = sum(monthly_returned)
+
+        result = {
+            'last_updated': datetime.now().isoformat(),
+            'summary': {
+                'total_prs': len(pr_data),
+                'total_approved_2025': total_approved,
+                'total_returned_2025': total_returned,
+                'return_rate_2025': round((total_returned / total_approved * 100), 1) if total_approved > 0 else 0,
+                'status_breakdown': dict(status_counts)
+            },
+            'monthly': {
+                'labels': months,
+                'approved': monthly_approved,
+                'returned': monthly_returned,
+                'return_rate': monthly_return_rate
+            },
+            'all_prs': pr_data  # All PRs for filtering
+        }
 
     # Save to file
     output_file = os.path.join(OUTPUT_DIR, 'pr_data.json')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    write_dataset(output_file, result, {('all_prs',): ('submission_date', True)}, {('all_prs',): PR_FIELD_TYPES}, record_keys={('all_prs',): 'pr_num'}, filter_dims={('all_prs',): PR_FILTER_DIMS}, search_fields={('all_prs',): PR_SEARCH_FIELDS})
 
     print(f"✅ PR data exported to {output_file}")
     print(f"   Total PRs: {len(pr_data)}")
@@ -159,10 +204,9 @@ def export_pr_data(client):
 def export_vendor_data(client):
     """Export Vendor Evaluation data with attachments"""
     print("\n📥 Fetching Vendor Evaluation data...")
-    sheet = client.Sheets.get_sheet(VENDOR_SHEET_ID, include='attachments')
-
-    # Create column map
-    col_map = {col.title: col.id for col in sheet.columns}
+    with stage('fetch'):
+        sheets = fetch_sheets(VENDOR_SHEETS, lambda sheet_id: client.Sheets.get_sheet(sheet_id, include='attachments'), model=smartsheet.models.Sheet)
+    row_sheets = {row.id: sheet.id for sheet in sheets for row in sheet.rows}
 
     # Process rows
     vendors = []
@@ -170,85 +214,112 @@ def export_vendor_data(client):
     total_score = 0
     evaluated_count = 0
 
-    for row in sheet.rows:
-        vendor_name = get_cell_value(row, col_map, 'Vendor Name')
-        category = get_cell_value(row, col_map, 'Vendor Category')
-        avg_percent = get_cell_value(row, col_map, 'Average %')
-
-        if not vendor_name:
-            continue
-
-        score = float(avg_percent) if avg_percent else 0
-
-        # Get attachments
-        attachments = []
-        if hasattr(row, 'attachments') and row.attachments:
-            for att in row.attachments:
-                attachments.append({
-                    'id': att.id,
-                    'name': att.name,
-                    'mime_type': getattr(att, 'mime_type', 'application/octet-stream'),
-                    'size': getattr(att, 'size_in_kb', 0)
-                })
-
-        # Score distribution
-        if score == 0:
-            pass  # Not evaluated
-        elif score < 20:
-            score_distribution['below_20'] += 1
-            evaluated_count += 1
-            total_score += score
-        elif score < 40:
-            score_distribution['20_40'] += 1
-            evaluated_count += 1
-            total_score += score
-        elif score < 60:
-            score_distribution['40_60'] += 1
-            evaluated_count += 1
-            total_score += score
-        elif score < 70:
-            score_distribution['60_70'] += 1
-            evaluated_count += 1
-            total_score += score
-        else:
-            score_distribution['above_70'] += 1
-            evaluated_count += 1
-            total_score += score
-
-        vendors.append({
-            'name': vendor_name,
-            'category': category,
-            'score': round(score, 1),
-            'attachments': attachments,
-            'row_id': row.id
-        })
-
-    # Sort by score descending
-    vendors.sort(key=lambda x: x['score'], reverse=True)
-
-    # Calculate stats
-    pending_count = len([v for v in vendors if v['score'] == 0])
-    completed_count = evaluated_count
-    avg_score = round(total_score / evaluated_count, 1) if evaluated_count > 0 else 0
-
-    result = {
-        'last_updated': datetime.now().isoformat(),
-        'summary': {
-            'total_vendors': len(vendors),
-            'evaluations_requested': len(vendors),
-            'evaluations_done': completed_count,
-            'evaluations_pending': pending_count,
-            'average_score': avg_score,
-            'completion_rate': round((completed_count / len(vendors) * 100), 1) if vendors else 0
-        },
-        'score_distribution': score_distribution,
-        'vendors': vendors
-    }
+    with stage('decode'):
+        for row, col_map in sheet_rows(sheets, dataset_key('vendor_evaluation')):
+            vendor_name = get_cell_value(row, col_map, 'Vendor Name')
+            category = get_cell_value(row, col_map, 'Vendor Category')
+            avg_percent = get_cell_value(row, col_map, 'Average %')
+
+            if not vendor_name:
+                continue
+
+            score = float(avg_percent) if avg_percent else 0
+
+            # Get attachments
+            attachments = []
+            if hasattr(row, 'attachments') and row.attachments:
+                for att in row.attachments:
+                    attachments.append({
+                        'id': att.id,
+                        'name': att.name,
+                        'type': str(getattr(att, 'attachment_type', 'FILE')),
+                        'mime_type': getattr(att, 'mime_type', 'application/octet-stream'),
+                        'size': getattr(att, 'size_in_kb', 0),
+                        'sheet_id': row_sheets[row.id]
+                    })
+
+            # Score distribution
+            if score == 0:
+                pass  # Not evaluated
+            elif score < 20:
+                score_distribution['below_20'] += 1
+                evaluated_count += 1
+                total_score += score
+            elif score < 40:
+                score_distribution['20_40'] += 1
+                evaluated_count += 1
+                total_score += score
+            elif score < 60:
+                score_distribution['40_60'] += 1
+                evaluated_count += 1
+                total_score += score
+            elif score < 70:
+                score_distribution['60_70'] += 1
+                evaluated_count += 1
+                total_score += score
+            else:
+                score_distribution['above_70'] += 1
+                evaluated_count += 1
+                total_score += score
+
+            vendors.append({
+                'name': vendor_name,
+                'category': category,
+                'score': round(score, 1),
+                'attachments': attachments,
+                'row_id': row.id
+            })
+        count('rows_in', sum(len(sheet.rows) for sheet in sheets))
+        count('rows_out', len(vendors))
+
+    # Download the evaluation files and link the local copies
+    # (links to other sites have no file to download)
+    files = [att for vendor in vendors for att in vendor['attachments'] if att['type'] == 'FILE']
+    if replaying():
+        # Offline: link the copies already in the store, download nothing
+        local_paths = stored_paths(files)
+    else:
+        with stage('fetch'):
+            local_paths = sync_attachments(client, files)
+    for vendor in vendors:
+        for att in vendor['attachments']:
+            att['local_path'] = local_paths.get(str(att['id']))
+        vendor['local_pdfs'] = list(dict.fromkeys(
+            att['local_path'] for att in vendor['attachments']
+            if att['local_path'] and att['local_path'].endswith('.pdf')
+        ))
+
+    with stage('aggregate'):
+        count('rows_in', len(vendors))
+
+        # Same vendor ids as the PR data
+        resolve_names(vendors, 'name', 'vendor_evaluation', 'vendor_id')
+
+        # Sort by score descending
+        vendors.sort(key=lambda x: x['score'], reverse=True)
+
+        # Calculate stats
+        pending_count = len([v for v in vendors if v['score'] == 0])
+        completed_count = evaluated_count
+        avg_score = round(total_score / evaluated_count, 1) if evaluated_count > 0 else 0
+
+        result = {
+            'last_updated': datetime.now().isoformat(),
+            'summary': {
+                'total_vendors': len(vendors),
+                'evaluations_requested': len(vendors),
+                'evaluations_done': completed_count,
+                'evaluations_pending': pending_count,
+                'average_score': avg_score,
+                'completion_rate': round((completed_count / len(vendors) * 100), 1) if vendors else 0
+            },
+            'score_distribution': score_distribution,
+            'vendors': vendors
+        }
 
     # Save to file
     output_file = os.path.join(OUTPUT_DIR, 'vendor_data.json')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    write_dataset(output_file, result, {('vendors',): None}, record_keys={('vendors',): 'row_id'}, filter_dims={('vendors',): VENDOR_FILTER_DIMS})
 
     print(f"✅ Vendor data exported to {output_file}")
     print(f"   Total Vendors: {len(vendors)}")
@@ -257,6 +328,7 @@ def export_vendor_data(client):
 
     return result
 
+@instrument('export_procurement_data')
 def main():
     print("=" * 60)
     print("📊 Exporting Procurement Data from Smartsheet")
@@ -273,4 +345,4 @@ def main():
     print("=" * 60)
 
 if __name__ == '__main__':
-    main()
+    run_script(main)
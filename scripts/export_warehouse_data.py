@@ -4,16 +4,92 @@ Warehouse Data Export Script
 Processes Excel files and exports to JSON for dashboard consumption.
 """
 
+import numpy as np
 import pandas as pd
-import json
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import json
 import os
 import sys
 
-# File paths
-SURPLUS_FILE = '/Users/a.rahman/Library/Caches/Spark Mail/messagesData/1/70920/MATERIALS IUSSANCE from Surplus.xlsx'
-STORE_FILE = '/Users/a.rahman/Desktop/NIT/Amr/Invintory update till 2-12-2025/Asir Modon-2 Store Movment Materials.xlsx'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_output import file_hash as output_hash, write_dataset, write_json
+from profiling import run_script
+from run_metrics import count, instrument, stage
+from atomic_write import atomic_path
+from workbook_cache import file_hash, read_workbook
+
+# File paths (override with WAREHOUSE_SURPLUS_FILE / WAREHOUSE_STORE_FILE)
+SURPLUS_FILE = os.environ.get('WAREHOUSE_SURPLUS_FILE', '/Users/a.rahman/Library/Caches/Spark Mail/messagesData/1/70920/MATERIALS IUSSANCE from Surplus.xlsx')
+STORE_FILE = os.environ.get('WAREHOUSE_STORE_FILE', '/Users/a.rahman/Desktop/NIT/Amr/Invintory update till 2-12-2025/Asir Modon-2 Store Movment Materials.xlsx')
 OUTPUT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'warehouse_data.json')
+# Inbox mode: new or changed workbooks in WAREHOUSE_INBOX are merged into the existing output
+INBOX_DIR = os.environ.get('WAREHOUSE_INBOX', '')
+MANIFEST_FILE = os.path.join(os.path.dirname(OUTPUT_FILE), 'warehouse_manifest.json')
+# Merged inbox records with the workbook each came from (not published)
+INBOX_STATE_FILE = os.environ.get('WAREHOUSE_INBOX_STATE', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'warehouse_inbox.pkl'))
+# Top-level sections of this script's output; inbox mode only merges into that layout
+OUTPUT_SECTIONS = ['surplus_transfers', 'inventory', 'movements']
+# Worker processes for parsing workbooks (1 = parse in this process)
+WORKERS = int(os.environ.get('WAREHOUSE_WORKERS', '0') or 0) or os.cpu_count() or 1
+# Sheets and columns read from the workbooks (datetime = every day column)
+SURPLUS_SHEET = 'OCT 25'
+INVENTORY_SHEET = 'Sammary'
+INVENTORY_COLUMNS = [
+    'S/N', 'Project Name', 'ITEM CODE', 'MATERIALS DESCRIPTION', 'Size', 'Unit',
+    'LOCATION', 'Sup Location', 'Total Received', 'Total Issued', 'Balance'
+]
+MOVEMENTS_SHEET = 'Issued Materials'
+MOVEMENT_COLUMNS = ['S/N', 'MATERIALS DESCRIPTION', datetime]
+# Long material x date x qty issuance table, see load_movements
+MOVEMENTS_FILE = os.path.join(os.path.dirname(OUTPUT_FILE), 'warehouse_movements.json')
+
+# Record columns, for merging inbox workbooks into existing records
+TRANSFER_COLUMNS = ['id', 'description', 'qty', 'unit', 'store', 'from_project', 'to_project', 'date', 'remark']
+MATERIAL_COLUMNS = [
+    'id', 'project', 'item_code', 'description', 'size', 'unit', 'location', 'sub_location',
+    'received', 'issued', 'balance', 'status'
+]
+MOVEMENT_RECORD_COLUMNS = ['sn', 'description', 'date', 'qty']
+# Non-string columns of each record type
+MATERIAL_FIELD_TYPES = {
+    'id': 'int64',
+    'received': 'int64',
+    'issued': 'int64',
+    'balance': 'int64'
+}
+TRANSFER_FIELD_TYPES = {
+    'id': 'int64',
+    'qty': 'int64',
+    'date': 'date'
+}
+MOVEMENT_FIELD_TYPES = {
+    'sn': 'int64',
+    'date': 'date',
+    'qty': 'float64'
+}
+# A newer workbook replaces the same records from an older one (e.g. a
+# weekly copy of a cumulative workbook), see merge_records
+MATERIAL_KEY = ['project', 'item_code', 'description', 'location', 'sub_location']
+MOVEMENT_KEY = ['description', 'date']
+TRANSFER_KEY = ['description', 'store', 'from_project', 'to_project', 'date']
+# Filter dimensions and free-text fields of the published records
+MATERIAL_FILTER_DIMS = {
+    'project': 'project',
+    'location': 'location',
+    'sub_location': 'sub_location',
+    'status': 'status',
+    'unit': 'unit'
+}
+TRANSFER_FILTER_DIMS = {
+    'store': 'store',
+    'from_project': 'from_project',
+    'to_project': 'to_project',
+    'status': 'remark',
+    'month': ('date', 'month')
+}
+MATERIAL_SEARCH_FIELDS = ['description', 'item_code']
+TRANSFER_SEARCH_FIELDS = ['description', 'remark']
 
 def clean_value(val):
     """Clean and normalize values"""
@@ -50,87 +126,133 @@ def parse_date(date_val):
                 continue
     return None
 
-def process_surplus_transfers():
-    """Process surplus materials transfer file"""
-    print("Processing Surplus Transfers...")
-
-    # Read with header row at index 0
-    df = pd.read_excel(SURPLUS_FILE, sheet_name='OCT 25', header=0)
-
+def clean_column(series):
+    """clean_value over a whole column, as an object column with None for blanks"""
+    values = series.astype(object)
+    missing = values.isna()
+    if not pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_datetime64_any_dtype(series):
+        # .str yields NaN for the non-string cells, which keep their value
+        stripped = values.str.strip()
+        values = values.where(stripped.isna(), stripped)
+        missing |= stripped.isin(['0', '', 'NaN', 'nan'])
+    return values.where(~missing, None)
+
+def numeric_column(series):
+    """clean_numeric over a whole column, as floats"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Series(0.0, index=series.index)
+    return pd.to_numeric(series, errors='coerce').fillna(0).astype(float)
+
+def date_column(series):
+    """parse_date over a whole column, as YYYY-MM-DD strings or None"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        dates = series
+    else:
+        values = series.astype(object)
+        stamps = values.where(values.map(lambda v: isinstance(v, datetime)))
+        text = values.str.strip()
+        text = text.where(~text.str.contains(' ', regex=False, na=False), text.str.split().str[0])
+        dates = pd.to_datetime(stamps, errors='coerce')
+        # Same format order as parse_date; '%Y-%m-%d %H:%M:%S' can never match a split value
+        for fmt in ['%d/%m/%Y', '%Y-%m-%d']:
+            dates = dates.fillna(pd.to_datetime(text, format=fmt, errors='coerce'))
+    formatted = dates.dt.strftime('%Y-%m-%d').astype(object)
+    return formatted.where(dates.notna(), None)
+
+def is_truthy(series):
+    """Python truthiness of a cleaned object column"""
+    return series.notna() & (series != 0)
+
+def distinct_values(series):
+    """Sorted distinct truthy values of a cleaned column"""
+    return sorted(set(series[is_truthy(series)].tolist()))
+
+def group_totals(keys, values=None):
+    """Count (and sum values) per key, keys in order of first appearance"""
+    frame = pd.DataFrame({'key': keys, 'value': 0 if values is None else values})
+    grouped = frame.groupby('key', sort=False)['value']
+    return grouped.size(), grouped.sum()
+
+def sequential_sums(values, keys, sort=True):
+    """
+    Sum values per key (or per tuple of a list of key columns), adding them
+    one by one in row order; keys in order of first appearance unless sorted
+    """
+    # pandas sums (groupby sum and cumsum) are compensated, which rounds
+    # fractional quantities differently from the running totals of the
+    # original export, so these totals are kept in a plain loop
+    if isinstance(keys, list):
+        keys = zip(*keys)
+    totals = {}
+    for key, value in zip(keys, values.tolist()):
+        totals[key] = totals.get(key, 0) + value
+    totals = pd.Series(totals, dtype=float)
+    return totals.sort_index() if sort else totals
+
+def frame_records(frame):
+    """DataFrame rows as JSON-ready dicts, missing values as None"""
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+def records_frame(records, columns):
+    """DataFrame of existing output records, keeping the columns when empty"""
+    return pd.DataFrame(records) if records else pd.DataFrame(columns=columns)
+
+def surplus_frame(df):
+    """Clean transfer records of a surplus sheet"""
     # Clean column names
     df.columns = ['id', 'Description', 'Qty', 'Store', 'Unit', 'From Project', 'To Project', 'date', 'Remark']
 
     # Filter out empty rows
     df = df.dropna(subset=['Description'])
 
-    transfers = []
-    monthly_data = {}
-
-    for idx, row in df.iterrows():
-        date_str = parse_date(row.get('date'))
-
-        qty_val = clean_numeric(row.get('Qty', 0))
-
-        transfer = {
-            'id': int(idx) + 1,
-            'description': clean_value(row.get('Description', '')),
-            'qty': int(qty_val),
-            'unit': clean_value(row.get('Unit', '')),
-            'store': clean_value(row.get('Store', '')),
-            'from_project': clean_value(row.get('From Project', '')),
-            'to_project': clean_value(row.get('To Project', '')),
-            'date': date_str,
-            'remark': clean_value(row.get('Remark', '')) or 'Pending'
-        }
-        transfers.append(transfer)
-
-        # Aggregate by month
-        if date_str:
-            month_key = date_str[:7]  # YYYY-MM
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {'count': 0, 'quantity': 0}
-            monthly_data[month_key]['count'] += 1
-            monthly_data[month_key]['quantity'] += transfer['qty']
+    remark = clean_column(df['Remark'])
+    frame = pd.DataFrame({
+        'id': df.index.astype(int) + 1,
+        'description': clean_column(df['Description']),
+        'qty': numeric_column(df['Qty']).astype(int),
+        'unit': clean_column(df['Unit']),
+        'store': clean_column(df['Store']),
+        'from_project': clean_column(df['From Project']),
+        'to_project': clean_column(df['To Project']),
+        'date': date_column(df['date']),
+        'remark': remark.where(is_truthy(remark), 'Pending')
+    }, index=df.index)
+    return frame
+
+def summarize_transfers(frame):
+    """Summary, charts and filters of transfer records"""
+    transfers = frame_records(frame)
+
+    # Aggregate by month
+    dated = frame[frame['date'].notna()]
+    month_counts_by_key, month_quantities_by_key = group_totals(dated['date'].str[:7], dated['qty'])
 
     # Get unique values for filters
-    stores = sorted(list(set(t['store'] for t in transfers if t['store'])))
-    from_projects = sorted(list(set(t['from_project'] for t in transfers if t['from_project'])))
-    to_projects = sorted(list(set(t['to_project'] for t in transfers if t['to_project'])))
-    units = sorted(list(set(t['unit'] for t in transfers if t['unit'])))
+    stores = distinct_values(frame['store'])
+    from_projects = distinct_values(frame['from_project'])
+    to_projects = distinct_values(frame['to_project'])
+    units = distinct_values(frame['unit'])
 
     # Sort monthly data
-    sorted_months = sorted(monthly_data.keys())
-    month_labels = []
-    month_counts = []
-    month_quantities = []
-
-    for m in sorted_months:
-        month_labels.append(datetime.strptime(m, '%Y-%m').strftime('%b %Y'))
-        month_counts.append(monthly_data[m]['count'])
-        month_quantities.append(monthly_data[m]['quantity'])
+    sorted_months = sorted(month_counts_by_key.index)
+    month_labels = [datetime.strptime(m, '%Y-%m').strftime('%b %Y') for m in sorted_months]
+    month_counts = [int(month_counts_by_key[m]) for m in sorted_months]
+    month_quantities = [int(month_quantities_by_key[m]) for m in sorted_months]
 
     # Top materials by quantity
-    material_qty = {}
-    for t in transfers:
-        desc = t['description']
-        if desc:
-            material_qty[desc] = material_qty.get(desc, 0) + t['qty']
-
+    described = frame[is_truthy(frame['description'])]
+    material_qty = group_totals(described['description'], described['qty'])[1]
     top_materials = sorted(material_qty.items(), key=lambda x: x[1], reverse=True)[:10]
 
     # Transfers by store
-    store_counts = {}
-    for t in transfers:
-        store = t['store']
-        if store:
-            store_counts[store] = store_counts.get(store, 0) + 1
+    store_counts = group_totals(frame['store'][is_truthy(frame['store'])])[0]
 
-    confirmed_count = len([t for t in transfers if t['remark'] == 'Confirmed'])
+    confirmed_count = int((frame['remark'] == 'Confirmed').sum())
 
     return {
         'summary': {
             'total_transfers': len(transfers),
-            'total_quantity': sum(t['qty'] for t in transfers),
+            'total_quantity': int(frame['qty'].sum()),
             'unique_materials': len(material_qty),
             'active_stores': len(stores),
             'confirmed_count': confirmed_count,
@@ -143,11 +265,11 @@ def process_surplus_transfers():
         },
         'top_materials': {
             'labels': [m[0][:30] + '...' if len(m[0]) > 30 else m[0] for m in top_materials],
-            'quantities': [m[1] for m in top_materials]
+            'quantities': [int(m[1]) for m in top_materials]
         },
         'by_store': {
-            'labels': list(store_counts.keys()),
-            'counts': list(store_counts.values())
+            'labels': store_counts.index.tolist(),
+            'counts': store_counts.tolist()
         },
         'filters': {
             'stores': stores,
@@ -158,102 +280,85 @@ def process_surplus_transfers():
         'transfers': transfers
     }
 
-def process_inventory():
-    """Process Asir Modon-2 inventory summary"""
-    print("Processing Inventory Summary...")
-
-    # Read Summary sheet with correct header
-    df = pd.read_excel(STORE_FILE, sheet_name='Sammary', header=0)
-
+def inventory_frame(df):
+    """Clean material records of an inventory summary sheet"""
     # Skip empty rows at start
     df = df.dropna(subset=['MATERIALS DESCRIPTION'])
     df = df[df['S/N'].notna()]
 
-    materials = []
-
-    for idx, row in df.iterrows():
-        received = clean_numeric(row.get('Total Received', 0))
-        issued = clean_numeric(row.get('Total Issued', 0))
-        balance = clean_numeric(row.get('Balance', 0))
-
-        # Determine status
-        if balance < 0:
-            status = 'critical'
-        elif balance == 0:
-            status = 'zero'
-        elif received > 0 and balance < received * 0.2:
-            status = 'low'
-        else:
-            status = 'normal'
-
-        location = clean_value(row.get('LOCATION', ''))
-        sub_location = clean_value(row.get('Sup Location', ''))
-
-        # Skip items with location = '0' or numeric only
-        if location and str(location) in ['0', '0.0']:
-            location = None
-        if sub_location and str(sub_location) in ['0', '0.0']:
-            sub_location = None
-
-        material = {
-            'id': int(clean_numeric(row.get('S/N', 0))) or len(materials) + 1,
-            'project': clean_value(row.get('Project Name', '')),
-            'item_code': str(clean_value(row.get('ITEM CODE', '')) or ''),
-            'description': clean_value(row.get('MATERIALS DESCRIPTION', '')),
-            'size': str(clean_value(row.get('Size', '')) or ''),
-            'unit': clean_value(row.get('Unit', '')),
-            'location': location,
-            'sub_location': sub_location,
-            'received': int(received),
-            'issued': int(issued),
-            'balance': int(balance),
-            'status': status
-        }
-        materials.append(material)
-
+    received = numeric_column(df['Total Received'])
+    issued = numeric_column(df['Total Issued'])
+    balance = numeric_column(df['Balance'])
+
+    # Determine status
+    status = np.select(
+        [balance < 0, balance == 0, (received > 0) & (balance < received * 0.2)],
+        ['critical', 'zero', 'low'],
+        'normal'
+    )
+
+    location = clean_column(df['LOCATION'])
+    sub_location = clean_column(df['Sup Location'])
+
+    # Skip items with location = '0' or numeric only
+    location = location.where(~(is_truthy(location) & location.astype(str).isin(['0', '0.0'])), None)
+    sub_location = sub_location.where(~(is_truthy(sub_location) & sub_location.astype(str).isin(['0', '0.0'])), None)
+
+    # S/N, or the row position when it is missing or zero
+    serial = numeric_column(df['S/N']).astype(int)
+    position = pd.Series(range(1, len(df) + 1), index=df.index)
+    item_code = clean_column(df['ITEM CODE'])
+    size = clean_column(df['Size'])
+
+    frame = pd.DataFrame({
+        'id': serial.where(serial != 0, position),
+        'project': clean_column(df['Project Name']),
+        'item_code': item_code.where(is_truthy(item_code), '').astype(str),
+        'description': clean_column(df['MATERIALS DESCRIPTION']),
+        'size': size.where(is_truthy(size), '').astype(str),
+        'unit': clean_column(df['Unit']),
+        'location': location,
+        'sub_location': sub_location,
+        'received': received.astype(int),
+        'issued': issued.astype(int),
+        'balance': balance.astype(int),
+        'status': status
+    }, index=df.index)
+    return frame
+
+def summarize_inventory(frame):
+    """Summary, charts and filters of material records"""
     # Filter to only items with actual location (active inventory)
-    active_materials = [m for m in materials if m['location']]
+    active = frame[is_truthy(frame['location'])]
 
     # If no active materials with location, use all materials
-    if not active_materials:
+    if active.empty:
         print("  Warning: No materials with location found, using all materials")
-        active_materials = materials
+        active = frame
+    active_materials = frame_records(active)
 
     # Get unique values for filters
-    locations = sorted(list(set(m['location'] for m in active_materials if m['location'])))
-    sub_locations = sorted(list(set(m['sub_location'] for m in active_materials if m['sub_location'])))
-    units = sorted(list(set(m['unit'] for m in active_materials if m['unit'])))
+    locations = distinct_values(active['location'])
+    sub_locations = distinct_values(active['sub_location'])
+    units = distinct_values(active['unit'])
 
     # Summary statistics
-    total_received = sum(m['received'] for m in active_materials)
-    total_issued = sum(m['issued'] for m in active_materials)
-    total_balance = sum(m['balance'] for m in active_materials)
+    total_received = int(active['received'].sum())
+    total_issued = int(active['issued'].sum())
+    total_balance = int(active['balance'].sum())
 
+    status_counts = active['status'].value_counts()
     critical_items = [m for m in active_materials if m['status'] == 'critical']
-    low_items = [m for m in active_materials if m['status'] == 'low']
-    zero_items = [m for m in active_materials if m['status'] == 'zero']
-    normal_items = [m for m in active_materials if m['status'] == 'normal']
-
-    # Top materials by balance
-    top_balance = sorted([m for m in active_materials if m['balance'] > 0], key=lambda x: x['balance'], reverse=True)[:10]
-
-    # By location
-    location_data = {}
-    for m in active_materials:
-        loc = m['location'] or 'Unknown'
-        if loc not in location_data:
-            location_data[loc] = {'count': 0, 'balance': 0}
-        location_data[loc]['count'] += 1
-        location_data[loc]['balance'] += m['balance']
-
-    # By sub-location
-    sub_location_data = {}
-    for m in active_materials:
-        loc = m['sub_location'] or 'Unknown'
-        if loc not in sub_location_data:
-            sub_location_data[loc] = {'count': 0, 'balance': 0}
-        sub_location_data[loc]['count'] += 1
-        sub_location_data[loc]['balance'] += m['balance']
+
+    # Top materials by balance, ties kept in file order
+    in_stock = active[active['balance'] > 0].assign(position=range((active['balance'] > 0).sum()))
+    top_balance = in_stock.sort_values(['balance', 'position'], ascending=[False, True]).head(10)
+
+    # By location / sub-location
+    location_counts, location_balances = group_totals(
+        active['location'].where(is_truthy(active['location']), 'Unknown'), active['balance'])
+    sub_location_counts, sub_location_balances = group_totals(
+        active['sub_location'].where(is_truthy(active['sub_location']), 'Unknown'), active['balance'])
 
     return {
         'summary': {
@@ -261,28 +366,28 @@ def process_inventory():
             'total_received': total_received,
             'total_issued': total_issued,
             'total_balance': total_balance,
-            'critical_count': len(critical_items),
-            'low_count': len(low_items),
-            'zero_count': len(zero_items),
-            'normal_count': len(normal_items)
+            'critical_count': int(status_counts.get('critical', 0)),
+            'low_count': int(status_counts.get('low', 0)),
+            'zero_count': int(status_counts.get('zero', 0)),
+            'normal_count': int(status_counts.get('normal', 0))
         },
         'top_balance': {
-            'labels': [m['description'][:25] + '...' if len(m['description'] or '') > 25 else (m['description'] or 'N/A') for m in top_balance],
-            'values': [m['balance'] for m in top_balance]
+            'labels': [d[:25] + '...' if len(d or '') > 25 else (d or 'N/A') for d in top_balance['description']],
+            'values': top_balance['balance'].tolist()
         },
         'by_location': {
-            'labels': list(location_data.keys()),
-            'counts': [location_data[k]['count'] for k in location_data],
-            'balances': [location_data[k]['balance'] for k in location_data]
+            'labels': location_counts.index.tolist(),
+            'counts': location_counts.tolist(),
+            'balances': location_balances.tolist()
         },
         'by_sub_location': {
-            'labels': list(sub_location_data.keys()),
-            'counts': [sub_location_data[k]['count'] for k in sub_location_data],
-            'balances': [sub_location_data[k]['balance'] for k in sub_location_data]
+            'labels': sub_location_counts.index.tolist(),
+            'counts': sub_location_counts.tolist(),
+            'balances': sub_location_balances.tolist()
         },
         'status_distribution': {
             'labels': ['Critical', 'Low Stock', 'Zero Stock', 'Normal'],
-            'counts': [len(critical_items), len(low_items), len(zero_items), len(normal_items)]
+            'counts': [int(status_counts.get(s, 0)) for s in ['critical', 'low', 'zero', 'normal']]
         },
         'filters': {
             'locations': locations,
@@ -293,12 +398,8 @@ def process_inventory():
         'critical_items': critical_items
     }
 
-def process_movements():
-    """Process daily issuance data"""
-    print("Processing Stock Movements...")
-
-    df = pd.read_excel(STORE_FILE, sheet_name='Issued Materials', header=0)
-
+def load_movements(df):
+    """Melt the wide 'Issued Materials' sheet into a long movement table"""
     # Filter out header rows
     df = df.dropna(subset=['MATERIALS DESCRIPTION'])
     df = df[df['S/N'].notna()]
@@ -306,46 +407,52 @@ def process_movements():
     # Get date columns (datetime objects)
     date_columns = [col for col in df.columns if isinstance(col, datetime)]
 
-    daily_data = {}
-    material_issued = {}
-
-    for idx, row in df.iterrows():
-        description = clean_value(row.get('MATERIALS DESCRIPTION', ''))
-        if not description:
-            continue
-
-        total_issued = 0
-
-        for date_col in date_columns:
-            qty = clean_numeric(row.get(date_col, 0))
-            if qty > 0:
-                date_str = date_col.strftime('%Y-%m-%d')
-                if date_str not in daily_data:
-                    daily_data[date_str] = 0
-                daily_data[date_str] += qty
-                total_issued += qty
-
-        if total_issued > 0:
-            material_issued[description] = material_issued.get(description, 0) + total_issued
-
-    # Sort by date
-    sorted_dates = sorted(daily_data.keys())
+    description = clean_column(df['MATERIALS DESCRIPTION'])
+    df = df[is_truthy(description)]
+    wide = pd.DataFrame(
+        {i: numeric_column(df[col]) for i, col in enumerate(date_columns)}, index=df.index
+    )
+
+    # stack() walks row by row, so materials keep their sheet order
+    qty = wide.stack()
+    qty = qty[qty > 0]
+    rows = qty.index.get_level_values(0)
+    columns = qty.index.get_level_values(1)
+    return pd.DataFrame({
+        'sn': numeric_column(df['S/N']).astype(int)[rows].to_numpy(),
+        'description': description[rows].to_numpy(),
+        'date': [date_columns[i].strftime('%Y-%m-%d') for i in columns],
+        'qty': qty.to_numpy()
+    }, columns=['sn', 'description', 'date', 'qty'])
+
+def process_movements(movements):
+    """Daily, weekly and monthly issuance series from the movement table"""
+    print("Processing Stock Movements...")
 
-    # Top materials by issuance
+    # Days in order of first appearance; weeks and months add them up in that order
+    daily = sequential_sums(movements['qty'], movements['date'], sort=False)
+    days = pd.to_datetime(daily.index)
+    weeks = (days - pd.to_timedelta(days.weekday, unit='D')).strftime('%Y-%m-%d')
+    weekly = sequential_sums(daily, weeks)
+    monthly = sequential_sums(daily, daily.index.str[:7])
+
+    # Top materials by issuance, ties kept in sheet order. Each sheet row is
+    # totalled first, then the rows of a material, as the sheet is laid out
+    row_starts = (movements['description'] != movements['description'].shift()) | (movements['sn'] != movements['sn'].shift())
+    sheet_rows = row_starts.cumsum()
+    row_issued = sequential_sums(movements['qty'], sheet_rows, sort=False)
+    row_descriptions = movements['description'].groupby(sheet_rows, sort=False).first()
+    material_issued = sequential_sums(row_issued, row_descriptions, sort=False)
     top_issued = sorted(material_issued.items(), key=lambda x: x[1], reverse=True)[:10]
 
-    # Weekly aggregation
-    weekly_data = {}
-    for date_str, qty in daily_data.items():
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-        week_start = date_obj - pd.Timedelta(days=date_obj.weekday())
-        week_key = week_start.strftime('%Y-%m-%d')
-        weekly_data[week_key] = weekly_data.get(week_key, 0) + qty
-
-    sorted_weeks = sorted(weekly_data.keys())
+    # Daily series per top material
+    top_names = [m[0] for m in top_issued]
+    top_movements = movements[movements['description'].isin(top_names)]
+    per_material = sequential_sums(top_movements['qty'], [top_movements['description'], top_movements['date']])
 
-    total_issued_qty = sum(daily_data.values())
-    active_days = len(daily_data)
+    total_issued_qty = sum(daily.tolist())
+    daily = daily.sort_index()
+    active_days = len(daily)
 
     return {
         'summary': {
@@ -355,40 +462,319 @@ def process_movements():
             'avg_daily_issuance': round(total_issued_qty / active_days, 1) if active_days else 0
         },
         'daily': {
-            'labels': [datetime.strptime(d, '%Y-%m-%d').strftime('%b %d') for d in sorted_dates],
-            'dates': sorted_dates,
-            'quantities': [daily_data[d] for d in sorted_dates]
+            'labels': [datetime.strptime(d, '%Y-%m-%d').strftime('%b %d') for d in daily.index],
+            'dates': daily.index.tolist(),
+            'quantities': daily.tolist()
         },
         'weekly': {
-            'labels': [datetime.strptime(w, '%Y-%m-%d').strftime('Week of %b %d') for w in sorted_weeks],
-            'quantities': [weekly_data[w] for w in sorted_weeks]
+            'labels': [datetime.strptime(w, '%Y-%m-%d').strftime('Week of %b %d') for w in weekly.index],
+            'quantities': weekly.tolist()
+        },
+        'monthly': {
+            'labels': [datetime.strptime(m, '%Y-%m').strftime('%b %Y') for m in monthly.index],
+            'quantities': monthly.tolist()
         },
         'top_materials': {
             'labels': [m[0][:25] + '...' if len(m[0]) > 25 else m[0] for m in top_issued],
             'quantities': [int(m[1]) for m in top_issued]
+        },
+        'material_series': {
+            name: {
+                'dates': per_material[name].index.tolist(),
+                'quantities': per_material[name].tolist()
+            }
+            for name in top_names
         }
     }
 
-def main():
-    """Main export function"""
-    print("=" * 60)
-    print("Warehouse Data Export")
-    print("=" * 60)
+def load_existing():
+    """
+    Existing (transfers, materials, movements) record frames, empty when missing
+
+    The frames saved by the last inbox run (with each record's 'source'
+    workbook) are used while the output files still hold what that run
+    wrote, timestamps aside; otherwise the records are read from the
+    output. Returns None when the output is not in this script's layout.
+    """
+    output = {}
+    if os.path.exists(OUTPUT_FILE):
+        with open(OUTPUT_FILE, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+    if output and not any(section in output for section in OUTPUT_SECTIONS):
+        return None
 
+    if os.path.exists(INBOX_STATE_FILE):
+        state = pd.read_pickle(INBOX_STATE_FILE)
+        if state.get('output') == output_hashes():
+            return state['transfers'], state['materials'], state['movements']
+
+    movements = []
+    if os.path.exists(MOVEMENTS_FILE):
+        with open(MOVEMENTS_FILE, 'r', encoding='utf-8') as f:
+            movements = json.load(f).get('records', [])
+    return (
+        records_frame((output.get('surplus_transfers') or {}).get('transfers'), TRANSFER_COLUMNS),
+        records_frame((output.get('inventory') or {}).get('materials'), MATERIAL_COLUMNS),
+        records_frame(movements, MOVEMENT_RECORD_COLUMNS)
+    )
+
+def output_hashes():
+    """
+    Content hashes of the output files on disk, see load_existing
+
+    Timestamps are left out, so a write skipped as unchanged (which keeps
+    the old last_updated) still matches the state saved after it.
+    """
+    return {
+        os.path.basename(path): output_hash(path)
+        for path in (OUTPUT_FILE, MOVEMENTS_FILE)
+        if os.path.exists(path)
+    }
+
+def save_inbox_state(transfers, materials, movements):
+    """Keep the merged inbox records for the next run, see load_existing"""
+    os.makedirs(os.path.dirname(INBOX_STATE_FILE), exist_ok=True)
+    state = {'output': output_hashes(), 'transfers': transfers, 'materials': materials, 'movements': movements}
+    with atomic_path(INBOX_STATE_FILE) as tmp_path:
+        pd.to_pickle(state, tmp_path)
+
+def published(frame):
+    """Records without the internal 'source' column"""
+    return frame.drop(columns='source', errors='ignore')
+
+def scan_inbox(manifest):
+    """Workbooks in the inbox that are new or changed since the manifest, oldest first"""
+    pending = []
+    for root, _, names in os.walk(INBOX_DIR):
+        for name in sorted(names):
+            # Skip Excel lock files
+            if not name.lower().endswith(('.xlsx', '.xlsm')) or name.startswith('~$'):
+                continue
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, INBOX_DIR)
+            digest = file_hash(path)
+            if manifest['files'].get(rel_path, {}).get('hash') != digest:
+                pending.append((rel_path, path, digest))
+
+    # The newest workbook wins when materials overlap
+    return sorted(pending, key=lambda f: os.path.getmtime(f[1]))
+
+def row_range(df):
+    """First and last Excel row of a parsed sheet (header on row 1)"""
+    if df.empty:
+        return None
+    return [int(df.index.min()) + 2, int(df.index.max()) + 2]
+
+def workbook_sheets(path, kind=None):
+    """(kind, sheets to read) of a workbook; kind is detected when not given"""
+    if kind == 'surplus':
+        return kind, {SURPLUS_SHEET: None}
+    if kind == 'store':
+        return kind, {INVENTORY_SHEET: INVENTORY_COLUMNS, MOVEMENTS_SHEET: MOVEMENT_COLUMNS}
+
+    with pd.ExcelFile(path, engine='openpyxl') as workbook:
+        names = workbook.sheet_names
+    if INVENTORY_SHEET in names:
+        sheets = {INVENTORY_SHEET: INVENTORY_COLUMNS}
+        if MOVEMENTS_SHEET in names:
+            sheets[MOVEMENTS_SHEET] = MOVEMENT_COLUMNS
+        return 'store', sheets
+    if 'surplus' in os.path.basename(path).lower():
+        return 'surplus', {SURPLUS_SHEET if SURPLUS_SHEET in names else names[0]: None}
+    return None, {}
+
+def parse_workbook(job):
+    """
+    Parse one (path, kind) workbook into record frames
+
+    Runs in a worker process. Returns (kind, {'transfers' | 'materials' |
+    'movements': DataFrame}, {sheet: {'rows', 'records'}}).
+    """
+    path, kind = job
+    kind, sheets = workbook_sheets(path, kind)
+    parts = {}
+    sheet_info = {}
+    if kind is None:
+        return kind, parts, sheet_info
+
+    print(f"Processing {kind} workbook: {os.path.basename(path)}")
+    frames = read_workbook(path, sheets)
+    if kind == 'surplus':
+        sheet = next(iter(sheets))
+        parts['transfers'] = surplus_frame(frames[sheet])
+        sheet_info[sheet] = {'rows': row_range(frames[sheet]), 'records': len(parts['transfers'])}
+    else:
+        parts['materials'] = inventory_frame(frames[INVENTORY_SHEET])
+        sheet_info[INVENTORY_SHEET] = {'rows': row_range(frames[INVENTORY_SHEET]), 'records': len(parts['materials'])}
+        if MOVEMENTS_SHEET in frames:
+            parts['movements'] = load_movements(frames[MOVEMENTS_SHEET])
+            sheet_info[MOVEMENTS_SHEET] = {'rows': row_range(frames[MOVEMENTS_SHEET]), 'records': len(parts['movements'])}
+    return kind, parts, sheet_info
+
+def parse_workbooks(jobs):
+    """parse_workbook over jobs in a process pool, results in job order"""
+    with stage('decode'):
+        count('bytes_in', sum(os.path.getsize(path) for path, _ in jobs))
+        workers = min(WORKERS, len(jobs))
+        if workers <= 1:
+            results = [parse_workbook(job) for job in jobs]
+        else:
+            print(f"Parsing {len(jobs)} workbooks with {workers} workers")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(parse_workbook, jobs))
+        count('rows_out', sum(len(part) for _, parts, _ in results for part in parts.values()))
+    return results
+
+def key_values(frame, key):
+    """Key of each record as a tuple of strings, blanks as ''"""
+    return list(frame[key].fillna('').astype(str).itertuples(index=False, name=None))
+
+def record_ids(existing, new, key=None):
+    """
+    Ids for new records that replace records in existing
+
+    With key, a new record takes over the id of an existing record with the
+    same key, so the delta patches keyed on id see a change rather than a
+    removal and an addition. Other records are numbered after the existing
+    ones, so history keeps its ids.
+    """
+    next_id = int(existing['id'].max()) if len(existing) else 0
+    reusable = {}
+    if key and len(existing):
+        for value, record_id in zip(key_values(existing, key), existing['id']):
+            reusable.setdefault(value, []).append(int(record_id))
+
+    ids = []
+    for value in key_values(new, key) if key else [None] * len(new):
+        if reusable.get(value):
+            ids.append(reusable[value].pop(0))
+        else:
+            next_id += 1
+            ids.append(next_id)
+    return ids
+
+def merge_records(existing, new, source, key=None):
+    """
+    Replace the records of source in existing with new ones
+
+    With key, records of other sources with the same key are replaced too.
+    """
+    new = new.assign(source=source)
+    if 'id' in new:
+        new['id'] = record_ids(existing, new, key)
+
+    if 'source' in existing:
+        existing = existing[existing['source'] != source]
+
+    if key and not existing.empty:
+        # Records of other workbooks that the new one supersedes
+        new_keys = pd.MultiIndex.from_frame(new[key].fillna('').astype(str))
+        old_keys = pd.MultiIndex.from_frame(existing[key].fillna('').astype(str))
+        existing = existing[~old_keys.isin(new_keys)]
+
+    if existing.empty:
+        return new.reset_index(drop=True)
+    return pd.concat([existing, new], ignore_index=True)
+
+def ingest_inbox():
+    """
+    Merge new or changed inbox workbooks into the existing records
+
+    Returns None when there is nothing to do and False when the existing
+    output cannot be merged into, see load_existing.
+    """
+    print(f"Scanning inbox: {INBOX_DIR}")
+    manifest = {'files': {}}
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    pending = scan_inbox(manifest)
+    if not pending:
+        print("No new or changed workbooks, nothing to do")
+        return None
+
+    with stage('fetch'):
+        existing = load_existing()
+    if existing is None:
+        # e.g. the committed dashboard file, whose records this script cannot rebuild
+        print(f"Error: {OUTPUT_FILE} is not in this script's output layout ({', '.join(OUTPUT_SECTIONS)}),")
+        print("refusing to merge the inbox into it; move it aside to start a new output")
+        return False
+    transfers, materials, movements = existing
+
+    # Parsed in parallel, merged in order so the newest workbook wins
+    results = parse_workbooks([(path, None) for _, path, _ in pending])
+    for (rel_path, path, digest), (kind, parts, sheet_info) in zip(pending, results):
+        manifest['files'][rel_path] = {
+            'path': rel_path,
+            'hash': digest,
+            'kind': kind,
+            'processed_at': datetime.now().isoformat(),
+            'sheets': sheet_info
+        }
+        if kind is None:
+            print(f"  Skipping {rel_path}: not a store or surplus workbook")
+            continue
+
+        if 'transfers' in parts:
+            transfers = merge_records(transfers, parts['transfers'], rel_path, TRANSFER_KEY)
+        if 'materials' in parts:
+            materials = merge_records(materials, parts['materials'], rel_path, MATERIAL_KEY)
+        if 'movements' in parts:
+            movements = merge_records(movements, parts['movements'], rel_path, MOVEMENT_KEY)
+        print(f"  Merged {rel_path} ({kind})")
+
+    with stage('aggregate'):
+        count('rows_in', len(transfers) + len(materials) + len(movements))
+        surplus_data = summarize_transfers(published(transfers)) if len(transfers) else None
+        inventory_data = summarize_inventory(published(materials)) if len(materials) else None
+        movements_data = process_movements(movements) if len(movements) else None
+    records = {'transfers': transfers, 'materials': materials, 'movements': movements}
+    return surplus_data, inventory_data, published(movements) if len(movements) else None, movements_data, manifest, records
+
+def process_files():
+    """Process the configured surplus and store workbooks"""
     # Check files exist
+    jobs = []
     if not os.path.exists(SURPLUS_FILE):
         print(f"WARNING: Surplus file not found: {SURPLUS_FILE}")
-        surplus_data = None
     else:
-        surplus_data = process_surplus_transfers()
-
+        jobs.append((SURPLUS_FILE, 'surplus'))
     if not os.path.exists(STORE_FILE):
         print(f"WARNING: Store file not found: {STORE_FILE}")
-        inventory_data = None
-        movements_data = None
     else:
-        inventory_data = process_inventory()
-        movements_data = process_movements()
+        jobs.append((STORE_FILE, 'store'))
+
+    parts = {}
+    for _, workbook_parts, _ in parse_workbooks(jobs):
+        parts.update(workbook_parts)
+
+    with stage('aggregate'):
+        count('rows_in', sum(len(part) for part in parts.values()))
+        surplus_data = summarize_transfers(parts['transfers']) if 'transfers' in parts else None
+        inventory_data = summarize_inventory(parts['materials']) if 'materials' in parts else None
+        movements = parts.get('movements')
+        movements_data = process_movements(movements) if movements is not None else None
+    return surplus_data, inventory_data, movements, movements_data
+
+@instrument('export_warehouse_data')
+def main():
+    """Main export function"""
+    print("=" * 60)
+    print("Warehouse Data Export")
+    print("=" * 60)
+
+    manifest = None
+    if INBOX_DIR:
+        result = ingest_inbox()
+        if result is None:
+            return
+        if result is False:
+            return 1
+        surplus_data, inventory_data, movements, movements_data, manifest, records = result
+    else:
+        surplus_data, inventory_data, movements, movements_data = process_files()
 
     # Combine all data
     output = {
@@ -402,11 +788,36 @@ def main():
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
 
     # Write JSON
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    print("\nWriting JSON...")
+    write_dataset(OUTPUT_FILE, output, {
+        ('inventory', 'materials'): None,
+        ('surplus_transfers', 'transfers'): ('date', True)
+    }, {
+        ('inventory', 'materials'): MATERIAL_FIELD_TYPES,
+        ('surplus_transfers', 'transfers'): TRANSFER_FIELD_TYPES
+    }, record_keys={
+        ('inventory', 'materials'): 'id',
+        ('surplus_transfers', 'transfers'): 'id'
+    }, filter_dims={
+        ('inventory', 'materials'): MATERIAL_FILTER_DIMS,
+        ('surplus_transfers', 'transfers'): TRANSFER_FILTER_DIMS
+    }, search_fields={
+        ('inventory', 'materials'): MATERIAL_SEARCH_FIELDS,
+        ('surplus_transfers', 'transfers'): TRANSFER_SEARCH_FIELDS
+    })
+
+    if movements is not None:
+        write_dataset(MOVEMENTS_FILE, {
+            'last_updated': output['last_updated'],
+            'records': frame_records(movements)
+        }, {('records',): ('date', True)}, {('records',): MOVEMENT_FIELD_TYPES})
+
+    # Written last, so an interrupted run reprocesses its workbooks
+    if manifest is not None:
+        save_inbox_state(**records)
+        write_json(MANIFEST_FILE, manifest)
 
     print(f"\nExport complete: {OUTPUT_FILE}")
-    print(f"File size: {os.path.getsize(OUTPUT_FILE) / 1024:.1f} KB")
 
     # Print summary
     if surplus_data:
@@ -422,6 +833,7 @@ def main():
     if movements_data:
         print(f"\nMovements: {movements_data['summary']['active_days']} days tracked")
         print(f"  - Total Issued: {movements_data['summary']['total_issued_quantity']}")
+        print(f"  - Movement rows: {len(movements)} ({MOVEMENTS_FILE})")
 
 if __name__ == '__main__':
-    main()
+    sys.exit(run_script(main))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Prebuilt full-text search index for free-text record fields
+Text is normalized (NFKC, lower case, Arabic diacritics/tatweel removed,
+alef/yaa/taa marbuta and Arabic-Indic digits unified) and split into
+tokens. The index keeps the sorted vocabulary, token -> row postings and
+trigram -> token postings, so a query word matches any token containing
+it without scanning records. assets/nesma-search.js implements the same
+normalization and query, and returns the same rows.
+"""
+
+import re
+import sys
+import json
+import bisect
+import unicodedata
+
+ENCODING = "search-v1"
+# Harakat, Quranic marks, superscript alef and tatweel
+ARABIC_MARKS_RE = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+ARABIC_LETTERS = str.maketrans(
+    {
+        "\u0622": "\u0627",  # alef with madda -> alef
+        "\u0623": "\u0627",  # alef with hamza above -> alef
+        "\u0625": "\u0627",  # alef with hamza below -> alef
+        "\u0671": "\u0627",  # alef wasla -> alef
+        "\u0649": "\u064a",  # alef maksura -> yaa
+        "\u0629": "\u0647",  # taa marbuta -> haa
+        **{chr(0x0660 + d): str(d) for d in range(10)},
+        **{chr(0x06F0 + d): str(d) for d in range(10)},
+    }
+)
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text):
+    """Normalize Arabic / English text for indexing and querying"""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return ARABIC_MARKS_RE.sub("", text).translate(ARABIC_LETTERS)
+
+
+def tokenize(text):
+    """Normalized tokens of a text"""
+    if text is None or text == "":
+        return []
+    return TOKEN_RE.findall(normalize(text))
+
+
+def trigrams(token):
+    """Distinct trigrams of a token, in order"""
+    return list(dict.fromkeys(token[i : i + 3] for i in range(len(token) - 2)))
+
+
+def delta_encode(ids):
+    """Sorted ids -> gaps, which stay small in JSON"""
+    return [b - a for a, b in zip([0] + ids, ids)]
+
+
+def delta_decode(gaps):
+    """Inverse of delta_encode"""
+    ids = []
+    total = 0
+    for gap in gaps:
+        total += gap
+        ids.append(total)
+    return ids
+
+
+def build_search_index(records, fields):
+    """Build the search index of records over the given text fields"""
+    postings = {}
+    for row, record in enumerate(records):
+        for field in fields:
+            for token in tokenize(record.get(field)):
+                rows = postings.setdefault(token, [])
+                if not rows or rows[-1] != row:
+                    rows.append(row)
+
+    vocabulary = sorted(postings)
+    grams = {}
+    for token_id, token in enumerate(vocabulary):
+        for gram in trigrams(token):
+            grams.setdefault(gram, []).append(token_id)
+
+    return {
+        "encoding": ENCODING,
+        "count": len(records),
+        "fields": list(fields),
+        "tokens": vocabulary,
+        "rows": [delta_encode(postings[t]) for t in vocabulary],
+        "trigrams": {g: delta_encode(ids) for g, ids in sorted(grams.items())},
+    }
+
+
+def matching_tokens(index, word):
+    """Ids of the vocabulary tokens containing word"""
+    tokens = index["tokens"]
+    if len(word) < 3:
+        # Too short for trigrams, match as a prefix
+        start = bisect.bisect_left(tokens, word)
+        end = start
+        while end < len(tokens) and tokens[end].startswith(word):
+            end += 1
+        return list(range(start, end))
+
+    candidates = None
+    for gram in trigrams(word):
+        ids = set(delta_decode(index["trigrams"].get(gram, [])))
+        candidates = ids if candidates is None else candidates & ids
+        if not candidates:
+            return []
+    return sorted(i for i in candidates if word in tokens[i])
+
+
+def search(index, query):
+    """Sorted row ids whose fields contain every word of query"""
+    result = None
+    for word in dict.fromkeys(tokenize(query)):
+        rows = set()
+        for token_id in matching_tokens(index, word):
+            rows.update(delta_decode(index["rows"][token_id]))
+        result = rows if result is None else result & rows
+        if not result:
+            return []
+    return [] if result is None else sorted(result)
+
+
+def main(argv):
+    """Query a .search.json file from the command line"""
+    if len(argv) < 2:
+        print('Usage: python search_index.py data/<name>.search.json "query"')
+        return 1
+    with open(argv[0], "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    for dataset, index in doc["datasets"].items():
+        rows = search(index, " ".join(argv[1:]))
+        print(f"{dataset}: {len(rows)} of {index['count']} rows")
+        print(f"  {rows[:50]}{' ...' if len(rows) > 50 else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
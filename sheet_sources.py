@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Sheet sources of the synced datasets
+The Smartsheet sheets behind each logical dataset are listed in
+SHEET_SOURCES_FILE (default sheet_sources.json) rather than hard-coded in
+the scripts. A dataset can be backed by several sheets, e.g. one PR sheet
+per year or one transportation sheet per region, once a sheet nears the
+Smartsheet row limit. The sheets are fetched concurrently, each decoded
+with the script's usual column mapping (columns are matched by title, so
+shards may differ in column ids and order), and merged on the dataset's
+key: a record whose key also appears in a later sheet is replaced by the
+later one, so list older shards first. Records without a key are kept.
+The key is a decoded record field, or a sheet column title for scripts
+that merge the raw rows (scripts/export_procurement_data.py).
+
+With SHEET_RECORD_DIR set every fetched sheet is also saved as
+<dir>/<sheet id>.json (the layout sync_webhook.py --offline reads); with
+SHEET_REPLAY_DIR set sheets are read from there instead of the API, so
+real payloads can be replayed offline. The scripts' --record DIR and
+--replay DIR options set these, see profiling.py.
+
+    python sheet_sources.py              list the datasets and their sheets
+"""
+
+import os
+import sys
+import json
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_write import atomic_open
+from run_metrics import count, stage
+
+# Configuration
+SHEET_SOURCES_FILE = os.environ.get(
+    "SHEET_SOURCES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "sheet_sources.json"),
+)
+SOURCE_WORKERS = int(os.environ.get("SOURCE_WORKERS", "4"))
+SHEET_RECORD_DIR = os.environ.get("SHEET_RECORD_DIR", "")
+SHEET_REPLAY_DIR = os.environ.get("SHEET_REPLAY_DIR", "")
+
+_sources = None
+
+
+def load_sources():
+    """Dataset name -> {"key", "sheets": [{"id", "label"}]}, read once"""
+    global _sources
+    if _sources is None:
+        with open(SHEET_SOURCES_FILE, "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        # Plain ids are accepted as sheet entries too
+        _sources = {
+            name: dict(
+                spec,
+                sheets=[s if isinstance(s, dict) else {"id": s} for s in spec["sheets"]],
+            )
+            for name, spec in doc.items()
+        }
+    return _sources
+
+
+def sheet_ids(dataset):
+    """Sheet ids of a dataset, in merge order"""
+    try:
+        return [int(sheet["id"]) for sheet in load_sources()[dataset]["sheets"]]
+    except KeyError:
+        raise KeyError(f"No sheet source '{dataset}' in {SHEET_SOURCES_FILE}") from None
+
+
+def dataset_key(dataset):
+    """Record field the dataset's shards are merged on, None for no dedup"""
+    return load_sources()[dataset].get("key")
+
+
+def replay_sheet(sheet_id, model=None):
+    """A sheet saved in SHEET_REPLAY_DIR, as model(sheet JSON) if given"""
+    path = os.path.join(SHEET_REPLAY_DIR, f"{sheet_id}.json")
+    count("bytes_in", os.path.getsize(path))
+    with open(path, "r", encoding="utf-8") as f:
+        sheet = json.load(f)
+    return model(sheet) if model else sheet
+
+
+def record_sheet(sheet_id, sheet):
+    """Save a fetched sheet (API JSON or SDK model) to SHEET_RECORD_DIR"""
+    data = sheet if isinstance(sheet, dict) else json.loads(sheet.to_json())
+    with atomic_open(os.path.join(SHEET_RECORD_DIR, f"{sheet_id}.json")) as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def replaying():
+    """True when sheets come from SHEET_REPLAY_DIR rather than the API"""
+    return bool(SHEET_REPLAY_DIR)
+
+
+def fetch_sheets(ids, fetch, known=None, model=None):
+    """
+    Fetch several sheets concurrently
+
+    fetch(sheet_id) returns one sheet; sheets already in known (sheet id ->
+    sheet, e.g. passed in by the sync daemon) are not fetched again.
+    model turns replayed sheet JSON into what fetch returns (e.g. the SDK's
+    Sheet); SDK fetches are counted as bytes_in here, the HTTP fetches of
+    the sync scripts count their responses themselves. Returns the sheets
+    in the order of ids.
+    """
+    known = known or {}
+    if SHEET_REPLAY_DIR:
+        fetch = functools.partial(replay_sheet, model=model)
+    else:
+        if model:
+            fetch = counting(fetch)
+        if SHEET_RECORD_DIR:
+            fetch = recording(fetch)
+    missing = [sheet_id for sheet_id in ids if sheet_id not in known]
+    fetched = {}
+    if len(missing) == 1:
+        fetched[missing[0]] = fetch(missing[0])
+    elif missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(SOURCE_WORKERS, len(missing)))) as pool:
+            fetched = dict(zip(missing, pool.map(fetch, missing)))
+    return [known[sheet_id] if sheet_id in known else fetched[sheet_id] for sheet_id in ids]
+
+
+def counting(fetch):
+    """fetch that adds the size of each SDK sheet to bytes_in"""
+
+    def fetch_and_count(sheet_id):
+        sheet = fetch(sheet_id)
+        # The SDK does not expose the response, its JSON is the nearest size
+        count("bytes_in", len(sheet.to_json()))
+        return sheet
+
+    return fetch_and_count
+
+
+def recording(fetch):
+    """fetch that also saves each sheet, see record_sheet"""
+
+    def fetch_and_record(sheet_id):
+        sheet = fetch(sheet_id)
+        record_sheet(sheet_id, sheet)
+        return sheet
+
+    return fetch_and_record
+
+
+def merge_records(shards, key):
+    """
+    Concatenate per-sheet record lists, dropping records superseded by a later sheet
+
+    key is a field name or a function of the record; duplicates within
+    one sheet are all kept, as with a single sheet.
+    """
+    if len(shards) <= 1 or key is None:
+        return [record for shard in shards for record in shard]
+    key_of = key if callable(key) else (lambda record: record.get(key))
+    later = set()
+    kept = []
+    for shard in reversed(shards):
+        keys = [key_of(record) for record in shard]
+        kept.append([r for r, k in zip(shard, keys) if k is None or k == "" or k not in later])
+        later.update(k for k in keys if k is not None and k != "")
+    return [record for shard in reversed(kept) for record in shard]
+
+
+def load_dataset(dataset, fetch, decode, known=None):
+    """
+    Fetch, decode and merge all sheets of a dataset
+
+    decode(sheet) returns the sheet's records. Returns (records, sheets).
+    """
+    with stage("fetch"):
+        sheets = fetch_sheets(sheet_ids(dataset), fetch, known)
+    with stage("decode"):
+        count("rows_in", sum(len(sheet.get("rows", [])) for sheet in sheets))
+        records = merge_records([decode(sheet) for sheet in sheets], dataset_key(dataset))
+        count("rows_out", len(records))
+    return records, sheets
+
+
+def sheet_names(sheets):
+    """Display name of the sheets a dataset was loaded from"""
+    return ", ".join(str(sheet.get("name")) for sheet in sheets)
+
+
+def main(argv):
+    for name, spec in load_sources().items():
+        print(f"{name} (key {spec.get('key')}):")
+        for sheet in spec["sheets"]:
+            print(f"  {sheet['id']}  {sheet.get('label', '')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Long-running sync daemon with adaptive polling
+Keeps the sync scripts loaded in one warm process and polls each sheet's
+version number (GET /sheets/{id}/version, a tiny request) instead of
+refetching everything on a fixed schedule. Only the jobs whose sheet
+version changed are run, and a sheet shared by several jobs is fetched
+once through a pooled, retrying session. The poll interval drops to
+SYNC_POLL_MIN seconds while sheets are being edited and backs off to
+SYNC_POLL_MAX when they are idle.
+
+Outputs are written atomically by data_output; with SYNC_DAEMON_PUBLISH=1
+every cycle's outputs are also committed together (and pushed with
+SYNC_DAEMON_PUSH=1), like the sync workflow does.
+
+    python sync_daemon.py          run until SIGINT / SIGTERM
+    python sync_daemon.py --once   one poll cycle, e.g. from cron
+"""
+
+import os
+import sys
+import json
+import signal
+import threading
+import traceback
+import subprocess
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import sync_sla
+import sync_logistics
+import sync_procurement
+import vendor_scorecard
+from atomic_write import atomic_open
+
+# Configuration
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SMARTSHEET_TOKEN = sync_sla.SMARTSHEET_TOKEN
+API_URL = "https://api.smartsheet.com/2.0"
+POLL_MIN = float(os.environ.get("SYNC_POLL_MIN", "60"))
+POLL_MAX = float(os.environ.get("SYNC_POLL_MAX", "1800"))
+POLL_BACKOFF = float(os.environ.get("SYNC_POLL_BACKOFF", "2"))
+STATE_FILE = os.path.join(ROOT, ".cache", "sync_daemon.json")
+PUBLISH = os.environ.get("SYNC_DAEMON_PUBLISH", "").strip().lower() in ("1", "true", "yes")
+PUSH = os.environ.get("SYNC_DAEMON_PUSH", "").strip().lower() in ("1", "true", "yes")
+PUBLISH_PATHS = ["data", "transportation_full_data.json", "payments_full_data.json"]
+REQUEST_TIMEOUT = 60
+
+# Jobs run in this order. A job has the sheets it syncs from (its main()
+# takes {sheet id: fetched sheet} and fetches the sheets not passed), or
+# runs after other jobs that produced its inputs.
+JOBS = [
+    {"name": "sla", "sheets": sync_sla.TRANSPORTATION_SHEETS, "run": sync_sla.main},
+    {
+        "name": "logistics",
+        "sheets": sync_logistics.TRANSPORTATION_SHEETS,
+        "run": sync_logistics.main,
+    },
+    {
+        "name": "procurement",
+        "sheets": sync_procurement.PR_TO_PO_SHEETS,
+        "run": sync_procurement.main,
+    },
+    {
+        "name": "scorecard",
+        "after": ["logistics", "procurement"],
+        "run": vendor_scorecard.main,
+    },
+]
+
+
+def make_session():
+    """Keep-alive session with a small pool and retries honouring Retry-After"""
+    session = requests.Session()
+    retry = Retry(
+        total=4,
+        backoff_factor=2,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=retry)
+    session.mount("https://", adapter)
+    session.headers.update(
+        {
+            "Authorization": f"Bearer {SMARTSHEET_TOKEN}",
+            "Content-Type": "application/json",
+        }
+    )
+    return session
+
+
+def sheet_version(session, sheet_id):
+    """Current version number of a sheet"""
+    response = session.get(f"{API_URL}/sheets/{sheet_id}/version", timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["version"]
+
+
+def fetch_sheet(session, sheet_id, row_ids=None):
+    """Full sheet as sync_*.get_sheet_data returns it, or only the given rows"""
+    params = {"rowIds": ",".join(map(str, row_ids))} if row_ids else None
+    response = session.get(
+        f"{API_URL}/sheets/{sheet_id}", params=params, timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def load_state():
+    """Last synced version of each sheet"""
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"versions": {}}
+
+
+def save_state(state):
+    with atomic_open(STATE_FILE) as f:
+        json.dump(state, f, indent=2)
+
+
+def succeeded(result):
+    """sync mains return True / False, other scripts an exit status"""
+    if isinstance(result, bool):
+        return result
+    return not result
+
+
+def publish():
+    """Commit this cycle's outputs as one commit, and push if enabled"""
+    paths = [p for p in PUBLISH_PATHS if os.path.exists(os.path.join(ROOT, p))]
+    subprocess.run(["git", "add", "--", *paths], cwd=ROOT, check=True)
+    staged = subprocess.run(["git", "diff", "--staged", "--quiet"], cwd=ROOT)
+    if staged.returncode == 0:
+        print("Nothing new to publish")
+        return
+    message = f"chore: Auto-sync from Smartsheet [daemon {datetime.now():%Y-%m-%d %H:%M}]"
+    subprocess.run(["git", "commit", "-q", "-m", message], cwd=ROOT, check=True)
+    if PUSH:
+        subprocess.run(["git", "push", "-q"], cwd=ROOT, check=True)
+    print(f"Published: {message}")
+
+
+def job_sheets():
+    """Ids of all the sheets the jobs sync from"""
+    return sorted({sheet_id for job in JOBS for sheet_id in job.get("sheets", [])})
+
+
+def run_jobs(sheets, changed=None):
+    """
+    Run the jobs of the changed sheets, then the jobs depending on them
+
+    sheets maps sheet id -> sheet data, changed lists the changed sheet
+    ids (default: all of sheets). Returns (names of the jobs that ran,
+    ids of the changed sheets with a failed job).
+    """
+    changed = set(sheets if changed is None else changed)
+    ran = set()
+    failed_sheets = set()
+    for job in JOBS:
+        if changed & set(job.get("sheets", [])):
+            args = ({s: sheets[s] for s in job["sheets"] if s in sheets},)
+        elif ran & set(job.get("after", [])):
+            args = ()
+        else:
+            continue
+
+        print(f"--- {job['name']} ---")
+        try:
+            ok = succeeded(job["run"](*args))
+        except Exception as e:
+            print(f"Job {job['name']} failed: {e}")
+            ok = False
+        if ok:
+            ran.add(job["name"])
+        else:
+            failed_sheets |= changed & set(job.get("sheets", []))
+    return ran, failed_sheets
+
+
+def poll_once(session, state):
+    """
+    Check every sheet's version and run the affected jobs
+
+    Returns True when a sheet had changed. A sheet's version is recorded
+    only when all of its jobs succeeded, so failures are retried.
+    """
+    changed = {}
+    for sheet_id in job_sheets():
+        version = sheet_version(session, sheet_id)
+        if state["versions"].get(str(sheet_id)) != version:
+            changed[sheet_id] = version
+    if not changed:
+        return False
+
+    print(f"\n[{datetime.now():%H:%M:%S}] Changed sheets: {changed}")
+    # One fetch per changed sheet, shared by all of its jobs; the jobs
+    # fetch their unchanged sheets themselves
+    ran, failed_sheets = run_jobs(
+        {sheet_id: fetch_sheet(session, sheet_id) for sheet_id in changed}
+    )
+
+    for sheet_id, version in changed.items():
+        if sheet_id not in failed_sheets:
+            state["versions"][str(sheet_id)] = version
+    state["last_sync"] = datetime.now().isoformat()
+    save_state(state)
+
+    if PUBLISH and ran:
+        publish()
+    return True
+
+
+def main(argv):
+    # The sync scripts write paths relative to the repository root
+    os.chdir(ROOT)
+    session = make_session()
+    state = load_state()
+    if "--once" in argv:
+        poll_once(session, state)
+        return 0
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    print(f"=== Sync Daemon === polling every {POLL_MIN:.0f}-{POLL_MAX:.0f}s")
+    interval = POLL_MIN
+    while not stop.is_set():
+        try:
+            active = poll_once(session, state)
+            # Fast while sheets are being edited, slower the longer they stay idle
+            interval = POLL_MIN if active else min(POLL_MAX, interval * POLL_BACKOFF)
+        except requests.RequestException as e:
+            print(f"[{datetime.now():%H:%M:%S}] Poll failed: {e}")
+            interval = min(POLL_MAX, interval * POLL_BACKOFF)
+        except Exception:
+            # A bad sheet or a bug in a job must not stop the daemon
+            print(f"[{datetime.now():%H:%M:%S}] Poll failed:")
+            traceback.print_exc()
+            interval = min(POLL_MAX, interval * POLL_BACKOFF)
+        stop.wait(interval)
+    print("Sync daemon stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -5,16 +5,22 @@ Sheet: Transportation_Tracking
 """
 
 import os
-import json
 import requests
 from datetime import datetime
 from collections import Counter
 
+from data_output import write_dataset
+from entity_resolution import resolve_names
+from profiling import run_script
+from run_metrics import count, instrument, stage
+from sheet_sources import load_dataset, sheet_ids, sheet_names
+
 # Configuration
 SMARTSHEET_TOKEN = os.environ.get(
     "SMARTSHEET_TOKEN", "r6WG6zpLw2TR84F54tZCCzMtqjkTlTbuWDiws"
 )
-TRANSPORTATION_SHEET_ID = 7876932495429508  # Transportation_Tracking
+# Sheets of the dataset, see sheet_sources.json
+TRANSPORTATION_SHEETS = sheet_ids("transportation")
 
 # Column mappings
 COLUMN_MAPPINGS = {
@@ -43,6 +49,30 @@ COLUMN_MAPPINGS = {
     "Pending with": "pending_with",
     "Remarks": "remarks",
 }
+# Non-string fields; the last two only occur in the payments records
+FIELD_TYPES = {
+    "request_date": "date",
+    "actual_date": "date",
+    "total_amount": "float64",
+    "duration": "float64",
+    "invoice_receive_days": "float64",
+    "payment_cycle_days": "float64",
+}
+TRANSPORT_FILTER_DIMS = {
+    "project": "project",
+    "supplier": "supplier",
+    "company": "company",
+    "status": "status",
+    "rent_type": "rent_type",
+    "agent": "pending_with",
+    "month": ("request_date", "month"),
+}
+PAYMENT_FILTER_DIMS = {
+    "project": "project",
+    "supplier": "supplier",
+    "payment_status": "payment_status",
+    "month": ("request_date", "month"),
+}
 
 
 def safe_float(value):
@@ -74,6 +104,7 @@ def get_sheet_data(sheet_id):
     url = f"https://api.smartsheet.com/2.0/sheets/{sheet_id}"
     response = requests.get(url, headers=headers)
     response.raise_for_status()
+    count("bytes_in", len(response.content))
     return response.json()
 
 
@@ -174,6 +205,7 @@ def prepare_transportation_data(records):
                 if r.get("request_date")
                 else "",
                 "supplier": r.get("supplier", "Unknown"),
+                "supplier_id": r.get("supplier_id"),
                 "equipment_1": r.get("equipment_1", ""),
                 "equipment_2": r.get("equipment_2", ""),
                 "equipment_3": r.get("equipment_3", ""),
@@ -250,6 +282,7 @@ def prepare_payments_data(records):
                 if r.get("request_date")
                 else "",
                 "supplier": r.get("supplier", "Unknown"),
+                "supplier_id": r.get("supplier_id"),
                 "equipment_1": r.get("equipment_1", ""),
                 "total_amount": safe_float(r.get("total_amount")),
                 "payment_status": r.get("payment_status", "Pending"),
@@ -277,40 +310,61 @@ def prepare_payments_data(records):
     }
 
 
-def main():
+@instrument("sync_logistics")
+def main(sheets=None):
     print(f"=== Logistics Data Sync ===")
     print(f"Started at: {datetime.now()}")
-    print(f"Sheet ID: {TRANSPORTATION_SHEET_ID}")
+    print(f"Sheet IDs: {TRANSPORTATION_SHEETS}")
 
     try:
-        # Fetch data from Smartsheet
-        print("\nFetching data from Smartsheet...")
-        sheet_data = get_sheet_data(TRANSPORTATION_SHEET_ID)
-        print(f"Sheet name: {sheet_data.get('name')}")
-
-        # Process data
-        print("\nProcessing records...")
-        records = process_sheet(sheet_data)
+        # Fetch and process every sheet of the dataset; sheets the sync
+        # daemon already fetched are passed in
+        print("\nFetching and processing records...")
+        records, sheet_list = load_dataset(
+            "transportation", get_sheet_data, process_sheet, sheets
+        )
+        print(f"Sheet name: {sheet_names(sheet_list)}")
         print(f"Total records found: {len(records)}")
 
-        # Prepare transportation data
-        print("\nPreparing transportation data...")
-        transportation_data = prepare_transportation_data(records)
+        with stage("aggregate"):
+            count("rows_in", len(records))
+
+            # Entity id next to the raw supplier, for joins across datasets
+            resolve_names(records, "supplier", "transportation")
+
+            # Prepare transportation data
+            print("\nPreparing transportation data...")
+            transportation_data = prepare_transportation_data(records)
+            count("rows_out", len(transportation_data["records"]))
 
         # Save transportation data
-        with open("transportation_full_data.json", "w", encoding="utf-8") as f:
-            json.dump(transportation_data, f, ensure_ascii=False, indent=2)
+        write_dataset(
+            "transportation_full_data.json",
+            transportation_data,
+            {("records",): ("request_date", True)},
+            {("records",): FIELD_TYPES},
+            record_keys={("records",): "job_order_no"},
+            filter_dims={("records",): TRANSPORT_FILTER_DIMS},
+        )
         print(
             f"Saved transportation_full_data.json ({transportation_data['metadata']['total_records']} records)"
         )
 
-        # Prepare payments data
-        print("\nPreparing payments data...")
-        payments_data = prepare_payments_data(records)
+        with stage("aggregate"):
+            # Prepare payments data
+            print("\nPreparing payments data...")
+            payments_data = prepare_payments_data(records)
+            count("rows_out", len(payments_data["records"]))
 
         # Save payments data
-        with open("payments_full_data.json", "w", encoding="utf-8") as f:
-            json.dump(payments_data, f, ensure_ascii=False, indent=2)
+        write_dataset(
+            "payments_full_data.json",
+            payments_data,
+            {("records",): ("request_date", True)},
+            {("records",): FIELD_TYPES},
+            record_keys={("records",): "job_order_no"},
+            filter_dims={("records",): PAYMENT_FILTER_DIMS},
+        )
         print(
             f"Saved payments_full_data.json ({payments_data['metadata']['total_records']} records)"
         )
@@ -341,5 +395,5 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    success = run_script(main)
     exit(0 if success else 1)
@@ -5,16 +5,22 @@ Sheet: PR to PO Report 25th Dec-2025
 """
 
 import os
-import json
 import requests
 from datetime import datetime
 from collections import Counter
 
+from data_output import write_dataset
+from entity_resolution import resolve_names
+from profiling import run_script
+from run_metrics import count, instrument, stage
+from sheet_sources import load_dataset, sheet_ids, sheet_names
+
 # Configuration
 SMARTSHEET_TOKEN = os.environ.get(
     "SMARTSHEET_TOKEN", "r6WG6zpLw2TR84F54tZCCzMtqjkTlTbuWDiws"
 )
-PR_TO_PO_SHEET_ID = 5789339180027780  # PR to PO Report 25th Dec-2025
+# Sheets of the dataset, see sheet_sources.json
+PR_TO_PO_SHEETS = sheet_ids("pr_to_po")
 
 # Column mappings
 COLUMN_MAPPINGS = {
@@ -44,6 +50,27 @@ COLUMN_MAPPINGS = {
     "PR to PO in days": "pr_to_po_days",
     "Agent": "agent",
 }
+# Dates and amounts among the mapped columns
+FIELD_TYPES = {
+    "submission_date": "date",
+    "approved_date": "date",
+    "return_date": "date",
+    "reject_date": "date",
+    "pending_since": "date",
+    "po_approved_date": "date",
+    "pr_value": "float64",
+    "po_value": "float64",
+    "saving_amount": "float64",
+    "pr_to_po_days": "float64",
+}
+FILTER_DIMS = {
+    "project": "project",
+    "vendor": "vendor",
+    "status": "status",
+    "agent": "agent",
+    "month": ("submission_date", "month"),
+}
+SEARCH_FIELDS = ["description", "pr_note"]
 
 
 def get_sheet_data(sheet_id):
@@ -56,6 +83,7 @@ def get_sheet_data(sheet_id):
     url = f"https://api.smartsheet.com/2.0/sheets/{sheet_id}"
     response = requests.get(url, headers=headers)
     response.raise_for_status()
+    count("bytes_in", len(response.content))
     return response.json()
 
 
@@ -334,42 +362,57 @@ def format_pr_for_output(pr):
     }
 
 
-def main():
+@instrument("sync_procurement")
+def main(sheets=None):
     print(f"=== Procurement Data Sync ===")
     print(f"Started at: {datetime.now()}")
-    print(f"Sheet ID: {PR_TO_PO_SHEET_ID}")
+    print(f"Sheet IDs: {PR_TO_PO_SHEETS}")
 
     try:
-        # Fetch data from Smartsheet
-        print("\nFetching data from Smartsheet...")
-        sheet_data = get_sheet_data(PR_TO_PO_SHEET_ID)
-        print(f"Sheet name: {sheet_data.get('name')}")
-
-        # Process data
-        print("\nProcessing PR data...")
-        all_prs = process_sheet(sheet_data)
+        # Fetch and process every sheet of the dataset; sheets the sync
+        # daemon already fetched are passed in
+        print("\nFetching and processing PR data...")
+        all_prs, sheet_list = load_dataset(
+            "pr_to_po", get_sheet_data, process_sheet, sheets
+        )
+        print(f"Sheet name: {sheet_names(sheet_list)}")
         print(f"Total PRs found: {len(all_prs)}")
 
-        # Calculate statistics
-        print("\nCalculating statistics...")
-        stats = calculate_statistics(all_prs)
+        with stage("aggregate"):
+            count("rows_in", len(all_prs))
 
-        # Format PRs for output
-        formatted_prs = [format_pr_for_output(pr) for pr in all_prs]
+            # Entity id next to the raw vendor, for joins across datasets
+            resolve_names(all_prs, "vendor", "procurement")
 
-        # Create output data
-        output_data = {
-            "last_updated": datetime.now().isoformat(),
-            "source_sheet": sheet_data.get("name"),
-            "source_sheet_id": PR_TO_PO_SHEET_ID,
-            **stats,
-            "all_prs": formatted_prs,
-        }
+            # Calculate statistics
+            print("\nCalculating statistics...")
+            stats = calculate_statistics(all_prs)
+
+            # Format PRs for output
+            formatted_prs = [format_pr_for_output(pr) for pr in all_prs]
+
+            # Create output data
+            output_data = {
+                "last_updated": datetime.now().isoformat(),
+                "source_sheet": sheet_names(sheet_list),
+                "source_sheet_id": PR_TO_PO_SHEETS[0],
+                "source_sheet_ids": PR_TO_PO_SHEETS,
+                **stats,
+                "all_prs": formatted_prs,
+            }
+            count("rows_out", len(formatted_prs))
 
         # Save to JSON
         output_path = "data/pr_data.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        write_dataset(
+            output_path,
+            output_data,
+            {("all_prs",): ("submission_date", True)},
+            {("all_prs",): FIELD_TYPES},
+            record_keys={("all_prs",): "pr_num"},
+            filter_dims={("all_prs",): FILTER_DIMS},
+            search_fields={("all_prs",): SEARCH_FIELDS},
+        )
 
         print(f"\n=== Sync Complete ===")
         print(f"Data saved to: {output_path}")
@@ -395,5 +438,5 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    success = run_script(main)
     exit(0 if success else 1)
@@ -4,16 +4,22 @@ Sync SLA Dashboard data from Smartsheet Transportation_Tracking
 """
 
 import os
-import json
 import requests
 from datetime import datetime
 from collections import Counter
 
+from data_output import write_dataset
+from entity_resolution import resolve_names
+from profiling import run_script
+from run_metrics import count, instrument, stage
+from sheet_sources import load_dataset, sheet_ids, sheet_names
+
 # Configuration
 SMARTSHEET_TOKEN = os.environ.get(
     "SMARTSHEET_TOKEN", "r6WG6zpLw2TR84F54tZCCzMtqjkTlTbuWDiws"
 )
-TRANSPORTATION_SHEET_ID = 7876932495429508  # Transportation_Tracking
+# Sheets of the dataset, see sheet_sources.json
+TRANSPORTATION_SHEETS = sheet_ids("transportation")
 
 # Column mappings
 COLUMN_MAPPINGS = {
@@ -42,6 +48,21 @@ COLUMN_MAPPINGS = {
     "Pending with": "pending_with",
     "Remarks": "remarks",
 }
+# Non-string fields among the mapped columns
+FIELD_TYPES = {
+    "request_date": "date",
+    "actual_date": "date",
+    "total_amount": "float64",
+    "duration": "float64",
+}
+FILTER_DIMS = {
+    "project": "project",
+    "supplier": "supplier",
+    "company": "company",
+    "status": "status",
+    "agent": "pending_with",
+    "month": ("request_date", "month"),
+}
 
 
 def safe_float(value):
@@ -73,6 +94,7 @@ def get_sheet_data(sheet_id):
     url = f"https://api.smartsheet.com/2.0/sheets/{sheet_id}"
     response = requests.get(url, headers=headers)
     response.raise_for_status()
+    count("bytes_in", len(response.content))
     return response.json()
 
 
@@ -315,6 +337,7 @@ def format_records_for_output(records):
                 if r.get("request_date")
                 else "",
                 "supplier": r.get("supplier", ""),
+                "supplier_id": r.get("supplier_id"),
                 "equipment_1": r.get("equipment_1", ""),
                 "equipment_2": r.get("equipment_2", ""),
                 "equipment_3": r.get("equipment_3", ""),
@@ -332,67 +355,80 @@ def format_records_for_output(records):
     return formatted
 
 
-def main():
+@instrument("sync_sla")
+def main(sheets=None):
     print(f"=== SLA Dashboard Data Sync ===")
     print(f"Started at: {datetime.now()}")
-    print(f"Sheet ID: {TRANSPORTATION_SHEET_ID}")
+    print(f"Sheet IDs: {TRANSPORTATION_SHEETS}")
 
     try:
-        # Fetch data
-        print("\nFetching data from Smartsheet...")
-        sheet_data = get_sheet_data(TRANSPORTATION_SHEET_ID)
-        print(f"Sheet name: {sheet_data.get('name')}")
-
-        # Process data
-        print("\nProcessing records...")
-        records = process_sheet(sheet_data)
+        # Fetch and process every sheet of the dataset; sheets the sync
+        # daemon already fetched are passed in
+        print("\nFetching and processing records...")
+        records, sheet_list = load_dataset(
+            "transportation", get_sheet_data, process_sheet, sheets
+        )
+        print(f"Sheet name: {sheet_names(sheet_list)}")
         print(f"Total records: {len(records)}")
 
-        # Calculate SLA metrics
-        print("\nCalculating SLA metrics...")
-        sla_data = calculate_sla_metrics(records)
-
-        # Format records for output
-        print("\nFormatting records...")
-        formatted_records = format_records_for_output(records)
-
-        # Extract filter options
-        projects = sorted(set(r.get("project") for r in records if r.get("project")))
-        suppliers = sorted(
-            [
-                str(s)
-                for s in set(
-                    r.get("supplier")
-                    for r in records
-                    if r.get("supplier")
-                    and not str(r.get("supplier", "")).startswith("202")
-                )
-            ]
-        )
-        companies = sorted(set(r.get("company") for r in records if r.get("company")))
-        statuses = sorted(set(r.get("status") for r in records if r.get("status")))
-
-        # Add metadata
-        output_data = {
-            "metadata": {
-                "last_update": datetime.now().isoformat(),
-                "source_sheet": sheet_data.get("name"),
-                "total_records": len(records),
-            },
-            "filters": {
-                "projects": projects,
-                "suppliers": suppliers,
-                "companies": companies,
-                "statuses": statuses,
-            },
-            "records": formatted_records,
-            **sla_data,
-        }
+        with stage("aggregate"):
+            count("rows_in", len(records))
+
+            # Entity id next to the raw supplier, for joins across datasets
+            resolve_names(records, "supplier", "transportation")
+
+            # Calculate SLA metrics
+            print("\nCalculating SLA metrics...")
+            sla_data = calculate_sla_metrics(records)
+
+            # Format records for output
+            print("\nFormatting records...")
+            formatted_records = format_records_for_output(records)
+
+            # Extract filter options
+            projects = sorted(set(r.get("project") for r in records if r.get("project")))
+            suppliers = sorted(
+                [
+                    str(s)
+                    for s in set(
+                        r.get("supplier")
+                        for r in records
+                        if r.get("supplier")
+                        and not str(r.get("supplier", "")).startswith("202")
+                    )
+                ]
+            )
+            companies = sorted(set(r.get("company") for r in records if r.get("company")))
+            statuses = sorted(set(r.get("status") for r in records if r.get("status")))
+
+            # Add metadata
+            output_data = {
+                "metadata": {
+                    "last_update": datetime.now().isoformat(),
+                    "source_sheet": sheet_names(sheet_list),
+                    "total_records": len(records),
+                },
+                "filters": {
+                    "projects": projects,
+                    "suppliers": suppliers,
+                    "companies": companies,
+                    "statuses": statuses,
+                },
+                "records": formatted_records,
+                **sla_data,
+            }
+            count("rows_out", len(formatted_records))
 
         # Save to JSON
         output_path = "data/sla_data.json"
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        write_dataset(
+            output_path,
+            output_data,
+            {("records",): ("request_date", True)},
+            {("records",): FIELD_TYPES},
+            record_keys={("records",): "job_order_no"},
+            filter_dims={("records",): FILTER_DIMS},
+        )
 
         print(f"\n=== Sync Complete ===")
         print(f"Data saved to: {output_path}")
@@ -416,5 +452,5 @@ def main():
 
 
 if __name__ == "__main__":
-    success = main()
+    success = run_script(main)
     exit(0 if success else 1)
@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
 """
-Sync SLA data from Smartsheet to data.js
+Sync SLA data from Smartsheet to the per-dataset data modules in data/js/
 This script is run by GitHub Actions to keep all dashboards updated
 """
 
 import os
-import json
 import re
+import json
 import requests
 from datetime import datetime
 from collections import Counter
 
+from data_output import data_hash, iter_json, write_dataset, write_text
+from entity_resolution import resolve_names
+from profiling import run_script
+from run_metrics import count, instrument, stage
+from sheet_sources import load_dataset, replaying, sheet_ids
+
 def parse_cost(value):
     """Parse cost value that may contain currency symbols and formatting"""
     if value is None:
@@ -38,8 +44,11 @@ def parse_days(value):
 # Configuration
 SMARTSHEET_TOKEN = os.environ.get('SMARTSHEET_TOKEN')
 
-# Sheet IDs
-JOB_ORDERS_SHEET_ID = 2606397737881476  # Job Orders Tracking sheet (SLA)
+# Sheets of the Job Orders Tracking dataset (SLA), see sheet_sources.json
+JOB_ORDERS_SHEETS = sheet_ids('job_orders')
+
+# Per-dataset JS modules, replacing the single data.js bundle
+DATA_MODULES_DIR = 'data/js'
 
 # Column mappings for Job Orders (SLA/Transportation/Payments)
 JOB_ORDERS_COLUMNS = {
@@ -62,6 +71,27 @@ JOB_ORDERS_COLUMNS = {
     'Payment Cycle (Days)': 'payment_cycle_days',
     'Comments': 'comments'
 }
+# Non-string fields of the transportation and payments records
+FIELD_TYPES = {
+    'request_date': 'date',
+    'total_amount': 'float64',
+    'duration': 'float64',
+    'invoice_receive_days': 'float64',
+    'payment_cycle_days': 'float64'
+}
+TRANSPORT_FILTER_DIMS = {
+    'project': 'project',
+    'supplier': 'supplier',
+    'equipment': 'equipment_1',
+    'status': 'status',
+    'month': ('request_date', 'month')
+}
+PAYMENT_FILTER_DIMS = {
+    'project': 'project',
+    'supplier': 'supplier',
+    'payment_status': 'payment_status',
+    'month': ('request_date', 'month')
+}
 
 def get_sheet_data(sheet_id):
     """Fetch data from Smartsheet API"""
@@ -73,6 +103,7 @@ def get_sheet_data(sheet_id):
     url = f'https://api.smartsheet.com/2.0/sheets/{sheet_id}'
     response = requests.get(url, headers=headers)
     response.raise_for_status()
+    count('bytes_in', len(response.content))
     return response.json()
 
 def process_sheet(sheet_data, column_mappings):
@@ -321,6 +352,7 @@ def prepare_transportation_full_data(orders):
             'request_date': o.get('job_order_date', ''),
             'project': o.get('project', 'Unknown'),
             'supplier': o.get('supplier', 'Unknown'),
+            'supplier_id': o.get('supplier_id'),
             'equipment_1': o.get('equipment_type', 'Unknown'),
             'requester': o.get('requester', ''),
             'total_amount': parse_cost(o.get('cost')),
@@ -350,6 +382,7 @@ def prepare_payments_full_data(orders):
             'request_date': o.get('job_order_date', ''),
             'project': o.get('project', 'Unknown'),
             'supplier': o.get('supplier', 'Unknown'),
+            'supplier_id': o.get('supplier_id'),
             'equipment_1': o.get('equipment_type', 'Unknown'),
             'requester': o.get('requester', ''),
             'total_amount': parse_cost(o.get('cost')),
@@ -370,64 +403,122 @@ def prepare_payments_full_data(orders):
         'records': records
     }
 
-def write_data_js(sla_data, transportation_data, payments_data, orders):
-    """Write all data to data.js and JSON files"""
-    js_content = f'''// NESMA Supply Chain Management - Dashboard Data
-// Auto-synced from Smartsheet
+def iter_data_module(name, data):
+    """Yield one data module; repeated top-level blocks are emitted once"""
+    yield f'''// NESMA Supply Chain Management - {name}
+// Auto-synced from Smartsheet, loaded on demand by assets/nesma-data.js
 // Last updated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
 
-// SLA Dashboard Data
-const SLA_DATA = {json.dumps(sla_data, ensure_ascii=False, indent=2)};
-
-// Transportation Dashboard Data
-const TRANSPORTATION_DATA = {json.dumps(transportation_data, ensure_ascii=False, indent=2)};
-
-// Payments Dashboard Data
-const PAYMENTS_DATA = {json.dumps(payments_data, ensure_ascii=False, indent=2)};
-
-// Raw Orders Data (last 200)
-const ORDERS_DATA = {json.dumps(orders[:200], ensure_ascii=False, indent=2)};
+(function () {{
 '''
+    if not isinstance(data, dict) or not data:
+        yield f"NesmaData.register('{name}', "
+        yield from iter_json(data)
+        yield ');\n})();\n'
+        return
+
+    # Blocks with identical content (e.g. equipment_distribution and
+    # equipment_count) are declared once and referenced by variable
+    first_key = {}
+    shared = {}
+    for key, value in data.items():
+        if not isinstance(value, (dict, list)) or not value:
+            continue
+        digest = data_hash(value)
+        if digest in first_key:
+            shared.setdefault(first_key[digest], []).append(key)
+        else:
+            first_key[digest] = key
+
+    block_vars = {}
+    for i, key in enumerate(shared):
+        block_vars[key] = f'block{i}'
+        for dup in shared[key]:
+            block_vars[dup] = f'block{i}'
+        yield f'var block{i} = '
+        yield from iter_json(data[key])
+        yield ';\n'
+
+    yield f"NesmaData.register('{name}', {{"
+    for i, (key, value) in enumerate(data.items()):
+        yield (',' if i else '') + '\n  ' + json.dumps(key, ensure_ascii=False) + ': '
+        if key in block_vars:
+            yield block_vars[key]
+        else:
+            yield from iter_json(value, level=1)
+    yield '\n});\n})();\n'
+
+def write_data_modules(datasets):
+    """Write one module per dataset plus the index used by the loader"""
+    os.makedirs(DATA_MODULES_DIR, exist_ok=True)
+    index = {}
+    module_by_hash = {}
+
+    for name, data in datasets.items():
+        # Identical datasets (TRANSPORTATION_DATA is a copy of SLA_DATA)
+        # share one file instead of shipping the payload twice
+        digest = data_hash(data)
+        if digest in module_by_hash:
+            index[name] = module_by_hash[digest]
+            continue
+
+        file_name = f'{name.lower()}.js'
+        write_text(os.path.join(DATA_MODULES_DIR, file_name), iter_data_module(name, data))
+        index[name] = {'file': file_name, 'name': name}
+        module_by_hash[digest] = index[name]
+
+    write_text(
+        os.path.join(DATA_MODULES_DIR, 'index.js'),
+        f'// NESMA Supply Chain Management - data module index\n'
+        f'NesmaData.configure({json.dumps(index, ensure_ascii=False, indent=2)});\n'
+    )
 
-    with open('data.js', 'w', encoding='utf-8') as f:
-        f.write(js_content)
+def write_data_js(sla_data, transportation_data, payments_data, orders):
+    """Write the data modules and JSON files"""
+    write_data_modules({
+        'SLA_DATA': sla_data,
+        'TRANSPORTATION_DATA': transportation_data,
+        'PAYMENTS_DATA': payments_data,
+        'ORDERS_DATA': orders[:200]
+    })
 
     transportation_full = prepare_transportation_full_data(orders)
-    with open('transportation_full_data.json', 'w', encoding='utf-8') as f:
-        json.dump(transportation_full, f, ensure_ascii=False, indent=2)
+    write_dataset('transportation_full_data.json', transportation_full, {('records',): ('request_date', True)}, {('records',): FIELD_TYPES}, record_keys={('records',): 'job_order_no'}, filter_dims={('records',): TRANSPORT_FILTER_DIMS})
 
     payments_full = prepare_payments_full_data(orders)
-    with open('payments_full_data.json', 'w', encoding='utf-8') as f:
-        json.dump(payments_full, f, ensure_ascii=False, indent=2)
+    write_dataset('payments_full_data.json', payments_full, {('records',): ('request_date', True)}, {('records',): FIELD_TYPES}, record_keys={('records',): 'job_order_no'}, filter_dims={('records',): PAYMENT_FILTER_DIMS})
 
-    print(f"Written {len(orders)} orders to data.js")
+    print(f"Written {min(len(orders), 200)} orders to {DATA_MODULES_DIR}")
     print(f"Written {len(transportation_full['records'])} records to transportation_full_data.json")
     print(f"Written {len(payments_full['records'])} records to payments_full_data.json")
 
+@instrument('sync_smartsheet')
 def main():
-    if not SMARTSHEET_TOKEN:
+    if not SMARTSHEET_TOKEN and not replaying():
         print("Error: SMARTSHEET_TOKEN environment variable not set")
         return 1
 
     print("Fetching data from Smartsheet...")
-    sheet_data = get_sheet_data(JOB_ORDERS_SHEET_ID)
-
     print("Processing orders data...")
-    orders = process_sheet(sheet_data, JOB_ORDERS_COLUMNS)
+    orders, _ = load_dataset('job_orders', get_sheet_data, lambda sheet: process_sheet(sheet, JOB_ORDERS_COLUMNS))
 
     print(f"Found {len(orders)} orders")
 
-    print("Calculating SLA KPIs...")
-    sla_data = calculate_sla_kpis(orders)
+    with stage('aggregate'):
+        count('rows_in', len(orders))
+        resolve_names(orders, 'supplier', 'transportation')
+
+        print("Calculating SLA KPIs...")
+        sla_data = calculate_sla_kpis(orders)
 
-    print("Calculating Transportation KPIs...")
-    # Transportation uses same data as SLA
-    transportation_data = sla_data.copy()
+        print("Calculating Transportation KPIs...")
+        # Transportation uses same data as SLA
+        transportation_data = sla_data.copy()
 
-    print("Calculating Payments KPIs...")
-    payments_data = calculate_payments_kpis(orders)
+        print("Calculating Payments KPIs...")
+        payments_data = calculate_payments_kpis(orders)
 
-    print("Writing data.js...")
+    print("Writing data modules...")
     write_data_js(sla_data, transportation_data, payments_data, orders)
 
     print("Sync complete!")
@@ -440,4 +531,4 @@ def main():
     return 0
 
 if __name__ == '__main__':
-    exit(main())
+    exit(run_script(main))
@@ -3,23 +3,50 @@
 Sync Smartsheet PR to PO Report data to JSON for Procurement Dashboard
 """
 
-import json
 import os
 from datetime import datetime
 import smartsheet
 
+from data_output import write_dataset
+from entity_resolution import resolve_names
+from profiling import run_script
+from run_metrics import count, instrument, stage
+from sheet_sources import fetch_sheets, merge_records, dataset_key, replaying, sheet_ids
+
 # Smartsheet API setup
 SMARTSHEET_ACCESS_TOKEN = os.environ.get('SMARTSHEET_ACCESS_TOKEN')
-PR_TO_PO_SHEET_ID = 2967308268949380  # PR to PO Report sheet
+# PR to PO Report sheets, see sheet_sources.json
+PR_TO_PO_SHEETS = sheet_ids('pr_to_po_report')
+
+# Dates and amounts among the fields of process_pr_data
+FIELD_TYPES = {
+    'submission_date': 'date',
+    'approved_date': 'date',
+    'return_date': 'date',
+    'reject_date': 'date',
+    'pending_since': 'date',
+    'po_approved_date': 'date',
+    'pr_value': 'float64',
+    'po_value': 'float64',
+    'saving_amount': 'float64',
+    'pr_to_po_days': 'float64'
+}
+FILTER_DIMS = {
+    'project': 'project',
+    'vendor': 'vendor',
+    'status': 'status',
+    'agent': 'agent',
+    'month': ('submission_date', 'month')
+}
+SEARCH_FIELDS = ['description', 'pr_note']
 
 def get_smartsheet_client():
     """Initialize Smartsheet client"""
-    return smartsheet.Smartsheet(SMARTSHEET_ACCESS_TOKEN)
-
-def get_pr_data_from_sheet(client, sheet_id):
-    """Fetch PR to PO data from Smartsheet"""
-    sheet = client.Sheets.get_sheet(sheet_id)
+    # Replayed sheets need no API access, but the SDK insists on a token
+    return smartsheet.Smartsheet(SMARTSHEET_ACCESS_TOKEN or ('offline' if replaying() else None))
 
+def sheet_rows(sheet):
+    """Rows of a fetched sheet as {column title: value} dicts"""
     # Create column name mapping
     column_map = {col.title: col.id for col in sheet.columns}
 
@@ -174,6 +201,7 @@ def calculate_statistics(all_prs):
         }
     }
 
+@instrument('sync_smartsheet_data')
 def main():
     """Main function to sync data"""
     print(f"Starting Smartsheet sync at {datetime.now()}")
@@ -183,29 +211,39 @@ def main():
         print("Connected to Smartsheet API")
 
         # Fetch raw data
-        print(f"Fetching data from sheet {PR_TO_PO_SHEET_ID}...")
-        raw_prs = get_pr_data_from_sheet(client, PR_TO_PO_SHEET_ID)
-        print(f"Fetched {len(raw_prs)} rows")
+        print(f"Fetching data from sheets {PR_TO_PO_SHEETS}...")
+        with stage('fetch'):
+            sheets = fetch_sheets(PR_TO_PO_SHEETS, client.Sheets.get_sheet, model=smartsheet.models.Sheet)
+
+        with stage('decode'):
+            shards = [sheet_rows(sheet) for sheet in sheets]
+            print(f"Fetched {sum(len(rows) for rows in shards)} rows")
+            count('rows_in', sum(len(rows) for rows in shards))
+
+            # Process each sheet, then drop PRs superseded by a later sheet
+            all_prs = merge_records([process_pr_data(rows) for rows in shards], dataset_key('pr_to_po_report'))
+            count('rows_out', len(all_prs))
 
-        # Process data
-        all_prs = process_pr_data(raw_prs)
-        print(f"Processed {len(all_prs)} PRs")
+        with stage('aggregate'):
+            count('rows_in', len(all_prs))
+            resolve_names(all_prs, 'vendor', 'procurement')
+            print(f"Processed {len(all_prs)} PRs")
 
-        # Calculate statistics
-        stats = calculate_statistics(all_prs)
+            # Calculate statistics
+            stats = calculate_statistics(all_prs)
 
         # Create output data
         output_data = {
             'last_updated': datetime.now().isoformat(),
-            'source_sheet_id': PR_TO_PO_SHEET_ID,
+            'source_sheet_id': PR_TO_PO_SHEETS[0],
+            'source_sheet_ids': PR_TO_PO_SHEETS,
             **stats,
             'all_prs': all_prs
         }
 
         # Save to JSON
         output_path = 'data/pr_data.json'
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        write_dataset(output_path, output_data, {('all_prs',): ('submission_date', True)}, {('all_prs',): FIELD_TYPES}, record_keys={('all_prs',): 'pr_num'}, filter_dims={('all_prs',): FILTER_DIMS}, search_fields={('all_prs',): SEARCH_FIELDS})
 
         print(f"Data saved to {output_path}")
         print(f"Summary: {stats['summary']}")
@@ -217,4 +255,4 @@ def main():
         return False
 
 if __name__ == '__main__':
-    main()
+    run_script(main)
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Smartsheet webhook receiver with row-level updates
+Smartsheet posts a callback listing the rows that were created, updated or
+deleted (cell events carry their row id). Instead of refetching whole
+sheets, the receiver keeps each sheet's rows in an in-memory row store
+(filled by one full fetch at startup), fetches only the affected rows
+(GET /sheets/{id}?rowIds=...), patches the store and reruns the sheet's
+jobs from sync_daemon.JOBS on the patched sheet, which recomputes the KPI
+outputs. Events arriving within WEBHOOK_WINDOW seconds of each other are
+coalesced, so a burst of edits leads to one fetch and one recompute (at
+most WEBHOOK_MAX_WAIT seconds after the first event). Column changes and
+sheets whose last fetch failed fall back to a full fetch.
+
+Callbacks are acknowledged before processing, verification challenges
+are answered, and the Smartsheet-Hmac-SHA256 signature of every callback
+is checked against WEBHOOK_SECRET (the webhook's sharedSecret). The
+receiver refuses to start without it unless --offline is given. It binds
+to WEBHOOK_HOST (127.0.0.1 by default, e.g. behind a reverse proxy); pass
+--host 0.0.0.0 to listen on all interfaces. Publishing follows
+sync_daemon (SYNC_DAEMON_PUBLISH / SYNC_DAEMON_PUSH).
+
+    python sync_webhook.py [port] [--host HOST] [--offline DIR]
+    python sync_webhook.py simulate SHEET_ID [--url URL] [--offline DIR] [--bursts N] [--edits N]
+
+--offline DIR serves the sheets from DIR/<sheet id>.json instead of the
+API; simulate then edits random rows of that file before posting the
+synthetic callbacks, so the whole path can be tried locally.
+"""
+
+import os
+import sys
+import json
+import hmac
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import sync_daemon
+from atomic_write import atomic_open
+
+# Configuration
+ROOT = sync_daemon.ROOT
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8766"))
+WEBHOOK_WINDOW = float(os.environ.get("WEBHOOK_WINDOW", "2"))
+WEBHOOK_MAX_WAIT = float(os.environ.get("WEBHOOK_MAX_WAIT", "10"))
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+# Row ids per request, keeps the query string short
+ROW_BATCH = 100
+
+
+class LocalSheets:
+    """Stand-in for the sheet API reading DIR/<sheet id>.json"""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, sheet_id):
+        return os.path.join(self.directory, f"{sheet_id}.json")
+
+    def fetch(self, sheet_id, row_ids=None):
+        with open(self.path(sheet_id), "r", encoding="utf-8") as f:
+            sheet = json.load(f)
+        if row_ids:
+            wanted = set(row_ids)
+            sheet["rows"] = [row for row in sheet.get("rows", []) if row["id"] in wanted]
+        return sheet
+
+
+class RowStore:
+    """Rows of one sheet by id, with the sheet's other fields (columns, version)"""
+
+    def __init__(self, sheet):
+        self.sheet = {k: v for k, v in sheet.items() if k != "rows"}
+        self.rows = {row["id"]: row for row in sheet.get("rows", [])}
+
+    def patch(self, fetched, row_ids, deleted):
+        """
+        Apply a partial fetch of row_ids and the deleted row ids
+
+        Requested rows missing from the fetch were deleted meanwhile.
+        Returns the (updated, removed) counts.
+        """
+        self.sheet.update({k: v for k, v in fetched.items() if k != "rows"})
+        returned = {row["id"]: row for row in fetched.get("rows", [])}
+        self.rows.update(returned)
+        gone = set(deleted) | (set(row_ids) - set(returned))
+        removed = sum(self.rows.pop(row_id, None) is not None for row_id in gone)
+        return len(returned), removed
+
+    def sheet_data(self):
+        """The sheet as a full fetch returns it"""
+        rows = sorted(self.rows.values(), key=lambda r: (r.get("rowNumber") or 0, r["id"]))
+        return dict(self.sheet, rows=rows)
+
+
+def parse_events(payload):
+    """
+    Changed row ids, deleted row ids and whether a full fetch is needed
+
+    Row and cell events name their rows; column or sheet-level changes
+    can touch every row.
+    """
+    changed = set()
+    deleted = set()
+    full = False
+    for event in payload.get("events", []):
+        object_type = event.get("objectType")
+        if object_type == "row":
+            if event.get("eventType") == "deleted":
+                deleted.add(event["id"])
+                changed.discard(event["id"])
+            else:
+                changed.add(event["id"])
+        elif object_type == "cell" and event.get("rowId"):
+            changed.add(event["rowId"])
+        elif object_type == "column":
+            full = True
+    return changed, deleted, full
+
+
+def signature(body, secret):
+    """Smartsheet-Hmac-SHA256 value of a callback body"""
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class Coalescer:
+    """
+    Collects the pending changes per sheet until the burst is over
+
+    A batch is handed out once no event arrived for window seconds, or
+    max_wait seconds after its first event.
+    """
+
+    def __init__(self, window=WEBHOOK_WINDOW, max_wait=WEBHOOK_MAX_WAIT):
+        self.window = window
+        self.max_wait = max_wait
+        self.pending = {}
+        self.first = self.last = None
+        self.condition = threading.Condition()
+
+    def add(self, sheet_id, changed, deleted, full, sent_at=None):
+        with self.condition:
+            entry = self.pending.setdefault(
+                sheet_id, {"changed": set(), "deleted": set(), "full": False, "sent": []}
+            )
+            entry["changed"] = (entry["changed"] | changed) - deleted
+            entry["deleted"] |= deleted
+            entry["full"] = entry["full"] or full
+            entry["sent"].append(sent_at or time.time())
+            now = time.monotonic()
+            self.first = self.first or now
+            self.last = now
+            self.condition.notify()
+
+    def take(self, stop):
+        """Wait for the next batch; None once stop is set"""
+        with self.condition:
+            while not stop.is_set():
+                if not self.pending:
+                    self.condition.wait(1)
+                    continue
+                due = min(self.last + self.window, self.first + self.max_wait)
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    batch, self.pending = self.pending, {}
+                    self.first = self.last = None
+                    return batch
+                self.condition.wait(remaining)
+        return None
+
+
+class WebhookProcessor:
+    """Applies coalesced batches to the row stores and reruns the jobs"""
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.stores = {}
+        self.state = sync_daemon.load_state()
+
+    def warm(self, sheet_ids):
+        """Full fetch of every sheet, so the first burst is already row-level"""
+        for sheet_id in sheet_ids:
+            try:
+                self.stores[sheet_id] = RowStore(self.fetch(sheet_id))
+                print(f"Sheet {sheet_id}: {len(self.stores[sheet_id].rows)} rows loaded")
+            except (requests.RequestException, OSError, ValueError) as e:
+                print(f"Sheet {sheet_id}: fetch failed: {e}")
+
+    def refresh(self, sheet_id, entry):
+        """Bring a sheet's row store up to date, fetching as little as possible"""
+        store = self.stores.get(sheet_id)
+        if store is None or entry["full"]:
+            store = self.stores[sheet_id] = RowStore(self.fetch(sheet_id))
+            print(f"Sheet {sheet_id}: full fetch, {len(store.rows)} rows")
+            return store
+
+        updated, removed = store.patch({}, (), entry["deleted"])
+        row_ids = sorted(entry["changed"])
+        for i in range(0, len(row_ids), ROW_BATCH):
+            batch = row_ids[i : i + ROW_BATCH]
+            counts = store.patch(self.fetch(sheet_id, batch), batch, ())
+            updated += counts[0]
+            removed += counts[1]
+        print(f"Sheet {sheet_id}: {updated} rows updated, {removed} removed")
+        return store
+
+    def process(self, batch):
+        """Patch the stores of a batch's sheets, then recompute once"""
+        sheets = {}
+        for sheet_id, entry in batch.items():
+            try:
+                sheets[sheet_id] = self.refresh(sheet_id, entry).sheet_data()
+            except (requests.RequestException, OSError, ValueError) as e:
+                # Refetched in full with the next event
+                print(f"Sheet {sheet_id}: fetch failed: {e}")
+                self.stores[sheet_id] = None
+        if not sheets:
+            return
+
+        changed = list(sheets)
+        # Other sheets of the same datasets come from their row stores
+        for sheet_id, store in self.stores.items():
+            if store is not None and sheet_id not in sheets:
+                sheets[sheet_id] = store.sheet_data()
+        ran, failed_sheets = sync_daemon.run_jobs(sheets, changed)
+        for sheet_id in changed:
+            # Keeps the polling daemon from redoing this version
+            if sheet_id not in failed_sheets and "version" in sheets[sheet_id]:
+                self.state["versions"][str(sheet_id)] = sheets[sheet_id]["version"]
+        self.state["last_sync"] = datetime.now().isoformat()
+        sync_daemon.save_state(self.state)
+
+        if sync_daemon.PUBLISH and ran:
+            sync_daemon.publish()
+        sent = min(t for entry in batch.values() for t in entry["sent"])
+        events = sum(len(entry["sent"]) for entry in batch.values())
+        print(
+            f"[{datetime.now():%H:%M:%S}] {events} callbacks -> jobs {sorted(ran)}, "
+            f"{time.time() - sent:.1f}s after the first edit"
+        )
+
+    def run(self, coalescer, stop, sheet_ids):
+        self.warm(sheet_ids)
+        while True:
+            batch = coalescer.take(stop)
+            if batch is None:
+                return
+            try:
+                self.process(batch)
+            except Exception as e:
+                print(f"Batch failed: {e}")
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """POST-only handler for Smartsheet callbacks and verification challenges"""
+
+    coalescer = None
+    sheets = set()
+
+    def send_json(self, status, doc, headers=()):
+        body = json.dumps(doc).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "Invalid JSON"})
+            return
+
+        # Sent on registration and periodically afterwards
+        challenge = self.headers.get("Smartsheet-Hook-Challenge") or payload.get("challenge")
+        if challenge:
+            self.send_json(
+                200,
+                {"smartsheetHookResponse": challenge},
+                [("Smartsheet-Hook-Response", challenge)],
+            )
+            return
+
+        if WEBHOOK_SECRET and not hmac.compare_digest(
+            self.headers.get("Smartsheet-Hmac-SHA256", ""), signature(body, WEBHOOK_SECRET)
+        ):
+            self.send_json(403, {"error": "Bad signature"})
+            return
+
+        sheet_id = payload.get("scopeObjectId")
+        if payload.get("scope") != "sheet" or sheet_id not in self.sheets:
+            self.send_json(200, {"ignored": True})
+            return
+        changed, deleted, full = parse_events(payload)
+        sent_at = None
+        if payload.get("timestamp"):
+            try:
+                sent_at = datetime.fromisoformat(
+                    payload["timestamp"].replace("Z", "+00:00")
+                ).timestamp()
+            except ValueError:
+                pass
+        self.coalescer.add(sheet_id, changed, deleted, full, sent_at)
+        self.send_json(200, {"queued": len(changed) + len(deleted)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def simulate(argv):
+    """Post bursts of synthetic callbacks, editing the --offline sheet first"""
+    sheet_id = int(argv[0])
+    url = option(argv, "--url", f"http://localhost:{WEBHOOK_PORT}/")
+    bursts = int(option(argv, "--bursts", "3"))
+    edits = int(option(argv, "--edits", "20"))
+    local = LocalSheets(option(argv, "--offline")) if "--offline" in argv else None
+    session = requests.Session()
+
+    for burst in range(bursts):
+        row_ids = None
+        if local:
+            with open(local.path(sheet_id), "r", encoding="utf-8") as f:
+                sheet = json.load(f)
+            rows = random.sample(sheet["rows"], min(edits, len(sheet["rows"])))
+            for row in rows:
+                for cell in row.get("cells", []):
+                    if isinstance(cell.get("value"), (int, float)):
+                        cell["value"] = cell["value"] + 1
+                        cell["displayValue"] = str(cell["value"])
+            sheet["version"] = sheet.get("version", 0) + 1
+            with atomic_open(local.path(sheet_id)) as f:
+                json.dump(sheet, f, ensure_ascii=False)
+            row_ids = [row["id"] for row in rows]
+        row_ids = row_ids or [random.randrange(1, 10**15) for _ in range(edits)]
+
+        # One callback per edit, as Smartsheet sends them during a burst
+        for row_id in row_ids:
+            payload = {
+                "nonce": f"{burst}-{row_id}",
+                "timestamp": datetime.now().astimezone().isoformat(),
+                "webhookId": 0,
+                "scope": "sheet",
+                "scopeObjectId": sheet_id,
+                "events": [
+                    {"objectType": "row", "eventType": "updated", "id": row_id},
+                    {"objectType": "cell", "eventType": "updated", "rowId": row_id},
+                ],
+            }
+            body = json.dumps(payload).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            if WEBHOOK_SECRET:
+                headers["Smartsheet-Hmac-SHA256"] = signature(body, WEBHOOK_SECRET)
+            session.post(url, data=body, headers=headers, timeout=10).raise_for_status()
+        print(f"Burst {burst + 1}: {len(row_ids)} callbacks posted")
+        time.sleep(WEBHOOK_WINDOW * 2)
+    return 0
+
+
+def option(argv, name, default=None):
+    """Value following a command line option"""
+    if name in argv and argv.index(name) + 1 < len(argv):
+        return argv[argv.index(name) + 1]
+    return default
+
+
+def main(argv):
+    if argv and argv[0] == "simulate":
+        return simulate(argv[1:])
+
+    # Unsigned callbacks would let anyone trigger fetches and publishes
+    if not WEBHOOK_SECRET and "--offline" not in argv:
+        print("ERROR: WEBHOOK_SECRET is not set (use --offline DIR to try it locally)")
+        return 1
+
+    # The sync scripts write paths relative to the repository root
+    os.chdir(ROOT)
+    port = int(argv[0]) if argv and argv[0].isdigit() else WEBHOOK_PORT
+    host = option(argv, "--host", WEBHOOK_HOST)
+    if "--offline" in argv:
+        fetch = LocalSheets(os.path.abspath(option(argv, "--offline"))).fetch
+    else:
+        session = sync_daemon.make_session()
+        fetch = lambda sheet_id, row_ids=None: sync_daemon.fetch_sheet(session, sheet_id, row_ids)
+
+    coalescer = Coalescer()
+    processor = WebhookProcessor(fetch)
+    stop = threading.Event()
+    sheet_ids = sync_daemon.job_sheets()
+    worker = threading.Thread(
+        target=processor.run, args=(coalescer, stop, sheet_ids), daemon=True
+    )
+    worker.start()
+
+    WebhookHandler.coalescer = coalescer
+    WebhookHandler.sheets = set(sheet_ids)
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    print(f"Webhook receiver on http://{host}:{port}/ (window {WEBHOOK_WINDOW:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    stop.set()
+    worker.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Build the vendor scorecard from the synced datasets
+Evaluation scores (vendor_data.json), PO value and PR-to-PO days (pr_data.json)
+and delivery durations / on-time rates (transportation_full_data.json) are
+joined on the vendor entity ids the syncs publish next to the raw names
+(vendor_id / supplier_id, see entity_resolution.py). Each dataset is read
+once into a hash table keyed by entity id, and the tables are outer-joined
+into data/vendor_scorecard.json, which the vendor evaluation tab of
+procurement_dashboard.html shows, so the dashboard does not cross-reference
+the three files client-side.
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+from collections import Counter, defaultdict
+
+from data_output import write_dataset
+from entity_resolution import EntityResolver
+from run_metrics import count, instrument, stage
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+VENDOR_FILE = os.path.join(ROOT, "data", "vendor_data.json")
+PR_FILE = os.path.join(ROOT, "data", "pr_data.json")
+TRANSPORT_FILE = os.path.join(ROOT, "transportation_full_data.json")
+OUTPUT_FILE = os.path.join(ROOT, "data", "vendor_scorecard.json")
+
+# Completed within this many days counts as on time (same as sync_sla.py)
+SLA_DAYS = 3
+
+# Numeric columns of the scorecard rows
+FIELD_TYPES = {
+    "evaluation_score": "float64",
+    "pr_count": "int64",
+    "po_count": "int64",
+    "po_value": "float64",
+    "avg_pr_to_po_days": "float64",
+    "transport_orders": "int64",
+    "transport_spend": "float64",
+    "avg_duration": "float64",
+    "on_time_rate": "float64",
+}
+FILTER_DIMS = {
+    "category": "category",
+}
+
+
+def safe_float(value):
+    """Number of a JSON value, None when it is not one"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+
+def load_records(path, field):
+    """Records list of a dataset file, [] when the file is missing"""
+    if not os.path.exists(path):
+        print(f"WARNING: {path} not found, skipping")
+        return []
+    count("bytes_in", os.path.getsize(path))
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get(field) or []
+
+
+def mean(total, n):
+    """Rounded average, None for no values"""
+    return round(total / n, 1) if n else None
+
+
+def record_entity(resolver, record, id_field, name_field, source, names):
+    """
+    Entity id of a record: its published id, or its raw name resolved
+    through the cache for files written before the ids were added. The raw
+    name is counted in names, so a row shows its most common spelling.
+    """
+    if id_field in record:
+        entity_id = record[id_field]
+    else:
+        entity_id = resolver.resolve_id(record.get(name_field), source)
+    if entity_id is not None and record.get(name_field):
+        names[entity_id][str(record[name_field]).strip()] += 1
+    return entity_id
+
+
+def index_evaluations(resolver, vendors, names):
+    """entity id -> evaluation stats, one pass over vendor_data.json vendors"""
+    table = {}
+    for vendor in vendors:
+        entity_id = record_entity(
+            resolver, vendor, "vendor_id", "name", "vendor_evaluation", names
+        )
+        if entity_id is None:
+            continue
+        row = table.setdefault(entity_id, {"category": None, "total": 0.0, "count": 0})
+        row["category"] = row["category"] or vendor.get("category")
+        score = safe_float(vendor.get("score"))
+        # A score of 0 means not evaluated yet
+        if score:
+            row["total"] += score
+            row["count"] += 1
+    return table
+
+
+def index_purchases(resolver, prs, names):
+    """entity id -> PR / PO stats, one pass over pr_data.json all_prs"""
+    table = {}
+    for pr in prs:
+        entity_id = record_entity(
+            resolver, pr, "vendor_id", "vendor", "procurement", names
+        )
+        if entity_id is None:
+            continue
+        row = table.setdefault(
+            entity_id, {"prs": 0, "pos": 0, "value": 0.0, "days": 0.0, "timed": 0}
+        )
+        row["prs"] += 1
+        value = safe_float(pr.get("po_value"))
+        if value:
+            row["pos"] += 1
+            row["value"] += value
+        days = safe_float(pr.get("pr_to_po_days"))
+        if days is not None:
+            row["days"] += days
+            row["timed"] += 1
+    return table
+
+
+def index_deliveries(resolver, records, names):
+    """entity id -> transport stats, one pass over the transportation records"""
+    table = {}
+    for record in records:
+        entity_id = record_entity(
+            resolver, record, "supplier_id", "supplier", "transportation", names
+        )
+        if entity_id is None:
+            continue
+        row = table.setdefault(
+            entity_id, {"orders": 0, "spend": 0.0, "days": 0.0, "timed": 0, "on_time": 0}
+        )
+        row["orders"] += 1
+        row["spend"] += safe_float(record.get("total_amount")) or 0.0
+        duration = safe_float(record.get("duration"))
+        if duration and duration > 0:
+            row["days"] += duration
+            row["timed"] += 1
+            row["on_time"] += duration <= SLA_DAYS
+    return table
+
+
+def build_scorecard(resolver, vendors, prs, transport):
+    """Outer join of the three hash tables into scorecard rows"""
+    names = defaultdict(Counter)
+    evaluations = index_evaluations(resolver, vendors, names)
+    purchases = index_purchases(resolver, prs, names)
+    deliveries = index_deliveries(resolver, transport, names)
+
+    rows = []
+    for entity_id in sorted(set(evaluations) | set(purchases) | set(deliveries)):
+        evaluation = evaluations.get(entity_id)
+        purchase = purchases.get(entity_id)
+        delivery = deliveries.get(entity_id)
+        rows.append(
+            {
+                "vendor_id": entity_id,
+                "name": names[entity_id].most_common(1)[0][0],
+                "category": evaluation["category"] if evaluation else None,
+                "evaluation_score": mean(evaluation["total"], evaluation["count"])
+                if evaluation
+                else None,
+                "pr_count": purchase["prs"] if purchase else 0,
+                "po_count": purchase["pos"] if purchase else 0,
+                "po_value": round(purchase["value"], 2) if purchase else 0.0,
+                "avg_pr_to_po_days": mean(purchase["days"], purchase["timed"])
+                if purchase
+                else None,
+                "transport_orders": delivery["orders"] if delivery else 0,
+                "transport_spend": round(delivery["spend"], 2) if delivery else 0.0,
+                "avg_duration": mean(delivery["days"], delivery["timed"])
+                if delivery
+                else None,
+                "on_time_rate": mean(delivery["on_time"] * 100, delivery["timed"])
+                if delivery
+                else None,
+                "sources": [
+                    name
+                    for name, table in (
+                        ("vendor_evaluation", evaluation),
+                        ("procurement", purchase),
+                        ("transportation", delivery),
+                    )
+                    if table
+                ],
+            }
+        )
+
+    rows.sort(key=lambda r: (-r["po_value"], -r["transport_spend"], r["name"]))
+    return rows
+
+
+@instrument("vendor_scorecard")
+def main():
+    print("=== Vendor Scorecard ===")
+    print(f"Started at: {datetime.now()}")
+
+    with stage("fetch"):
+        resolver = EntityResolver()
+        vendors = load_records(VENDOR_FILE, "vendors")
+        prs = load_records(PR_FILE, "all_prs")
+        transport = load_records(TRANSPORT_FILE, "records")
+    print(f"Vendors: {len(vendors)}, PRs: {len(prs)}, transport records: {len(transport)}")
+
+    with stage("aggregate"):
+        count("rows_in", len(vendors) + len(prs) + len(transport))
+        rows = build_scorecard(resolver, vendors, prs, transport)
+        resolver.save()
+        count("rows_out", len(rows))
+
+    scored = [r["evaluation_score"] for r in rows if r["evaluation_score"] is not None]
+    output = {
+        "last_updated": datetime.now().isoformat(),
+        "summary": {
+            "total_vendors": len(rows),
+            "evaluated": len(scored),
+            "with_purchases": sum(1 for r in rows if r["pr_count"]),
+            "with_deliveries": sum(1 for r in rows if r["transport_orders"]),
+            "in_all_sources": sum(1 for r in rows if len(r["sources"]) == 3),
+            "average_score": mean(sum(scored), len(scored)),
+        },
+        "vendors": rows,
+    }
+    write_dataset(
+        OUTPUT_FILE,
+        output,
+        {("vendors",): None},
+        {("vendors",): FIELD_TYPES},
+        record_keys={("vendors",): "vendor_id"},
+        filter_dims={("vendors",): FILTER_DIMS},
+    )
+
+    print(f"Scorecard written to {OUTPUT_FILE}")
+    for key, value in output["summary"].items():
+        print(f"  - {key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Excel workbook loader with a parsed-sheet disk cache
+Each workbook is opened once for all the sheets a script needs, only the
+requested columns are parsed, and every parsed sheet is pickled under
+WORKBOOK_CACHE_DIR keyed by the file's content hash, the sheet name and
+the column selection. An unchanged workbook is not parsed again on the
+next run. Entries unused for WORKBOOK_CACHE_DAYS are pruned.
+"""
+
+import os
+import sys
+import time
+import hashlib
+
+import pandas as pd
+
+from atomic_write import atomic_path
+
+# Configuration
+WORKBOOK_CACHE_DIR = os.environ.get(
+    "WORKBOOK_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "workbooks"),
+)
+WORKBOOK_CACHE_DAYS = int(os.environ.get("WORKBOOK_CACHE_DAYS", "30"))
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def column_filter(columns):
+    """
+    usecols callable for a column selection
+
+    columns lists header names, and/or types to keep every column whose
+    header is an instance of that type (e.g. datetime for the day columns).
+    None keeps all columns.
+    """
+    if columns is None:
+        return None
+    names = {c for c in columns if not isinstance(c, type)}
+    types = tuple(c for c in columns if isinstance(c, type))
+    return lambda header: header in names or (bool(types) and isinstance(header, types))
+
+
+def cache_path(digest, sheet, columns, header):
+    """Cache file of one parsed sheet"""
+    spec = repr((sheet, header, None if columns is None else sorted(map(repr, columns))))
+    key = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(WORKBOOK_CACHE_DIR, f"{digest[:32]}-{key}.pkl")
+
+
+def prune_cache():
+    """Remove cache entries not used for WORKBOOK_CACHE_DAYS"""
+    if not os.path.isdir(WORKBOOK_CACHE_DIR):
+        return
+    cutoff = time.time() - WORKBOOK_CACHE_DAYS * 86400
+    for name in os.listdir(WORKBOOK_CACHE_DIR):
+        path = os.path.join(WORKBOOK_CACHE_DIR, name)
+        try:
+            if name.endswith(".pkl") and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            # Already pruned by a concurrent worker
+            pass
+
+
+def read_workbook(path, sheets, header=0):
+    """
+    Parse the requested sheets of a workbook, from the cache when possible
+
+    sheets maps each sheet name to its column selection, see column_filter.
+    Returns {sheet name: DataFrame}.
+    """
+    digest = file_hash(path)
+    frames = {}
+    missing = {}
+    for sheet, columns in sheets.items():
+        cached = cache_path(digest, sheet, columns, header)
+        if os.path.exists(cached):
+            frames[sheet] = pd.read_pickle(cached)
+            # Keep used entries fresh for prune_cache
+            os.utime(cached)
+        else:
+            missing[sheet] = (columns, cached)
+
+    if missing:
+        # One open for all sheets; the openpyxl engine reads in read-only mode
+        with pd.ExcelFile(path, engine="openpyxl") as workbook:
+            for sheet, (columns, cached) in missing.items():
+                frame = workbook.parse(
+                    sheet, header=header, usecols=column_filter(columns)
+                )
+                with atomic_path(cached) as tmp_path:
+                    frame.to_pickle(tmp_path)
+                frames[sheet] = frame
+
+    hits = len(sheets) - len(missing)
+    print(f"  {os.path.basename(path)}: {hits} cached, {len(missing)} parsed")
+    prune_cache()
+    return {sheet: frames[sheet] for sheet in sheets}
+
+
+def main(argv):
+    """Clear the workbook cache"""
+    if argv != ["clear"]:
+        print("Usage: python workbook_cache.py clear")
+        return 1
+    removed = 0
+    if os.path.isdir(WORKBOOK_CACHE_DIR):
+        for name in os.listdir(WORKBOOK_CACHE_DIR):
+            if name.endswith(".pkl"):
+                os.remove(os.path.join(WORKBOOK_CACHE_DIR, name))
+                removed += 1
+    print(f"Removed {removed} cached sheets from {WORKBOOK_CACHE_DIR}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))